@@ -1,15 +1,53 @@
-import flask
+import time
+import sys
+import importlib
+
+# --- Startup timing: every import and init phase below is recorded for /api/v1/readiness ---
+_MODULE_IMPORT_STARTED = time.perf_counter()
+STARTUP_TIMINGS = {"imports": {}, "phases": {}}
+
+def timed_import(module_name):
+    """Imports a module, recording wall time and how many modules it pulled in."""
+    started = time.perf_counter()
+    loaded_before = len(sys.modules)
+    module = importlib.import_module(module_name)
+    STARTUP_TIMINGS["imports"][module_name] = {
+        "seconds": round(time.perf_counter() - started, 4),
+        "modules_loaded": len(sys.modules) - loaded_before,
+    }
+    return module
+
+flask = timed_import("flask")
 from flask import request, jsonify
-from flask_cors import CORS
+CORS = timed_import("flask_cors").CORS
 import sqlite3
 import threading
-import time
 import uuid
 import json
+import contextlib
 import os 
-import google.generativeai as genai 
 import re 
 import traceback
+import hashlib
+import hmac
+import functools
+import math
+import socket
+import zlib
+import base64
+import binascii
+import csv
+import io
+import importlib.util
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as wait_futures
+import shared_state
+import report_render
+import brief_similarity
+import circuit_breaker
+import model_scheduler
+import plan_analytics
+import tracing
 
 # Quick debug: print whether the GEMINI_API_KEY is visible to this process (DO NOT print the key itself)
 print(f"[startup-debug] GEMINI_API_KEY present in environment: {bool(os.environ.get('GEMINI_API_KEY'))}")
@@ -24,221 +62,50 @@ CORS(app)
 USE_DEBUG_DATA = False
 # ---
 
-# --- Sample Data for Debugging (Updated) ---
-# 2. NEW: Debug data is now a JSON object with "summary" and "fullReport"
-DEBUG_REPORT_JSON = {
-    "summary": """
-# Project Dashboard: AI Meal Planner
-
-### Key Statistics
-- **Total Budget:** $500,000 - $615,000
-- **Total Timeline:** 35 Weeks
-- **Key Goal (Adoption):** 15,000 Users in 6 Months
-- **Key Goal (Utility):** $40/mo Average User Savings
-- **Critical Path:** 3.0 Core AI/ML Dev (8 Weeks)
-
-### Actionable Insights
-1.  **High-Impact Risk:** The project's success is critically dependent on securing reliable, real-time grocery sales data. This data pipeline (WBS 3.0) is the main risk and must be validated immediately.
-2.  **Budget Allocation:** The budget has been revised to allocate $200,000 (over 35% of the total) to WBS 3.0, reflecting its high priority and complexity.
-3.  **Go-to-Market:** The timeline for WBS 6.0 (Go-to-Market) has been extended to 6 weeks to properly support the aggressive user acquisition goal of 15,000 users.
-4.  **Metric Verification:** A new QA task, "Metric Verification Study," has been added to ensure the internal AI accuracy score directly correlates with the external goal of $40 in user savings.
-""",
-    "fullReport": """
-# AI Meal Planner App: Comprehensive Project Plan
-
-## 1. Executive Summary
-**Reasoning**
-This section provides a high-level overview of the project's purpose, scope, and key success metrics, establishing the context for executive stakeholders. The core value proposition—using AI to link dietary needs with real-time local grocery sales—is identified as the primary differentiator.
-
-The AI Meal Planner App project aims to deliver a novel solution to help busy professionals and families adhere to healthier eating habits while simultaneously reducing food costs. The core unique selling proposition (USP) is the integration of personalized nutritional planning with real-time, localized grocery store sales data.
-
-The project is estimated to take approximately **35 total weeks** from initiation to post-launch monitoring, with a total budget ranging from **$500,000 to $615,000**. Critical success hinges on the accurate development of the core AI/ML model (WBS 3.0) and aggressive user acquisition strategies post-launch.
-
-Key success metrics include achieving 15,000 registered users within six months and demonstrating an average documented user savings of $40 per month, directly validating the AI's cost-optimization feature.
-
-## 2. Project Goals & Objectives (SMART)
-**Reasoning**
-The objectives are defined using the SMART framework (Specific, Measurable, Achievable, Relevant, Time-bound) to ensure clarity and accountability. These goals focus on both business growth (user adoption, conversion) and core utility (savings, satisfaction).
-
-The following SMART goals govern the project’s success criteria:
-- **User Adoption & Scale:** Achieve a milestone of **15,000 registered users** and **6,000 monthly active users (MAUs)** within the first six months post-launch.
-- **Utility Verification:** Document and communicate an average user grocery savings of **$40 per month**, verified by user surveys and internal metrics, within the first quarter of full operation (Q1).
-- **User Satisfaction:** Maintain a user satisfaction score (CSAT) of **4.5/5.0 or higher** regarding the relevance and health adherence of generated meal plans throughout the first 120 days post-launch.
-- **Monetization:** Establish a subscription conversion rate of **8% or higher** among users completing the 14-day free trial period by the end of the second fiscal quarter.
-
-### User Adoption Goal (First 6 Months)
-<canvas id="userGrowthChart"
- data-chart-type="line"
- data-chart-title="User Adoption Goal (First 6 Months)"
- data-chart-labels='["Month 1", "Month 2", "Month 3", "Month 4", "Month 5", "Month 6"]'
- data-chart-values='[1000, 2500, 5000, 8000, 12000, 15000]'>
-</canvas>
-
-
-## 3. Market & Competitor Analysis
-**Reasoning**
-Analyzing the competitive landscape identifies existing market gaps and informs the necessary feature set for the AI Meal Planner App to achieve differentiation. The primary gap identified is the lack of real-time, localized sales integration among existing leaders.
-
-| Competitor | Primary Strength | Strategic Implication for AI Planner App |
-| :--- | :--- | :--- |
-| **eMeals** | Highly structured, subscription-based meal plans tailored to specific diets and lifestyles, simplifying the entire weekly planning process. | Must offer comparable structure and adherence features, but with superior personalization and dynamic cost optimization. |
-| **Paprika** | Robust cross-platform recipe management and organization tools for saving and syncing personal collections. | Must prioritize seamless import/export functionality and robust user-generated content tools to minimize user switching costs. |
-| **Yummly** | Leverages a massive, aggregated recipe database with advanced personalization algorithms for superior recipe discovery. | Requires securing early licensing agreements for a high-quality recipe database and focusing AI development on superior utility (cost/health) rather than sheer volume. |
-
-## 4. Project Scope & Work Breakdown Structure (WBS)
-**Reasoning**
-The scope outlines the boundaries of the project, focusing on the development of the core AI engine, data infrastructure, and user-facing application. The WBS breaks down the total effort into seven manageable phases, while user stories define the functional requirements from the end-user perspective.
-
-### Work Breakdown Structure (WBS)
-| ID | Task |
-| :--- | :--- |
-| 1.0 | Project Initiation, Scope Definition, and Monetization Strategy |
-| 2.0 | System Architecture and UX/UI Design |
-| 3.0 | Core AI/ML Model Development and Data Pipeline Establishment |
-| 4.0 | Application Development (Frontend, Backend, and Subscription Flow) |
-| 5.0 | Quality Assurance, Compliance, and Beta Testing |
-| 6.0 | Go-to-Market Strategy, Launch Execution, and User Acquisition |
-| 7.0 | Post-Launch Monitoring, Growth Hacking, and Metric Verification |
-
-### Key Functional Requirements
-| ID | Requirement | Acceptance Criteria |
-| :--- | :--- | :--- |
-| **FR-01** | The user must be able to generate personalized recommendations based on their profile. | Profile setup wizard completion, generation of initial output within 5 seconds, recommendations dynamically update based on profile changes. |
-| **FR-02** | The user must be able to seamlessly upgrade to a premium account. | Successful payment processing via multiple methods (credit card, PayPal), immediate account status update to 'Premium', clear differentiation between free and paid features. |
-| **FR-03** | The user must be able to interact with a clean and intuitive dashboard. | Key metrics visible on the main screen, navigation accessible on all pages, average time-to-task completion under 10 seconds. |
-| **FR-04** | The user must be able to manage their personal data and account settings. | Implementation of industry-standard security protocols (e.g., encryption), clear GDPR/CCPA compliant data deletion process accessible via the settings menu. |
-
-## 5. Visual Timeline & Milestones
-**Reasoning**
-The timeline confirms a **35-week development cycle**, highlighting that the Core AI/ML Model Development (WBS 3.0) is the longest and most critical path component. The Go-to-Market phase (WBS 6.0) has been extended to 6 weeks to properly support user acquisition goals.
-
-### Key Project Milestones
-- **Milestone 1:** Project Scope and Monetization Strategy Lock (Phase Gate Approval)
-- **Milestone 2:** System Architecture and Final UX/UI Design Approved (Technical Blueprint Complete)
-- **Milestone 3:** Feature Complete Alpha Version Deployed (Core AI Integrated and Functional)
-- **Milestone 4:** Successful Public Production Launch
-
-### Projected High-Level Timeline (Gantt Chart)
-<div class="gantt-chart-container">
-    <table class="gantt-chart">
-        <thead>
-            <tr>
-                <th>Task (WBS)</th>
-                <th colspan="4">Weeks 1-4</th>
-                <th colspan="4">Weeks 5-8</th>
-                <th colspan="4">Weeks 9-12</th>
-                <th colspan="4">Weeks 13-16</th>
-                <th colspan="4">Weeks 17-20</th>
-                <th colspan="4">Weeks 21-24</th>
-                <th colspan="4">Weeks 25-28</th>
-                <th colspan="4">Weeks 29-32</th>
-                <th colspan="4">Weeks 33-36</th>
-            </tr>
-        </thead>
-        <tbody>
-            <tr>
-                <td>1.0 Initiation</td>
-                <td colspan="36" class="gantt-row">
-                    <span data-start-week="1" data-duration="4" data-label="4 Weeks"></span>
-                </td>
-            </tr>
-            <tr>
-                <td>2.0 Architecture</td>
-                <td colspan="36" class="gantt-row">
-                    <span data-start-week="5" data-duration="4" data-label="4 Weeks"></span>
-                </td>
-            </tr>
-            <tr>
-                <td>3.0 Core AI/ML Dev</td>
-                <td colspan="36" class="gantt-row">
-                    <span data-start-week="9" data-duration="8" data-label="8 Weeks"></span>
-                </td>
-            </tr>
-            <tr>
-                <td>4.0 App Dev</td>
-                <td colspan="36" class="gantt-row">
-                    <span data-start-week="17" data-duration="6" data-label="6 Weeks"></span>
-                </td>
-            </tr>
-            <tr>
-                <td>5.0 QA & Beta</td>
-                <td colspan="36" class="gantt-row">
-                    <span data-start-week="23" data-duration="4" data-label="4 Weeks"></span>
-                </td>
-            </tr>
-            <tr>
-                <td>6.0 Go-to-Market</td>
-                <td colspan="36" class="gantt-row">
-                    <span data-start-week="27" data-duration="6" data-label="6 Weeks"></span>
-                </td>
-            </tr>
-            <tr>
-                <td>7.0 Post-Launch</td>
-                <td colspan="36" class="gantt-row">
-                    <span data-start-week="33" data-duration="3" data-label="3 Weeks"></span>
-                </td>
-            </tr>
-        </tbody>
-    </table>
-</div>
-
-
-## 6. Budget & Resource Plan
-**Reasoning**
-The budget allocation reflects the technical complexity of the project. The budget for WBS 3.0 (Core AI/ML) has been increased to account for complex data pipeline development. The total budget is now **$500,000 - $615,000**. A 15% contingency buffer is allocated to manage identified risks.
-
-### Budget Allocation
-<canvas id="budgetChart"
- data-chart-type="horizontalBar"
- data-chart-title="Budget Allocation (Est: $550k)"
- data-chart-labels='["1.0 Initiation", "2.0 Architecture", "3.0 Core AI/ML (Rev)", "4.0 App Dev", "5.0 QA", "6.0 Go-to-Market", "7.0 Post-Launch", "Contingency"]'
- data-chart-values='[40000, 50000, 200000, 100000, 35000, 50000, 10000, 65000]'>
-</canvas>
-
-## 7. Risk Analysis & Mitigation
-**Reasoning**
-A proactive risk strategy is essential, focusing heavily on the reliability of the core AI functionality and the complex task of securing high-quality data (recipes and real-time sales). Mitigation strategies prioritize architectural flexibility and early content acquisition.
-
-| Risk | Impact | Mitigation |
-| :--- | :--- | :--- |
-| **Localized Data Dependency** | **High** | The plan must include a formal discovery phase (WBS 1.1) to confirm the legal and technical feasibility of acquiring real-time, multi-vendor grocery data. |
-| **AI Planning Algorithm Failure** | High | Establish strict KPIs for planning accuracy (e.g., adherence to caloric/macro goals) and run extensive beta testing focusing on real-world feasibility (ingredient cost, prep time, variety) before launch. |
-| **Recipe Database Acquisition** | High | Prioritize securing early licensing agreements with key content providers and focus development resources on robust user-generated content tools to rapidly expand the database organically. |
-| **Low User Adoption** | Medium-High | Prioritize seamless import/export functionality (e.g., common recipe file formats, web scraping tools) and ensure compatibility with popular third-party grocery list and calendar applications. |
-| **AI Model Obsolescence** | Medium | Design the AI architecture to be modular and decoupled from the main application logic, allowing for rapid iteration and replacement of underlying models. |
-
-## 8. Quality Assurance & Control
-**Reasoning**
-This section confirms the commitment to system performance, security, and process integrity. The QA targets are directly linked to the SMART goals and user stories, while the communication plan ensures stakeholder alignment.
-
-### Quality Assurance (QA) Targets
-| Metric | Target | Link to Goal/Story |
-| :--- | :--- | :--- |
-| System Availability (Uptime) | 99.9% or higher during peak hours. | Technical Resilience |
-| Core Function Latency | Median load time < 3.0s (P95 < 5.0s). | FR-01 |
-| Subscription Flow Success | 99.5% success rate for payment processing. | Goal 4, FR-02 |
-| AI Recommendation Accuracy | Internal QA score of 90% or higher. | Goal 2 |
-| **Metric Verification Study** | **Pilot program to correlate internal QA score with external $40 user savings.** | **Goal 2** |
-| User Satisfaction (CSAT) | 4.5/5.0 or higher re: meal plan relevance. | Goal 3 |
-| Security Vulnerability | Zero critical/high-severity vulnerabilities in prod. | FR-04 |
-
-### Communications Plan
-| Stakeholder | Frequency | Method | Purpose |
-| :--- | :--- | :--- | :--- |
-| Executive Leadership | Bi-weekly | Exec. Summary & 15-min Check-in | Review milestones, budget, and critical risks. |
-| General User Base | Monthly | Newsletter / In-App Notification | Provide utility updates, demonstrate value, and share tips. |
-| Power Users (Fitness) | Weekly | Social Channel & Targeted Email | Share deep-dive features, training content, and gather feedback. |
-| Media & PR | As Needed | Press Release / Media Advisory | Control narrative for major launches or partnerships. |
-
-### Change Control Process
-1.  **Submit Change Request (CR):** A formal request detailing the proposed modification, its priority, and its business justification.
-2.  **CCB Analysis:** The Change Control Board (CCB) analyzes the CR's impact on the project baseline and core AI functionality.
-3.  **Decision & Documentation:** Approve, Reject, or Defer the CR. All approved changes are documented, the project plan is updated, and the change is scheduled for implementation.
-"""
-}
-
 # --- Database Setup ---
 DATABASE_NAME = "jobs.db"
+ARCHIVE_DATABASE_NAME = os.environ.get("ARCHIVE_DATABASE_NAME", "jobs_archive.db")
+
+# Retention: completed/failed jobs older than this are moved to the archive db (or deleted).
+JOB_RETENTION_DAYS = float(os.environ.get("JOB_RETENTION_DAYS", "90"))
+JOB_RETENTION_MODE = os.environ.get("JOB_RETENTION_MODE", "archive")  # "archive" | "delete" | "off"
+# Required as X-Admin-Token on /api/v1/admin/* when set. Without it only the default maintenance
+# pass can be triggered over HTTP; retention overrides are refused.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+MAINTENANCE_INTERVAL_SECONDS = float(os.environ.get("MAINTENANCE_INTERVAL_HOURS", "24")) * 3600
+COMPACT_BATCH_SIZE = 200
+
+# --- Compressed column storage ---
+# Large JSON columns (form_data, final_report) are stored as BLOBs tagged with their codec.
+# Rows written before compression existed are plain TEXT and are returned unchanged.
+try:
+    import zstandard
+    _ZSTD_COMPRESSOR = zstandard.ZstdCompressor(level=10)
+    _ZSTD_DECOMPRESSOR = zstandard.ZstdDecompressor()
+except ImportError:
+    zstandard = None
+
+def encode_blob(text):
+    """Compresses a JSON/text column value for storage."""
+    if text is None:
+        return None
+    raw = text.encode("utf-8")
+    if zstandard is not None:
+        return b"zstd:" + _ZSTD_COMPRESSOR.compress(raw)
+    return b"zlib:" + zlib.compress(raw, 9)
+
+def decode_blob(value):
+    """Inverse of encode_blob; also accepts legacy uncompressed TEXT."""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if value.startswith(b"zlib:"):
+        return zlib.decompress(value[5:]).decode("utf-8")
+    if value.startswith(b"zstd:"):
+        if zstandard is None:
+            raise RuntimeError("Row is zstd-compressed but the 'zstandard' package is not installed.")
+        return _ZSTD_DECOMPRESSOR.decompress(value[5:]).decode("utf-8")
+    return value.decode("utf-8")
 
 def get_db():
     """Establishes a connection to the SQLite database."""
@@ -251,6 +118,11 @@ def init_db():
     with app.app_context():
         db = get_db()
         cursor = db.cursor()
+        if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # INCREMENTAL auto-vacuum only takes effect after a full VACUUM; this runs once per db file.
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            db.commit()
+            db.execute("VACUUM")
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS jobs (
             job_id TEXT PRIMARY KEY,
@@ -261,36 +133,1039 @@ def init_db():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
         ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS batches (
+            batch_id TEXT PRIMARY KEY,
+            source TEXT,
+            total_jobs INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS token_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT,
+            agent TEXT,
+            revision INTEGER,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            output_tokens INTEGER NOT NULL DEFAULT 0,
+            total_tokens INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_token_usage_job ON token_usage(job_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_token_usage_created_at ON token_usage(created_at)")
+        ensure_column(cursor, "jobs", "batch_id", "TEXT")
+        ensure_column(cursor, "token_usage", "model", "TEXT")
+        ensure_column(cursor, "jobs", "report_html", "BLOB")
+        ensure_column(cursor, "jobs", "report_hash", "TEXT")
+        ensure_column(cursor, "jobs", "council_results", "BLOB")
+        ensure_column(cursor, "jobs", "brief_minhash", "BLOB")
+        ensure_column(cursor, "jobs", "warm_start", "TEXT")
+        ensure_column(cursor, "jobs", "client_id", "TEXT")
+        ensure_column(cursor, "jobs", "started_at", "REAL")
+        ensure_column(cursor, "jobs", "finished_at", "REAL")
+        ensure_column(cursor, "jobs", "brief_hash", "TEXT")
+        ensure_column(cursor, "jobs", "idempotency_key", "TEXT")
+        ensure_column(cursor, "batches", "prompt_calls", "INTEGER")
+        ensure_column(cursor, "batches", "prompt_shared", "INTEGER")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_finished_at ON jobs(finished_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_brief_hash ON jobs(brief_hash, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_idempotency_key ON jobs(idempotency_key)")
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS brief_lsh (
+            band INTEGER NOT NULL,
+            bucket TEXT NOT NULL,
+            job_id TEXT NOT NULL
+        )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_brief_lsh_bucket ON brief_lsh(band, bucket)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_brief_lsh_job ON brief_lsh(job_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_job ON jobs(created_at, job_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_batch_id ON jobs(batch_id)")
+        global SEARCH_ENABLED
+        SEARCH_ENABLED = create_search_index(cursor)
+        db.commit()
+
+def ensure_column(cursor, table, column, declaration):
+    """Adds a column to an existing table if an older database doesn't have it yet."""
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column not in existing:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+def db_size_bytes(db):
+    page_size = db.execute("PRAGMA page_size").fetchone()[0]
+    page_count = db.execute("PRAGMA page_count").fetchone()[0]
+    freelist = db.execute("PRAGMA freelist_count").fetchone()[0]
+    return page_size * page_count, page_size * freelist
+
+def compress_legacy_rows(db):
+    """Re-encodes rows still holding uncompressed TEXT. Returns the number of rows rewritten."""
+    rewritten = 0
+    while True:
+        rows = db.execute(
+            "SELECT job_id, form_data, final_report FROM jobs "
+            "WHERE typeof(form_data) = 'text' OR typeof(final_report) = 'text' LIMIT ?",
+            (COMPACT_BATCH_SIZE,)
+        ).fetchall()
+        if not rows:
+            return rewritten
+        db.executemany(
+            "UPDATE jobs SET form_data = ?, final_report = ? WHERE job_id = ?",
+            [(encode_blob(decode_blob(r["form_data"])), encode_blob(decode_blob(r["final_report"])), r["job_id"]) for r in rows]
+        )
         db.commit()
+        rewritten += len(rows)
+
+def apply_retention(db, days=None, mode=None):
+    """Archives or deletes finished jobs older than the retention window. Returns rows affected."""
+    days = JOB_RETENTION_DAYS if days is None else days
+    mode = JOB_RETENTION_MODE if mode is None else mode
+    if mode == "off" or days <= 0:
+        return 0
+    cutoff = f"-{days} days"
+    where = "status IN ('complete', 'failed', 'cancelled') AND created_at < datetime('now', ?)"
+    if mode == "archive":
+        db.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_DATABASE_NAME,))
+        try:
+            db.execute("CREATE TABLE IF NOT EXISTS archive.jobs AS SELECT * FROM main.jobs WHERE 0")
+            columns = [row[1] for row in db.execute("PRAGMA main.table_info(jobs)")]
+            archived = {row[1] for row in db.execute("PRAGMA archive.table_info(jobs)")}
+            for column in columns:
+                if column not in archived:
+                    db.execute(f"ALTER TABLE archive.jobs ADD COLUMN {column}")
+            column_list = ", ".join(columns)
+            db.execute(
+                f"INSERT OR REPLACE INTO archive.jobs ({column_list}) SELECT {column_list} FROM main.jobs WHERE {where}",
+                (cutoff,)
+            )
+            affected = db.execute(f"DELETE FROM main.jobs WHERE {where}", (cutoff,)).rowcount
+            prune_job_indexes(db)
+            db.commit()
+        finally:
+            db.execute("DETACH DATABASE archive")
+        return affected
+    affected = db.execute(f"DELETE FROM jobs WHERE {where}", (cutoff,)).rowcount
+    prune_job_indexes(db)
+    db.commit()
+    return affected
+
+def compact_db(retention_days=None, retention_mode=None):
+    """Compresses legacy rows, applies retention, then runs an incremental vacuum.
+
+    Returns a report with row counts and the number of bytes reclaimed from the db file.
+    """
+    db = get_db()
+    started = time.time()
+    size_before, _ = db_size_bytes(db)
+    compressed = compress_legacy_rows(db)
+    retired = apply_retention(db, retention_days, retention_mode)
+    _, free_bytes = db_size_bytes(db)
+    # executescript steps the pragma to completion; a plain execute() frees a single page.
+    db.executescript("PRAGMA incremental_vacuum;")
+    size_after, _ = db_size_bytes(db)
+    report = {
+        "rows_compressed": compressed,
+        "rows_retired": retired,
+        "retention_mode": retention_mode or JOB_RETENTION_MODE,
+        "free_bytes_before_vacuum": free_bytes,
+        "size_before_bytes": size_before,
+        "size_after_bytes": size_after,
+        "bytes_reclaimed": size_before - size_after,
+        "duration_seconds": round(time.time() - started, 3),
+    }
+    print(f"[maintenance] {report}")
+    return report
+
+# --- Full-text search over finished plans ---
+# jobs_fts holds the searchable text of completed jobs (brief fields + report Markdown). Rows are
+# written when a job completes; jobs finished before the index existed are backfilled at startup.
+SEARCH_ENABLED = False
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+SEARCH_BRIEF_FIELDS = ("name", "purpose", "audience", "competitors")
+_MARKUP_RE = re.compile(r"<[^>]*>")
+
+def create_search_index(cursor):
+    """Creates the FTS5 table. Returns False (search disabled) if SQLite was built without FTS5."""
+    try:
+        cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+            job_id UNINDEXED, name, purpose, audience, competitors, report,
+            tokenize = 'porter unicode61'
+        )
+        ''')
+        return True
+    except sqlite3.OperationalError as e:
+        print(f"[search] FTS5 is not available in this SQLite build; search is disabled: {e}")
+        return False
+
+def index_job_for_search(db, job_id, form_data, report_object):
+    """(Re)writes a job's row in jobs_fts. The caller commits."""
+    if not SEARCH_ENABLED:
+        return
+    brief = [str(form_data.get(field) or "") for field in SEARCH_BRIEF_FIELDS]
+    report = "\n\n".join(str(report_object.get(key) or "") for key in ("summary", "fullReport"))
+    db.execute("DELETE FROM jobs_fts WHERE job_id = ?", (job_id,))
+    db.execute(
+        "INSERT INTO jobs_fts (job_id, name, purpose, audience, competitors, report) VALUES (?, ?, ?, ?, ?, ?)",
+        (job_id, *brief, _MARKUP_RE.sub(" ", report))
+    )
+
+def backfill_search_index():
+    """Indexes completed jobs that are missing from jobs_fts. Returns how many were added."""
+    if not SEARCH_ENABLED:
+        return 0
+    db = get_db()
+    missing = [row[0] for row in db.execute(
+        "SELECT job_id FROM jobs WHERE status = 'complete' AND job_id NOT IN (SELECT job_id FROM jobs_fts)"
+    )]
+    indexed = 0
+    for start in range(0, len(missing), COMPACT_BATCH_SIZE):
+        chunk = missing[start:start + COMPACT_BATCH_SIZE]
+        rows = db.execute(
+            f"SELECT job_id, form_data, final_report FROM jobs WHERE job_id IN ({', '.join('?' * len(chunk))})",
+            chunk
+        ).fetchall()
+        for row in rows:
+            try:
+                index_job_for_search(db, row["job_id"], json.loads(decode_blob(row["form_data"]) or "{}"),
+                                     json.loads(decode_blob(row["final_report"]) or "{}"))
+                indexed += 1
+            except (ValueError, TypeError, AttributeError) as e:
+                print(f"[search] Skipping job {row['job_id']} during backfill: {e}")
+        db.commit()
+    if indexed:
+        print(f"[search] Backfilled {indexed} completed jobs into the search index.")
+    return indexed
+
+def prune_job_indexes(db):
+    """Drops search/similarity index rows for jobs that were archived or deleted. The caller commits."""
+    if SEARCH_ENABLED:
+        db.execute("DELETE FROM jobs_fts WHERE job_id NOT IN (SELECT job_id FROM main.jobs)")
+    db.execute("DELETE FROM brief_lsh WHERE job_id NOT IN (SELECT job_id FROM main.jobs)")
+
+def fts_query(text):
+    """Turns free text into an FTS5 query: every term must match; a trailing * keeps prefix search."""
+    terms = []
+    for term in text.split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*").replace('"', '""')
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+# --- Job listing and bulk export ---
+# Both walk the jobs table newest first by keyset on (created_at, job_id), so a page costs the same
+# however deep it is, and an export reads fixed-size chunks without holding a read lock open.
+JOB_LIST_PAGE_SIZE = 50
+MAX_JOB_LIST_PAGE_SIZE = 200
+EXPORT_CHUNK_SIZE = 200
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+DEFAULT_JOB_FIELDS = ("job_id", "status", "created_at", "current_task", "name")
+
+def _json_column(value):
+    """Stored JSON (possibly compressed) -> object. Legacy plain-text values come back as the string."""
+    text = decode_blob(value)
+    if text is None:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def _brief_name(value):
+    brief = _json_column(value)
+    return brief.get("name") if isinstance(brief, dict) else None
+
+# Public field -> (column it's read from, decoder or None). Blob columns are only read and
+# decoded when their field is requested.
+JOB_FIELDS = {
+    "job_id": ("job_id", None),
+    "status": ("status", None),
+    "current_task": ("current_task", None),
+    "created_at": ("created_at", None),
+    "started_at": ("started_at", None),
+    "finished_at": ("finished_at", None),
+    "batch_id": ("batch_id", None),
+    "report_hash": ("report_hash", None),
+    "name": ("form_data", _brief_name),
+    "form_data": ("form_data", _json_column),
+    "final_report": ("final_report", _json_column),
+    "warm_start": ("warm_start", _json_column),
+}
+
+def job_list_query(args):
+    """Parses fields/status/from/to/batch_id query args into (fields, where, params).
+
+    Raises ValueError for unknown fields.
+    """
+    fields = [f for f in (args.get("fields") or "").split(",") if f] or list(DEFAULT_JOB_FIELDS)
+    unknown = [f for f in fields if f not in JOB_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(JOB_FIELDS)}")
+    filters, params = [], []
+    statuses = [s for s in (args.get("status") or "").split(",") if s]
+    if statuses:
+        filters.append(f"status IN ({', '.join('?' * len(statuses))})")
+        params.extend(statuses)
+    if args.get("from"):
+        filters.append("created_at >= ?")
+        params.append(args["from"])
+    if args.get("to"):
+        filters.append("created_at < date(?, '+1 day')")
+        params.append(args["to"])
+    if args.get("batch_id"):
+        filters.append("batch_id = ?")
+        params.append(args["batch_id"])
+    return fields, filters, params
+
+def encode_job_cursor(created_at, job_id):
+    raw = json.dumps([created_at, job_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_job_cursor(cursor):
+    """Opaque cursor -> (created_at, job_id). Raises ValueError if it wasn't issued by us."""
+    try:
+        created_at, job_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+    return created_at, job_id
+
+def fetch_job_page(db, fields, filters, params, after=None, limit=JOB_LIST_PAGE_SIZE):
+    """One page of jobs (newest first) strictly after the `after` key.
+
+    Returns (items, last_key); last_key is None when the table is exhausted.
+    """
+    columns = list(dict.fromkeys(["created_at", "job_id"] + [JOB_FIELDS[f][0] for f in fields]))
+    where = list(filters)
+    if after is not None:
+        where.append("(created_at, job_id) < (?, ?)")
+        params = list(params) + list(after)
+    rows = db.execute(
+        f"SELECT {', '.join(columns)} FROM jobs WHERE {' AND '.join(where) or '1'} "
+        "ORDER BY created_at DESC, job_id DESC LIMIT ?",
+        list(params) + [limit]
+    ).fetchall()
+    items = []
+    for row in rows:
+        item = {}
+        for field in fields:
+            column, decode = JOB_FIELDS[field]
+            item[field] = decode(row[column]) if decode else row[column]
+        items.append(item)
+    last_key = (rows[-1]["created_at"], rows[-1]["job_id"]) if len(rows) == limit else None
+    return items, last_key
+
+def iter_job_chunks(fields, filters, params, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields lists of projected jobs, one keyset query per chunk on a short-lived connection."""
+    after = None
+    while True:
+        db = get_db()
+        try:
+            items, after = fetch_job_page(db, fields, filters, params, after, chunk_size)
+        finally:
+            db.close()
+        if items:
+            yield items
+        if after is None:
+            return
+
+def _flat_value(value):
+    """CSV/Parquet cell: nested objects become JSON text."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+def export_ndjson(fields, filters, params):
+    for chunk in iter_job_chunks(fields, filters, params):
+        yield "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in chunk)
+
+def export_csv(fields, filters, params):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for chunk in iter_job_chunks(fields, filters, params):
+        writer.writerows([_flat_value(item[f]) for f in fields] for item in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+class _DrainBuffer(io.RawIOBase):
+    """Write-only sink that hands written bytes back to a generator instead of keeping them."""
+
+    def __init__(self):
+        self._parts = []
+        self._written = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._written += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._written
+
+    def drain(self):
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+def export_parquet(fields, filters, params):
+    """One Parquet row group per chunk; every column is written as a string (nested values as JSON)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([(f, pa.string()) for f in fields])
+    sink = _DrainBuffer()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for chunk in iter_job_chunks(fields, filters, params):
+            columns = [[None if item[f] is None else str(_flat_value(item[f])) for item in chunk] for f in fields]
+            writer.write_table(pa.Table.from_arrays([pa.array(c, pa.string()) for c in columns], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+EXPORT_WRITERS = {"ndjson": export_ndjson, "csv": export_csv, "parquet": export_parquet}
+
+def maintenance_loop():
+    """Background thread: periodic compaction/retention, run by one worker at a time."""
+    while True:
+        time.sleep(MAINTENANCE_INTERVAL_SECONDS)
+        if not STATE.acquire_lease("__maintenance__", WORKER_ID, MAINTENANCE_INTERVAL_SECONDS / 2):
+            continue
+        try:
+            compact_db()
+            STATE.prune_events(time.time() - EVENT_RETENTION_SECONDS)
+            for exporter in TRACER.exporters:
+                if isinstance(exporter, tracing.SQLiteExporter):
+                    exporter.prune(time.time() - EVENT_RETENTION_SECONDS)
+        except Exception as e:
+            print(f"[maintenance] Compaction failed: {e}")
 
 # --- Gemini API Setup ---
-try:
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY environment variable is not set.")
-    genai.configure(api_key=api_key)
-    generation_config = {"temperature": 0.7, "top_p": 1, "top_k": 1, "max_output_tokens": 8192}
-    safety_settings = [
-        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-    ]
-    model = genai.GenerativeModel(
-        model_name="gemini-2.5-flash-preview-09-2025",
-        generation_config=generation_config,
-        safety_settings=safety_settings
+# The client library and model are built on first use, not at import, so processes that never
+# call the model (status API, migrations, tests) don't pay for google.generativeai.
+MODEL_NAME = "gemini-2.5-flash-preview-09-2025"
+generation_config = {"temperature": 0.7, "top_p": 1, "top_k": 1, "max_output_tokens": 8192}
+safety_settings = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+]
+model = None
+_model_lock = threading.Lock()
+_model_init_failed = False
+
+def get_model():
+    """Returns the shared GenerativeModel, building it on first call (thread-safe).
+
+    Returns None when GEMINI_API_KEY isn't set, same as the old eager setup did.
+    """
+    global model, _model_init_failed
+    if model is not None or _model_init_failed:
+        return model
+    with _model_lock:
+        if model is not None or _model_init_failed:
+            return model
+        started = time.perf_counter()
+        try:
+            api_key = os.environ.get("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY environment variable is not set.")
+            genai = timed_import("google.generativeai")
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(
+                model_name=MODEL_NAME,
+                generation_config=generation_config,
+                safety_settings=safety_settings
+            )
+            print("Gemini API client initialized successfully.")
+        except (KeyError, ValueError, ImportError) as e:
+            print(f"Error initializing Gemini: {e}")
+            print("Please set your GEMINI_API_KEY environment variable.")
+            _model_init_failed = True
+        STARTUP_TIMINGS["phases"]["model_init"] = round(time.perf_counter() - started, 4)
+        return model
+
+# --- Per-agent model routing ---
+# Small structured agents go to a cheaper, faster tier with tight output caps; the reviser and
+# synthesizer, which rewrite or author the whole plan, keep the heavyweight settings.
+# Override any of this with a JSON file at MODEL_ROUTING_FILE:
+#   {"tiers": {"fast": {"model_name": "..."}}, "agents": {"agent_risk_analyst": {"tier": "fast"}}}
+#
+# Per-agent max_output_tokens is the budget for the visible answer. Gemini 2.5 Flash thinks by
+# default, its thinking tokens count toward max_output_tokens, and google.generativeai can't set a
+# thinking budget; so a tier running a thinking model adds thinking_headroom_tokens on top.
+# Dynamic thinking on these prompts typically uses 1-4k tokens; the 8192 default leaves 2x margin
+# for the reasoning-heavy agents (critic, finance, risk). A cap only bounds a runaway response:
+# billing is per token generated. Flash-Lite doesn't think unless asked, so the fast tier adds none.
+THINKING_HEADROOM_TOKENS = int(os.environ.get("THINKING_HEADROOM_TOKENS", "8192"))
+MODEL_TIERS = {
+    "fast": {
+        "model_name": os.environ.get("GEMINI_FAST_MODEL", "gemini-2.5-flash-lite"),
+        "deadline_seconds": 45,
+        "generation_config": {"temperature": 0.4, "top_p": 1, "top_k": 1, "max_output_tokens": 2048},
+    },
+    "standard": {
+        "model_name": os.environ.get("GEMINI_STANDARD_MODEL", MODEL_NAME),
+        "deadline_seconds": 90,
+        "generation_config": {"temperature": 0.7, "top_p": 1, "top_k": 1, "max_output_tokens": 4096},
+        "thinking_headroom_tokens": THINKING_HEADROOM_TOKENS,
+    },
+    "heavy": {
+        "model_name": os.environ.get("GEMINI_HEAVY_MODEL", MODEL_NAME),
+        "deadline_seconds": 240,
+        "generation_config": dict(generation_config),
+    },
+}
+# Per-agent tier, optional deadline_seconds, plus any generation_config keys that differ from the tier's.
+AGENT_ROUTES = {
+    "agent_chief_strategist": {"tier": "standard", "max_output_tokens": 1024},
+    "agent_market_analyst": {"tier": "fast", "max_output_tokens": 1024},
+    "agent_solutions_architect": {"tier": "standard", "max_output_tokens": 2048},
+    "agent_product_owner": {"tier": "standard", "max_output_tokens": 2048},
+    "agent_project_scheduler": {"tier": "fast", "max_output_tokens": 1024, "temperature": 0.3},
+    "agent_growth_planner": {"tier": "fast", "max_output_tokens": 256, "temperature": 0.2},
+    "agent_finance_manager": {"tier": "standard", "max_output_tokens": 1024, "temperature": 0.3},
+    "agent_risk_analyst": {"tier": "standard", "max_output_tokens": 1024},
+    "agent_communications_lead": {"tier": "fast", "max_output_tokens": 1024},
+    "agent_quality_assurance_lead": {"tier": "fast", "max_output_tokens": 1024},
+    "agent_change_control": {"tier": "fast", "max_output_tokens": 512},
+    "agent_qa_critic": {"tier": "standard", "max_output_tokens": 2048, "temperature": 0.2},
+    "agent_executive_summarizer": {"tier": "standard", "max_output_tokens": 1024},
+    "agent_fused_brief_sections": {"tier": "standard", "max_output_tokens": 4096},
+    "agent_fused_plan_sections": {"tier": "standard", "max_output_tokens": 8192, "temperature": 0.5},
+    "agent_reviser": {"tier": "heavy"},
+    "agent_report_synthesizer": {"tier": "heavy"},
+    "validate_provisional": {"tier": "fast", "max_output_tokens": 512, "temperature": 0.2},
+}
+DEFAULT_AGENT_TIER = "heavy"
+
+def load_routing_overrides(path):
+    """Merges a MODEL_ROUTING_FILE into MODEL_TIERS / AGENT_ROUTES."""
+    with open(path) as f:
+        overrides = json.load(f)
+    for tier, settings in overrides.get("tiers", {}).items():
+        merged = MODEL_TIERS.setdefault(tier, {"model_name": MODEL_NAME, "deadline_seconds": 240,
+                                               "generation_config": dict(generation_config)})
+        merged["model_name"] = settings.get("model_name", merged["model_name"])
+        merged["deadline_seconds"] = settings.get("deadline_seconds", merged["deadline_seconds"])
+        if "thinking_headroom_tokens" in settings:
+            merged["thinking_headroom_tokens"] = settings["thinking_headroom_tokens"]
+        merged["generation_config"] = {**merged["generation_config"], **settings.get("generation_config", {})}
+    for agent, route in overrides.get("agents", {}).items():
+        AGENT_ROUTES[agent] = {**AGENT_ROUTES.get(agent, {}), **route}
+
+if os.environ.get("MODEL_ROUTING_FILE"):
+    load_routing_overrides(os.environ["MODEL_ROUTING_FILE"])
+
+ROUTE_KEYS = {"tier", "deadline_seconds"}  # route settings that aren't generation_config
+
+def resolve_route(agent):
+    """Returns {"tier", "model_name", "deadline_seconds", "generation_config"} for an agent."""
+    route = AGENT_ROUTES.get(agent, {})
+    tier_name = route.get("tier", DEFAULT_AGENT_TIER)
+    tier = MODEL_TIERS[tier_name]
+    overrides = {k: v for k, v in route.items() if k not in ROUTE_KEYS}
+    config = {**tier["generation_config"], **overrides}
+    if tier.get("thinking_headroom_tokens") and "max_output_tokens" in config:
+        config["max_output_tokens"] += tier["thinking_headroom_tokens"]
+    return {
+        "tier": tier_name,
+        "model_name": tier["model_name"],
+        "deadline_seconds": route.get("deadline_seconds", tier["deadline_seconds"]),
+        "generation_config": config,
+    }
+
+_routed_models = {}
+
+def get_model_for(agent):
+    """Returns the GenerativeModel configured for an agent's route (built once per distinct route)."""
+    base = get_model()
+    if base is None:
+        return None
+    route = resolve_route(agent)
+    if route["model_name"] == MODEL_NAME and route["generation_config"] == generation_config:
+        return base
+    key = (route["model_name"], json.dumps(route["generation_config"], sort_keys=True))
+    routed = _routed_models.get(key)
+    if routed is None:
+        with _model_lock:
+            routed = _routed_models.get(key)
+            if routed is None:
+                genai = importlib.import_module("google.generativeai")
+                routed = _routed_models[key] = genai.GenerativeModel(
+                    model_name=route["model_name"],
+                    generation_config=route["generation_config"],
+                    safety_settings=safety_settings
+                )
+    return routed
+
+# --- Runtime: shared state (cooldown, job leases, progress events, counters) ---
+# Lives outside the process so several server workers see one cooldown and one set of leases.
+# Built on first use (start_background_services does that at startup), not at import.
+STATE = shared_state.LazyBackend(os.environ.get("STATE_BACKEND", "sqlite:runtime_state.db"))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+LEASE_TTL_SECONDS = float(os.environ.get("JOB_LEASE_TTL_SECONDS", "120"))
+LEASE_RENEW_SECONDS = LEASE_TTL_SECONDS / 4
+EVENT_RETENTION_SECONDS = 7 * 24 * 3600
+
+def cooldown_remaining():
+    """Seconds left on the shared model cooldown (0 if none)."""
+    return max(0.0, STATE.get_cooldown_until() - time.time())
+
+# --- Runtime: per-thread job context (which job/batch/revision the current agent call belongs to) ---
+job_context = threading.local()
+
+# --- Tracing: spans for jobs, agents, model calls, JSON parsing and db writes (see tracing.py) ---
+TRACER = tracing.Tracer(tracing.load_exporters(os.environ.get("TRACE_EXPORT", f"sqlite:{DATABASE_NAME}")))
+
+def trace_span(name, **attributes):
+    """Span tagged with the current job context. Outside a job (and any span) nothing is recorded."""
+    job_id = getattr(job_context, "job_id", None)
+    if job_id is None and TRACER.current() is None:
+        return contextlib.nullcontext()
+    return TRACER.span(name, trace_key=job_id, job_id=job_id,
+                       revision=getattr(job_context, "revision", None), **attributes)
+
+def traced(name=None, **attributes):
+    """Decorator form of trace_span; the span is named after the function unless `name` is given."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace_span(name or fn.__name__, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def rate_limit_pause(seconds):
+    with trace_span("sleep.rate_limit", seconds=seconds):
+        time.sleep(seconds)
+
+# --- Job cancellation: cooperative, checked before every model call and between revision rounds ---
+CANCELLED_JOBS = set()  # cancelled through this worker; other workers see the status column
+
+class JobCancelled(Exception):
+    """Raised at the next check point once a job has been cancelled."""
+
+def job_cancelled(job_id):
+    if job_id is None:
+        return False
+    if job_id in CANCELLED_JOBS:
+        return True
+    row = get_db().execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return bool(row) and row["status"] == "cancelled"
+
+def raise_if_cancelled():
+    job_id = getattr(job_context, "job_id", None)
+    if job_cancelled(job_id):
+        raise JobCancelled(job_id)
+
+# --- Batch prompt sharing: identical first-pass prompts across a batch are sent once ---
+# batch_id -> {prompt_hash: {"event": Event, "text": str|None, "error": Exception|None}}
+BATCH_PROMPT_CACHES = {}
+BATCH_PROMPT_STATS = {}  # running batch_id -> {"calls": int, "shared": int}; saved to batches when done
+BATCH_CACHE_LOCK = threading.Lock()
+SHARED_PROMPT_POLL_SECONDS = 1.0  # how often a job waiting on a shared prompt checks for cancellation
+
+# --- Token accounting & budgets ---
+# 0 disables a budget. The job budget stops further revision rounds; the daily one rejects new jobs.
+JOB_TOKEN_BUDGET = int(os.environ.get("JOB_TOKEN_BUDGET", "0"))
+DAILY_TOKEN_BUDGET = int(os.environ.get("DAILY_TOKEN_BUDGET", "0"))
+
+def record_usage(job_id, agent, revision, response, model_name=None):
+    """Persists the usage metadata of one generate_content response."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+    total_tokens = getattr(usage, "total_token_count", 0) or (prompt_tokens + output_tokens)
+    db = get_db()
+    db.execute(
+        "INSERT INTO token_usage (job_id, agent, revision, prompt_tokens, output_tokens, total_tokens, model) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (job_id, agent, revision, prompt_tokens, output_tokens, total_tokens, model_name)
     )
-    print("Gemini API client initialized successfully.")
-except (KeyError, ValueError) as e:
-    print(f"Error initializing Gemini: {e}")
-    print("Please set your GEMINI_API_KEY environment variable.")
-    model = None
+    db.commit()
+
+# --- Deadlines & hedged requests ---
+# Every call gets its route's deadline. Once an agent has enough latency history, a call still
+# outstanding after that agent's HEDGE_PERCENTILE latency gets a duplicate; the first answer wins.
+HEDGING_ENABLED = os.environ.get("MODEL_HEDGING", "on") != "off"
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", "0.9"))
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY_SECONDS = float(os.environ.get("HEDGE_MIN_DELAY_SECONDS", "1.0"))  # never hedge sub-second calls
+LATENCY_WINDOW = 200
+MODEL_CALL_POOL = ThreadPoolExecutor(max_workers=int(os.environ.get("MODEL_CALL_THREADS", "32")),
+                                     thread_name_prefix="model-call")
+_agent_latencies = {}  # agent -> deque of recent successful call latencies (seconds)
+_latency_lock = threading.Lock()
+
+class ModelCallTimeout(TimeoutError):
+    """No response (primary or hedge) arrived within the agent's deadline."""
+
+def record_latency(agent, seconds):
+    with _latency_lock:
+        _agent_latencies.setdefault(agent, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+def hedge_delay(agent):
+    """Latency at HEDGE_PERCENTILE for the agent, or None until there's enough history."""
+    with _latency_lock:
+        samples = sorted(_agent_latencies.get(agent, ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return max(HEDGE_MIN_DELAY_SECONDS, samples[min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE))])
+
+def _generate_once(model, prompt, agent, job_id, revision, deadline, hedged, parent=None):
+    """One model request. Usage is always recorded, so a losing hedge still counts against budgets."""
+    model_name = getattr(model, "model_name", None)
+    with TRACER.span("model.generate_content", parent=parent, trace_key=job_id, job_id=job_id,
+                     revision=revision, agent=agent, model=model_name, hedged=hedged) as span:
+        started = time.perf_counter()
+        response = model.generate_content(prompt, request_options={"timeout": deadline})
+        record_latency(agent, time.perf_counter() - started)
+        usage = getattr(response, "usage_metadata", None)
+        if span is not None and usage is not None:
+            span.set(prompt_tokens=getattr(usage, "prompt_token_count", None),
+                     output_tokens=getattr(usage, "candidates_token_count", None))
+        try:
+            with TRACER.span("db.record_usage", job_id=job_id, revision=revision, agent=agent):
+                record_usage(job_id, agent if not hedged else f"{agent}:hedge", revision, response, model_name)
+        except sqlite3.Error as e:
+            print(f"[usage] Could not record token usage for {agent}: {e}")
+        return response.text
+
+def _generate_with_deadline(model, prompt, agent):
+    """Calls the model under the agent's deadline (hedging slow calls) and returns the text."""
+    job_id = getattr(job_context, "job_id", None)
+    revision = getattr(job_context, "revision", None)
+    deadline = resolve_route(agent)["deadline_seconds"]
+    started = time.monotonic()
+    parent = TRACER.current()  # pool threads don't inherit this thread's span stack
+
+    primary = MODEL_CALL_POOL.submit(_generate_once, model, prompt, agent, job_id, revision, deadline, False, parent)
+    pending = {primary}
+    delay = hedge_delay(agent) if HEDGING_ENABLED else None
+    if delay is not None and delay < deadline:
+        done, _ = wait_futures(pending, timeout=delay)
+        if not done:
+            print(f"[hedge] {agent} still running after {delay:.1f}s; sending a hedged request.")
+            STATE.incr("model.hedges_sent")
+            pending.add(MODEL_CALL_POOL.submit(_generate_once, model, prompt, agent, job_id, revision, deadline, True, parent))
+
+    error = None
+    while pending:
+        remaining = deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+        done, pending = wait_futures(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for loser in pending:
+                    # Not yet started -> dropped; already in flight -> finishes and records its usage.
+                    if loser.cancel():
+                        STATE.incr("model.hedges_cancelled")
+                if future is not primary:
+                    STATE.incr("model.hedge_wins")
+                return future.result()
+            error = future.exception()
+    if error is not None and not pending:
+        raise error
+    for future in pending:
+        future.cancel()
+    STATE.incr("model.deadline_exceeded")
+    raise ModelCallTimeout(f"{agent} did not respond within {deadline}s")
+
+# --- Circuit breaker: fail fast while the model is down, over quota or too slow ---
+# Per worker, like the scheduler. Jobs whose calls are refused are parked (shown as pending) until
+# the circuit lets calls through again; see call_model. Rate limits also extend the shared cooldown.
+MODEL_SLOW_CALL_FRACTION = float(os.environ.get("MODEL_SLOW_CALL_FRACTION", "0.8"))  # of the route's deadline
+MODEL_PARK_MAX_SECONDS = float(os.environ.get("MODEL_PARK_MAX_SECONDS", "3600"))  # per job, all parks together
+MODEL_PARK_MAX_CYCLES = int(os.environ.get("MODEL_PARK_MAX_CYCLES", "5"))  # parks after a failed call, per job
+PARK_POLL_SECONDS = 5.0
+MODEL_TRANSIENT_RETRIES = int(os.environ.get("MODEL_TRANSIENT_RETRIES", "3"))  # per call, in background jobs
+RETRY_BACKOFF_SECONDS = 2.0
+RETRYABLE_ERROR_KINDS = {"rate_limit", "unavailable"}  # fail fast; timeouts and auth errors aren't retried
+DEFAULT_RATE_LIMIT_COOLDOWN_SECONDS = 60
+
+def _log_circuit_transition(previous, state, reason):
+    print(f"[circuit] Model circuit {previous} -> {state}" + (f" ({reason})" if reason else ""))
+    STATE.incr(f"model.circuit_{state}")
+
+MODEL_BREAKER = circuit_breaker.CircuitBreaker(
+    window_seconds=float(os.environ.get("MODEL_CIRCUIT_WINDOW_SECONDS", "60")),
+    min_calls=int(os.environ.get("MODEL_CIRCUIT_MIN_CALLS", "5")),
+    failure_threshold=float(os.environ.get("MODEL_CIRCUIT_FAILURE_RATE", "0.5")),
+    slow_call_threshold=float(os.environ.get("MODEL_CIRCUIT_SLOW_RATE", "0.5")),
+    open_seconds=float(os.environ.get("MODEL_CIRCUIT_OPEN_SECONDS", "30")),
+    max_open_seconds=float(os.environ.get("MODEL_CIRCUIT_MAX_OPEN_SECONDS", "300")),
+    half_open_probes=int(os.environ.get("MODEL_CIRCUIT_HALF_OPEN_PROBES", "1")),
+    on_transition=_log_circuit_transition,
+)
+
+def note_model_error(error):
+    """Counts a failed model call by kind; a rate limit extends the cooldown every worker sees."""
+    kind = circuit_breaker.classify(error)
+    STATE.incr(f"model.errors.{kind}")
+    if kind == "rate_limit":
+        wait = circuit_breaker.retry_after_seconds(error) or DEFAULT_RATE_LIMIT_COOLDOWN_SECONDS
+        STATE.extend_cooldown(time.time() + wait)
+    return kind
+
+PARKED_JOBS = {}  # job_id -> {"seconds": parked so far, "cycles": parks after a failed call}
+_parked_lock = threading.Lock()
+
+def model_wait_remaining():
+    """Seconds until this worker may call the model: the local circuit or the shared cooldown.
+
+    The cooldown is set by whichever worker last hit a rate limit, so every process respects it.
+    """
+    return max(MODEL_BREAKER.retry_after(), cooldown_remaining())
+
+def park_while_circuit_open(job_id, after_failure=False):
+    """Holds a job while the model circuit is open or the shared rate-limit cooldown runs.
 
-# --- Runtime: model cooldown state to avoid repeated rate-limit retries ---
-MODEL_COOLDOWN_UNTIL = 0.0
+    The job shows as pending/paused meanwhile.
+
+    Restores the job's status once calls are let through again. Raises JobCancelled if the job is
+    cancelled meanwhile. Raises CircuitOpen once the job has been parked for MODEL_PARK_MAX_SECONDS
+    in total, or more than MODEL_PARK_MAX_CYCLES times after one of its own calls failed, so a
+    persistent failure (e.g. a bad API key) fails the job instead of cycling through probes forever.
+    """
+    wait = model_wait_remaining()
+    if wait <= 0:
+        return
+    with _parked_lock:
+        ledger = PARKED_JOBS.setdefault(job_id, {"seconds": 0.0, "cycles": 0})
+        ledger["cycles"] += after_failure
+        parked_before, cycles = ledger["seconds"], ledger["cycles"]
+    if cycles > MODEL_PARK_MAX_CYCLES:
+        raise circuit_breaker.CircuitOpen(wait, f"reopened after {MODEL_PARK_MAX_CYCLES} parks of this job")
+    if parked_before >= MODEL_PARK_MAX_SECONDS:
+        raise circuit_breaker.CircuitOpen(wait, f"job already parked for {MODEL_PARK_MAX_SECONDS:.0f}s")
+    parked_at = time.time()
+    row = get_db().execute("SELECT status, current_task FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    STATE.incr("jobs.parked")
+    print(f"--- Job {job_id} parked: model unavailable or rate-limited (retry in {wait:.0f}s). ---")
+    update_job_status(job_id, "pending", "Paused: the AI model is unavailable right now. "
+                                         "The plan resumes automatically when it recovers...")
+    try:
+        with trace_span("job.parked"):
+            while wait > 0:
+                if job_cancelled(job_id):
+                    raise JobCancelled(job_id)
+                if parked_before + time.time() - parked_at >= MODEL_PARK_MAX_SECONDS:
+                    raise circuit_breaker.CircuitOpen(wait, "still open after parking the job for "
+                                                            f"{MODEL_PARK_MAX_SECONDS:.0f}s")
+                time.sleep(min(wait, PARK_POLL_SECONDS))
+                wait = model_wait_remaining()
+    finally:
+        with _parked_lock:
+            ledger["seconds"] += time.time() - parked_at
+    if row:
+        update_job_status(job_id, row["status"], row["current_task"])
+
+# --- Model call scheduling: priority classes + per-client fair queuing ---
+# interactive: a user is waiting on the response (validate-provisional, any request-thread call)
+# critical:    a job's first pass and its final summary/report
+# revision:    revision rounds after the QA critic asked for changes
+MODEL_SCHEDULER = model_scheduler.ModelCallScheduler(
+    capacity=int(os.environ.get("MODEL_MAX_CONCURRENCY", "4")),  # <= 0 disables scheduling
+    reserved_interactive=int(os.environ.get("MODEL_INTERACTIVE_RESERVED", "1")),
+    starvation_seconds=float(os.environ.get("MODEL_STARVATION_SECONDS", "30")),
+    weights=json.loads(os.environ.get("MODEL_CLIENT_WEIGHTS", "{}")),  # {"<client id>": weight}
+)
+FINAL_AGENTS = {"agent_executive_summarizer", "agent_report_synthesizer"}
+
+# Addresses of reverse proxies whose X-Forwarded-For is believed, e.g. "127.0.0.1,10.0.0.5".
+TRUSTED_PROXIES = {p.strip() for p in os.environ.get("TRUSTED_PROXIES", "").split(",") if p.strip()}
+
+def request_client_id():
+    """Fair-queuing identity for the current request: a hash of its API key, else its address.
+
+    X-Forwarded-For only counts when the request arrived from a TRUSTED_PROXIES address, and then
+    the nearest hop that isn't a trusted proxy is used, so clients can't pick their own bucket.
+    """
+    key = request.headers.get("X-API-Key") or request.headers.get("Authorization")
+    if key:
+        return "key:" + hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+    address = request.remote_addr or "unknown"
+    if address in TRUSTED_PROXIES:
+        for hop in reversed(request.headers.get("X-Forwarded-For", "").split(",")):
+            if hop.strip():
+                address = hop.strip()
+                if address not in TRUSTED_PROXIES:
+                    break
+    return f"ip:{address}"
+
+def call_class(agent):
+    """(priority class, client id) for a model call made from the current thread."""
+    if flask.has_request_context():
+        return "interactive", request_client_id()
+    client = getattr(job_context, "client_id", None) or "anonymous"
+    if getattr(job_context, "job_id", None) is None:
+        return "interactive", client
+    if getattr(job_context, "revision", 0) and agent not in FINAL_AGENTS:
+        return "revision", client
+    return "critical", client
+
+def generate_and_record(model, prompt, agent):
+    """Waits for a scheduler slot, then calls the model (see _generate_with_deadline).
+
+    Raises CircuitOpen straight away, without queueing, while the model circuit is open or the
+    shared rate-limit cooldown (set by any worker) is running.
+    """
+    priority, client = call_class(agent)
+    job_id = getattr(job_context, "job_id", None) if priority != "interactive" else None
+    queued_at = time.time()
+    try:
+        cooldown = cooldown_remaining()
+        if cooldown > 0:
+            raise circuit_breaker.CircuitOpen(cooldown, "shared rate-limit cooldown")
+        MODEL_BREAKER.check()
+        with MODEL_SCHEDULER.slot(priority, client, should_abort=lambda: job_cancelled(job_id)) as waited:
+            if waited >= 0.005 and TRACER.current() is not None:
+                TRACER.record("model.queue_wait", queued_at, queued_at + waited, agent=agent,
+                              job_id=job_id, priority=priority, client=client)
+            if waited >= 1.0:
+                print(f"[scheduler] {agent} ({priority}, {client}) waited {waited:.1f}s for a model slot.")
+            slow_after = resolve_route(agent)["deadline_seconds"] * MODEL_SLOW_CALL_FRACTION
+            with MODEL_BREAKER.guard(slow_after=slow_after):
+                return _generate_with_deadline(model, prompt, agent)
+    except model_scheduler.SchedulerAborted:
+        STATE.incr("jobs.cancelled_calls_dropped")
+        raise JobCancelled(job_id)
+    except circuit_breaker.CircuitOpen:
+        STATE.incr("model.circuit_rejected")
+        raise
+    except Exception as e:
+        note_model_error(e)
+        raise
+
+def job_tokens_used(job_id):
+    row = get_db().execute("SELECT COALESCE(SUM(total_tokens), 0) FROM token_usage WHERE job_id = ?", (job_id,)).fetchone()
+    return row[0]
+
+# Range form so the created_at index is usable; both placeholders take the same day (or NULL).
+USAGE_DAY_FILTER = "created_at >= COALESCE(?, date('now')) AND created_at < date(COALESCE(?, date('now')), '+1 day')"
+
+def daily_tokens_used(day=None):
+    """Tokens used on a UTC day ('YYYY-MM-DD', default today)."""
+    row = get_db().execute(
+        f"SELECT COALESCE(SUM(total_tokens), 0) FROM token_usage WHERE {USAGE_DAY_FILTER}",
+        (day, day)
+    ).fetchone()
+    return row[0]
+
+def daily_budget_exhausted():
+    return DAILY_TOKEN_BUDGET > 0 and daily_tokens_used() >= DAILY_TOKEN_BUDGET
+
+def call_model(prompt, agent=None):
+    """Sends one prompt to the model and returns the response text.
+
+    Inside a batch, first-pass prompts are single-flighted: the first job to send a given
+    prompt calls the model and every other job in the batch waits for and reuses its answer
+    (if that call fails, or is still pending past the agent's deadline, each waiting job makes
+    the call itself).
+    In a background job, a call refused by the open model circuit or the shared rate-limit
+    cooldown parks the job until calls are let through again, then retries. A rate-limited
+    response sets that cooldown, so it parks too; unavailable responses are retried up to
+    MODEL_TRANSIENT_RETRIES times (parking instead of backing off if they opened the circuit).
+    Parking is capped per job (see park_while_circuit_open); past the cap the call raises CircuitOpen.
+    """
+    attempt = 0
+    while True:
+        try:
+            return _call_model_once(prompt, agent)
+        except Exception as e:
+            job_id = getattr(job_context, "job_id", None)
+            refused = isinstance(e, circuit_breaker.CircuitOpen)
+            if job_id is None:
+                raise
+            if not refused:
+                kind = circuit_breaker.classify(e)
+                if kind in circuit_breaker.TRIPPING_KINDS and model_wait_remaining() > 0:
+                    pass  # this failure (or another worker's) opened the circuit or set the cooldown: park
+                elif kind in RETRYABLE_ERROR_KINDS and attempt < MODEL_TRANSIENT_RETRIES:
+                    attempt += 1
+                    STATE.incr("model.transient_retries")
+                    print(f"[retry] {agent} failed ({kind}: {e}); retry {attempt}/{MODEL_TRANSIENT_RETRIES}.")
+                    with trace_span("sleep.retry_backoff", attempt=attempt):
+                        time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+                    continue
+                else:
+                    raise
+            park_while_circuit_open(job_id, after_failure=not refused)
+
+def _call_model_once(prompt, agent):
+    raise_if_cancelled()
+    model = get_model_for(agent)
+    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    batch_id = getattr(job_context, "batch_id", None)
+    if not batch_id or getattr(job_context, "revision", 0) != 0:
+        return generate_and_record(model, prompt, agent)
+
+    key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    with BATCH_CACHE_LOCK:
+        cache = BATCH_PROMPT_CACHES.get(batch_id)
+    if cache is None:
+        return generate_and_record(model, prompt, agent)
+
+    with BATCH_CACHE_LOCK:
+        stats = BATCH_PROMPT_STATS.setdefault(batch_id, {"calls": 0, "shared": 0})
+        entry = cache.get(key)
+        owner = entry is None
+        if owner:
+            entry = cache[key] = {"event": threading.Event(), "text": None, "error": None,
+                                  "started": time.monotonic()}
+            stats["calls"] += 1
+        else:
+            stats["shared"] += 1
+
+    if not owner:
+        # Wait in short steps so a cancelled job stops here, and stop waiting on an owner that is
+        # stuck (queued, parked) past the agent's deadline: then this job makes the call itself.
+        deadline = entry["started"] + resolve_route(agent)["deadline_seconds"]
+        while not entry["event"].wait(timeout=SHARED_PROMPT_POLL_SECONDS):
+            raise_if_cancelled()
+            if time.monotonic() >= deadline:
+                STATE.incr("batch.shared_wait_timeouts")
+                print(f"[batch {batch_id}] Shared call for {agent} is overdue; calling the model directly.")
+                return generate_and_record(model, prompt, agent)
+        if entry["error"] is not None:
+            # The owner's failure (or cancellation) is its own; make the call ourselves instead.
+            return _call_model_once(prompt, agent)
+        print(f"[batch {batch_id}] Reused shared response for {agent}")
+        return entry["text"]
+
+    try:
+        entry["text"] = generate_and_record(model, prompt, agent)
+        return entry["text"]
+    except Exception as e:
+        entry["error"] = e
+        with BATCH_CACHE_LOCK:
+            # Don't pin a transient failure on the rest of the batch; later callers retry.
+            cache.pop(key, None)
+        raise
+    finally:
+        entry["event"].set()
 
 # --- JSON Parsing Helper ---
+@traced("json.parse")
 def clean_json_response(text):
     """Cleans the model's text output to get a valid JSON string."""
     start_match = re.search(r'[\{\[]', text)
@@ -311,9 +1186,10 @@ def clean_json_response(text):
 
 # --- AI Agent Definitions (ALL 15 AGENTS) ---
 
+@traced(kind="agent")
 def agent_chief_strategist(form_data):
     """Agent 1: Defines SMART goals."""
-    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
     prompt = f"""
     You are the Chief Strategist. Analyze the project brief and define 3-5 SMART goals.
     PROJECT BRIEF:
@@ -323,24 +1199,24 @@ def agent_chief_strategist(form_data):
     Return *only* a JSON list of strings.
     Example: ["Achieve 10,000 active users within 6 months post-launch."]
     """
-    response = model.generate_content(prompt)
-    return clean_json_response(response.text)
+    return clean_json_response(call_model(prompt, agent="agent_chief_strategist"))
 
+@traced(kind="agent")
 def agent_market_analyst(form_data):
     """Agent 2: Analyzes competitors."""
-    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
     prompt = f"""
     You are the Market Analyst. Analyze the user's known competitors and provide a 1-sentence summary of their primary strength, based on your existing knowledge.
     KNOWN COMPETITORS: {form_data.get('competitors')}
     Return *only* a JSON object mapping the competitor to their strength.
     Example: {{"Glassdoor": "Strong brand recognition and user-generated salary data."}}
     """
-    response = model.generate_content(prompt)
-    return clean_json_response(response.text)
+    return clean_json_response(call_model(prompt, agent="agent_market_analyst"))
 
+@traced(kind="agent")
 def agent_solutions_architect(form_data, smart_goals):
     """Agent 3: Creates the Work Breakdown Structure (WBS)."""
-    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
     prompt = f"""
     You are the Solutions Architect. Create a high-level Work Breakdown Structure (WBS) to achieve the project's SMART goals.
     PROJECT NAME: {form_data.get('name')}
@@ -352,12 +1228,12 @@ def agent_solutions_architect(form_data, smart_goals):
         {{"id": "3.0", "task": "Phase 3: Core AI & Backend Development", "short_name": "3.0 Backend Dev"}}
     ]
     """
-    response = model.generate_content(prompt)
-    return clean_json_response(response.text)
+    return clean_json_response(call_model(prompt, agent="agent_solutions_architect"))
 
+@traced(kind="agent")
 def agent_product_owner(wbs):
     """Agent 4: Drafts Functional Requirements."""
-    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
     # 3. NEW PROMPT: Changed from User Stories to Requirements
     prompt = f"""
     You are the Product Owner. Based on the WBS, draft 3-5 high-level functional requirements in the format "The user must be able to..."
@@ -368,12 +1244,12 @@ def agent_product_owner(wbs):
         {{"id": "FR-02", "requirement": "The user must be able to view local grocery sales related to their meal plan.", "criteria": "App must integrate with at least 3 major grocery chains."}}
     ]
     """
-    response = model.generate_content(prompt)
-    return clean_json_response(response.text)
+    return clean_json_response(call_model(prompt, agent="agent_product_owner"))
 
+@traced(kind="agent")
 def agent_project_scheduler(wbs):
     """Agent 5: Defines Key Milestones AND a simple timeline."""
-    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
     prompt = f"""
     You are the Project Scheduler. Based on the WBS, define 3-4 key milestones AND a timeline estimate (in weeks) for each WBS task.
     WBS: {json.dumps(wbs)}
@@ -392,12 +1268,12 @@ def agent_project_scheduler(wbs):
         ]
     }}
     """
-    response = model.generate_content(prompt)
-    return clean_json_response(response.text)
+    return clean_json_response(call_model(prompt, agent="agent_project_scheduler"))
 
+@traced(kind="agent")
 def agent_growth_planner(smart_goals):
     """Agent 5.5: Creates user adoption forecast."""
-    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
     prompt = f"""
     You are the Growth Planner. Based on the SMART goals, create a 6-month user adoption forecast.
     SMART GOALS: {json.dumps(smart_goals)}
@@ -407,13 +1283,13 @@ def agent_growth_planner(smart_goals):
         "values": [1000, 2500, 5000, 8000, 12000, 15000]
     }}
     """
-    response = model.generate_content(prompt)
-    return clean_json_response(response.text)
+    return clean_json_response(call_model(prompt, agent="agent_growth_planner"))
 
 
+@traced(kind="agent")
 def agent_finance_manager(form_data, wbs):
     """Agent 6: Creates a high-level budget estimate."""
-    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
     prompt = f"""
     You are the Finance & Resource Manager. Create a high-level estimated budget breakdown based on the WBS.
     PROJECT NAME: {form_data.get('name')}
@@ -430,12 +1306,12 @@ def agent_finance_manager(form_data, wbs):
         ]
     }}
     """
-    response = model.generate_content(prompt)
-    return clean_json_response(response.text)
+    return clean_json_response(call_model(prompt, agent="agent_finance_manager"))
 
+@traced(kind="agent")
 def agent_risk_analyst(form_data, competitor_analysis):
     """Agent 7: Identifies risks."""
-    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
     prompt = f"""
     You are the Risk Analyst. Based on the project brief and competitor analysis, identify the top 3-4 potential risks.
     PROJECT NAME: {form_data.get('name')}
@@ -445,12 +1321,12 @@ def agent_risk_analyst(form_data, competitor_analysis):
         {{"risk": "Scope creep from undefined features", "impact": "High", "mitigation": "Establish a formal change control process."}}
     ]
     """
-    response = model.generate_content(prompt)
-    return clean_json_response(response.text)
+    return clean_json_response(call_model(prompt, agent="agent_risk_analyst"))
 
+@traced(kind="agent")
 def agent_communications_lead(form_data):
     """Agent 8: Plans stakeholder communication."""
-    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
     prompt = f"""
     You are the Communications Lead. Create a simple communication plan for key stakeholders.
     AUDIENCE: {form_data.get('audience')}
@@ -459,12 +1335,12 @@ def agent_communications_lead(form_data):
         {{"stakeholder": "Project Sponsor", "frequency": "Bi-weekly", "method": "Email Update", "purpose": "Budget and milestone review."}}
     ]
     """
-    response = model.generate_content(prompt)
-    return clean_json_response(response.text)
+    return clean_json_response(call_model(prompt, agent="agent_communications_lead"))
 
+@traced(kind="agent")
 def agent_quality_assurance_lead(smart_goals, requirements):
     """Agent 9: Defines high-level QA plan."""
-    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
     # 3. NEW PROMPT: Takes 'requirements' instead of 'user_stories'
     prompt = f"""
     You are the QA Lead. Define a high-level quality plan based on the goals and functional requirements.
@@ -476,12 +1352,12 @@ def agent_quality_assurance_lead(smart_goals, requirements):
         {{"metric": "Requirement Acceptance", "target": "100% of criteria met for all FRs."}}
     ]
     """
-    response = model.generate_content(prompt)
-    return clean_json_response(response.text)
+    return clean_json_response(call_model(prompt, agent="agent_quality_assurance_lead"))
 
+@traced(kind="agent")
 def agent_change_control(form_data):
     """Agent 10: Establishes a change control process."""
-    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
     prompt = f"""
     You are the Change Control Agent. Define a simple, 3-step change control process for this project.
     PROJECT NAME: {form_data.get('name')}
@@ -492,22 +1368,229 @@ def agent_change_control(form_data):
         "step3": "Approve or deny CR. All approved changes are added to the backlog."
     }}
     """
-    response = model.generate_content(prompt)
-    return clean_json_response(response.text)
+    return clean_json_response(call_model(prompt, agent="agent_change_control"))
+
+# --- Fused agents: several sections in one structured request ---
+# Used when fused mode is on (FUSED_AGENT_CALLS=on or form_data["fused_mode"]). Each returned
+# section is validated on its own; anything missing or malformed is re-run by its individual agent.
+FUSED_MODE_DEFAULT = os.environ.get("FUSED_AGENT_CALLS", "off") == "on"
+
+FUSED_BRIEF_SCHEMA = {
+    "smartGoals": lambda v: isinstance(v, list) and all(isinstance(g, str) for g in v) and v,
+    "competitorAnalysis": lambda v: isinstance(v, dict),
+    "communicationsPlan": lambda v: isinstance(v, list) and all(isinstance(i, dict) for i in v),
+    "changeControlPlan": lambda v: isinstance(v, dict) and v,
+}
+FUSED_PLAN_SCHEMA = {
+    "requirements": lambda v: isinstance(v, list) and all(isinstance(i, dict) for i in v) and v,
+    "scheduler_output": lambda v: isinstance(v, dict) and isinstance(v.get("timeline"), list) and "milestones" in v,
+    "user_growth": lambda v: isinstance(v, dict) and isinstance(v.get("labels"), list) and isinstance(v.get("values"), list),
+    "budget": lambda v: isinstance(v, dict) and isinstance(v.get("breakdown"), list) and "totalEstimate" in v,
+    "risks": lambda v: isinstance(v, list) and all(isinstance(i, dict) for i in v),
+    "qaPlan": lambda v: isinstance(v, list) and all(isinstance(i, dict) for i in v),
+}
 
-def agent_qa_critic(council_results):
-    """Agent 11: Reviews all previous outputs for conflicts."""
-    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
-    
-    all_outputs_summary = json.dumps(council_results, indent=2)
-    
+def fused_mode_enabled(form_data):
+    return bool(form_data.get("fused_mode", FUSED_MODE_DEFAULT))
+
+@traced(kind="agent")
+def agent_fused_brief_sections(form_data):
+    """Fused Agents 1, 2, 8, 10: SMART goals, competitors, comms plan and change control."""
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
     prompt = f"""
-    You are the QA Critic. Your job is to review the *entire* plan generated by the other agents for any obvious conflicts, gaps, or misalignments.
-    
-    FULL PLAN:
-    {all_outputs_summary}
-    
-    Analyze the plan. Are there any major conflicts? (e.g., "The budget seems too low for the WBS" or "A key risk was missed").
+    You are a project council producing four independent sections of a project plan in one reply.
+    PROJECT BRIEF:
+    - Name: {form_data.get('name')}
+    - Purpose: {form_data.get('purpose')}
+    - Audience: {form_data.get('audience')}
+    - Known competitors: {form_data.get('competitors')}
+
+    Return *only* a JSON object with exactly these keys:
+    - "smartGoals": a JSON list of 3-5 SMART goal strings.
+    - "competitorAnalysis": a JSON object mapping each known competitor to a 1-sentence summary of their primary strength.
+    - "communicationsPlan": a JSON list of communication items for key stakeholders of the audience, each with "stakeholder", "frequency", "method" and "purpose".
+    - "changeControlPlan": a JSON object with "step1", "step2" and "step3" describing a simple change control process.
+    Example: {{
+        "smartGoals": ["Achieve 10,000 active users within 6 months post-launch."],
+        "competitorAnalysis": {{"Glassdoor": "Strong brand recognition and user-generated salary data."}},
+        "communicationsPlan": [{{"stakeholder": "Project Sponsor", "frequency": "Bi-weekly", "method": "Email Update", "purpose": "Budget and milestone review."}}],
+        "changeControlPlan": {{"step1": "Submit a formal Change Request (CR) document.", "step2": "Review CR for impact on budget, schedule, and scope.", "step3": "Approve or deny CR."}}
+    }}
+    """
+    return clean_json_response(call_model(prompt, agent="agent_fused_brief_sections"))
+
+@traced(kind="agent")
+def agent_fused_plan_sections(form_data, council_results):
+    """Fused Agents 4, 5, 5.5, 6, 7, 9: everything that only needs the WBS, goals and competitors."""
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    prompt = f"""
+    You are a project council producing six sections of a project plan in one reply.
+    PROJECT NAME: {form_data.get('name')}
+    SMART GOALS: {json.dumps(council_results.get('smartGoals'))}
+    COMPETITORS: {json.dumps(council_results.get('competitorAnalysis'))}
+    WBS: {json.dumps(council_results.get('wbs'))}
+
+    Return *only* a JSON object with exactly these keys:
+    - "requirements": 3-5 functional requirements, each {{"id", "requirement" ("The user must be able to..."), "criteria"}}.
+    - "scheduler_output": {{"milestones": {{3-4 named milestones}}, "timeline": [{{"task": <WBS short_name>, "start_week", "duration_weeks"}} for every WBS phase]}}.
+    - "user_growth": a 6-month user adoption forecast {{"labels": [6 month labels], "values": [6 numbers]}}.
+    - "budget": {{"totalEstimate": "$X - $Y", "breakdown": [{{"item": <WBS short_name>, "cost": <number>}} ..., {{"item": "Contingency (15%)", "cost": <number>}}]}}.
+    - "risks": the top 3-4 risks, each {{"risk", "impact", "mitigation"}}.
+    - "qaPlan": key quality metrics based on the goals and your requirements, each {{"metric", "target"}}.
+    Example: {{
+        "requirements": [{{"id": "FR-01", "requirement": "The user must be able to generate personalized meal plans.", "criteria": "Profile includes allergies and calorie goals."}}],
+        "scheduler_output": {{"milestones": {{"Milestone 1": "Design complete"}}, "timeline": [{{"task": "1.0 Planning", "start_week": 1, "duration_weeks": 3}}]}},
+        "user_growth": {{"labels": ["Month 1", "Month 2", "Month 3", "Month 4", "Month 5", "Month 6"], "values": [1000, 2500, 5000, 8000, 12000, 15000]}},
+        "budget": {{"totalEstimate": "$30,000 - $45,000", "breakdown": [{{"item": "1.0 Planning", "cost": 5000}}, {{"item": "Contingency (15%)", "cost": 750}}]}},
+        "risks": [{{"risk": "Scope creep from undefined features", "impact": "High", "mitigation": "Establish a formal change control process."}}],
+        "qaPlan": [{{"metric": "Requirement Acceptance", "target": "100% of criteria met for all FRs."}}]
+    }}
+    """
+    return clean_json_response(call_model(prompt, agent="agent_fused_plan_sections"))
+
+def run_fused_agent(agent_fn, schema, *args):
+    """Runs a fused agent and returns only the sections that pass validation ({} on failure)."""
+    try:
+        result = agent_fn(*args)
+    except JobCancelled:
+        raise
+    except Exception as e:
+        print(f"--- Fused call {agent_fn.__name__} failed ({e}); falling back to individual agents. ---")
+        STATE.incr("fused.calls_failed")
+        return {}
+    if not isinstance(result, dict):
+        result = {}
+    sections = {key: result[key] for key, is_valid in schema.items() if key in result and is_valid(result[key])}
+    missing = sorted(set(schema) - set(sections))
+    if missing:
+        print(f"--- Fused call {agent_fn.__name__} missing/invalid sections {missing}; running them individually. ---")
+    STATE.incr("fused.sections_ok", len(sections))
+    STATE.incr("fused.sections_fallback", len(missing))
+    return sections
+
+# --- Section-level QA critic ---
+# The plan is reviewed as independent scopes: a section, or a pair of sections that must agree.
+# Verdicts are cached by a hash of each scope's prompt (its sections plus the brief), so revision
+# rounds and warm-started or batched jobs only re-review scopes whose content changed. Scopes
+# still to review run in parallel.
+CRITIC_PARALLELISM = int(os.environ.get("CRITIC_PARALLELISM", "4"))
+CRITIC_CACHE_SIZE = int(os.environ.get("CRITIC_CACHE_SIZE", "512"))
+CRITIC_POOL = ThreadPoolExecutor(max_workers=max(1, CRITIC_PARALLELISM), thread_name_prefix="critic")
+_critic_cache = OrderedDict()  # prompt hash -> findings, least recently used first
+_critic_cache_lock = threading.Lock()
+
+# scope -> (sections reviewed together, what to check)
+CRITIC_SCOPES = {
+    "goals_vs_growth": (("smartGoals", "user_growth"),
+                        "Check that the goals are SMART and the user growth targets match them."),
+    "market_vs_risks": (("competitorAnalysis", "risks"),
+                        "Check that the risks cover the competitive threats and each has a mitigation."),
+    "wbs_vs_budget": (("wbs", "budget"),
+                      "Check that the budget covers every WBS item and is realistic for that scope of work."),
+    "wbs_vs_schedule": (("wbs", "scheduler_output"),
+                        "Check that the timeline schedules every WBS item with plausible durations and order."),
+    "wbs_vs_requirements": (("wbs", "requirements"),
+                            "Check that the requirements are covered by the WBS and nothing in the WBS lacks a purpose."),
+    "requirements_vs_qa": (("requirements", "qaPlan"),
+                           "Check that the QA plan has measurable targets covering the key requirements."),
+    "communications": (("communicationsPlan",),
+                       "Check that the communications plan reaches the audience and stakeholders in the brief."),
+    "change_control": (("changeControlPlan",),
+                       "Check that the change control process is complete and workable."),
+}
+CRITIC_UNSCOPED = {"initialBrief", "qaCriticFindings"}
+# Scopes whose consistency plan_analytics checks deterministically. When every hard check passes
+# they aren't sent to the model; failed hard checks are reported as findings directly.
+ANALYTICS_CHECKED_SCOPES = ("wbs_vs_budget", "wbs_vs_schedule")
+ANALYTICS_CRITIC_SHORTCUT = os.environ.get("ANALYTICS_CRITIC_SHORTCUT", "on") != "off"
+
+def critic_scopes(council_results):
+    """CRITIC_SCOPES, plus an 'other' scope for any section the scopes don't cover (e.g. added by the reviser)."""
+    scopes = {name: sections for name, (sections, _) in CRITIC_SCOPES.items()}
+    covered = {section for sections in scopes.values() for section in sections} | CRITIC_UNSCOPED
+    extra = tuple(key for key in council_results if key not in covered)
+    if extra:
+        scopes["other"] = extra
+    return scopes
+
+@traced(kind="agent")
+def agent_qa_critic(council_results):
+    """Agent 11: Reviews the plan scope by scope for conflicts, re-reviewing only what changed."""
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    analytics = plan_analytics.analyze(council_results)
+    hard_failures = [f"Finding: {c['message']}" for c in analytics["checks"] if c["severity"] == "hard" and not c["ok"]]
+    scopes = critic_scopes(council_results)
+    if ANALYTICS_CRITIC_SHORTCUT and not hard_failures:
+        skipped = [scope for scope in ANALYTICS_CHECKED_SCOPES if scope in scopes]
+        for scope in skipped:
+            del scopes[scope]
+        STATE.incr("critic.scopes_skipped", len(skipped))
+    STATE.incr("critic.hard_check_failures", len(hard_failures))
+    prompts = {scope: build_critic_prompt(council_results, scope) for scope in scopes}
+    keys = {scope: hashlib.sha256(prompt.encode("utf-8")).hexdigest() for scope, prompt in prompts.items()}
+    verdicts = {}
+    with _critic_cache_lock:
+        for scope, key in keys.items():
+            if key in _critic_cache:
+                _critic_cache.move_to_end(key)
+                verdicts[scope] = _critic_cache[key]
+    stale = [scope for scope in prompts if scope not in verdicts]
+    STATE.incr("critic.scopes_cached", len(verdicts))
+    STATE.incr("critic.scopes_reviewed", len(stale))
+    print(f"--- QA Critic: {len(hard_failures)} hard check failures; reviewing {len(stale)} of {len(prompts)} scopes "
+          f"({', '.join(stale) or 'none'}); {len(verdicts)} unchanged since their last review. ---")
+
+    context = (getattr(job_context, "job_id", None), getattr(job_context, "batch_id", None),
+               getattr(job_context, "revision", 0), getattr(job_context, "client_id", None))
+    parent = TRACER.current()
+    futures = {scope: CRITIC_POOL.submit(_review_scope, context, parent, scope, prompts[scope]) for scope in stale}
+    errors = []
+    for scope, future in futures.items():
+        try:
+            verdicts[scope] = future.result()
+        except Exception as e:
+            errors.append(e)
+            continue
+        with _critic_cache_lock:
+            _critic_cache[keys[scope]] = verdicts[scope]
+            while len(_critic_cache) > CRITIC_CACHE_SIZE:
+                _critic_cache.popitem(last=False)
+    if errors:
+        # A cancellation wins over other failures, so the job is stopped rather than failed.
+        raise next((e for e in errors if isinstance(e, JobCancelled)), errors[0])
+    return hard_failures + [finding for scope in prompts for finding in verdicts[scope]]
+
+def _review_scope(context, parent, scope, prompt):
+    """Runs one scope review on a critic pool thread, on behalf of the job in `context`."""
+    job_context.job_id, job_context.batch_id, job_context.revision, job_context.client_id = context
+    try:
+        with TRACER.span("critic.review", parent=parent, trace_key=context[0], job_id=context[0],
+                         revision=context[2], scope=scope):
+            findings = clean_json_response(call_model(prompt, agent="agent_qa_critic"))
+        if not isinstance(findings, list):
+            findings = [findings] if findings else []
+        return findings
+    finally:
+        job_context.__dict__.clear()  # pool threads are reused by other jobs
+
+def build_critic_prompt(council_results, scope):
+    sections = critic_scopes(council_results)[scope]
+    focus = CRITIC_SCOPES[scope][1] if scope in CRITIC_SCOPES else "Check these sections for gaps and inconsistencies."
+    brief = council_results.get("initialBrief") or {}
+    brief_summary = json.dumps({field: brief.get(field) for field in brief_similarity.BRIEF_FIELDS}, indent=2)
+    sections_json = json.dumps({section: council_results.get(section) for section in sections}, indent=2)
+
+    return f"""
+    You are the QA Critic. Your job is to review one part of a project plan generated by the other agents for any obvious conflicts, gaps, or misalignments.
+    {focus}
+    Other parts of the plan are reviewed separately; only report problems within or between the sections below.
+
+    PROJECT BRIEF:
+    {brief_summary}
+
+    PLAN SECTIONS UNDER REVIEW:
+    {sections_json}
+
     Return *only* a JSON list of strings, with your findings. **If no conflicts are found, return an empty list.**
     Example of findings: [
         "Finding: The budget for '$25k-$40k' appears low for a WBS that includes 'Phase 3: Development' without more scoping. This is a potential risk.",
@@ -515,23 +1598,28 @@ def agent_qa_critic(council_results):
     ]
     Example of no findings: []
     """
-    response = model.generate_content(prompt)
-    return clean_json_response(response.text)
 
 # 1. --- NEW AGENT 12: EXECUTIVE SUMMARIZER ---
+@traced(kind="agent")
 def agent_executive_summarizer(council_results):
     """Agent 12: Writes the statistics-heavy summary for the dashboard."""
-    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
-    
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    return call_model(build_summarizer_prompt(council_results), agent="agent_executive_summarizer")
+
+def build_summarizer_prompt(council_results):
     summary_data = json.dumps(council_results, indent=2)
+    computed = "\n    ".join(plan_analytics.summary_lines(plan_analytics.analyze(council_results))) or "(none)"
     
-    prompt = f"""
+    return f"""
     You are an Executive Summarizer. Your job is to create a text-only summary for a project dashboard.
     This summary must be concise, statistics-heavy, and focused on actionable insights.
     DO NOT include any graphs, charts, or markdown tables. Use bullet points for lists.
     
     FULL PLAN DATA:
     {summary_data}
+
+    COMPUTED FIGURES (calculated exactly from the plan data; copy these numbers, do not recalculate them):
+    {computed}
     
     Return *only* a Markdown string for the summary.
     Limit your rsponse to 120 words.
@@ -544,17 +1632,18 @@ def agent_executive_summarizer(council_results):
     - **Key Goal (Utility):** [e.g., "$40/mo Average User Savings"]
     - **Critical Path:** [e.g., "3.0 Core AI/ML Dev (8 Weeks)"]
         """
-    response = model.generate_content(prompt)
-    return response.text
 
+@traced(kind="agent")
 def agent_reviser(council_results, qa_findings):
     """Agent 13: Attempts to fix the plan based on the Critic's findings."""
-    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
-    
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    return clean_json_response(call_model(build_reviser_prompt(council_results, qa_findings), agent="agent_reviser"))
+
+def build_reviser_prompt(council_results, qa_findings):
     plan_json = json.dumps(council_results, indent=2)
     findings_json = json.dumps(qa_findings, indent=2)
 
-    prompt = f"""
+    return f"""
     You are the Project Reviser. Your job is to fix a project plan that was rejected by the QA Critic.
     You will receive the full plan as a JSON object and a list of the Critic's findings.
     
@@ -571,14 +1660,18 @@ def agent_reviser(council_results, qa_findings):
     
     Return *only* the new, fixed JSON object for the entire plan.
     """
-    response = model.generate_content(prompt)
-    return clean_json_response(response.text)
-    
 
+@traced(kind="agent")
 def agent_report_synthesizer(council_results):
     """Agent 14: Assembles the final report, including chart data."""
-    if not model: raise EnvironmentError("GEMINI_API_KEY is not configured.")
-    
+    if not get_model(): raise EnvironmentError("GEMINI_API_KEY is not configured.")
+    return call_model(build_synthesizer_prompt(council_results), agent="agent_report_synthesizer")
+
+# --- Report building blocks (pure; benchmarked by bench_hot_paths.py) ---
+GANTT_TOTAL_WEEKS = 36
+
+def build_chart_blocks(council_results):
+    """The chart <canvas> tags and Gantt table the synthesizer must embed, keyed by block name."""
     # --- 1. Extract data for charts (using new short_names) ---
     try:
         budget_labels = [item['item'] for item in council_results.get('budget', {}).get('breakdown', [])]
@@ -622,30 +1715,42 @@ def agent_report_synthesizer(council_results):
     </canvas>
     """
     
-    # --- GANTT CHART HTML ---
-    gantt_html = '<div class="gantt-chart-container">\n<table class="gantt-chart">\n<thead>\n<tr>\n<th>Task (WBS)</th>'
-    total_weeks = 36
+    return {
+        "user_growth_chart_html": user_growth_chart_html,
+        "gantt_html": build_gantt_html(timeline_data, council_results.get('wbs', [])),
+        "budget_chart_html": budget_chart_html,
+    }
+
+def build_gantt_html(timeline_data, wbs):
+    """The Gantt table; rows show the full WBS task name when the short name matches one."""
+    full_names = {}
+    for wbs_item in wbs:
+        full_names.setdefault(wbs_item.get('short_name'), wbs_item.get('task'))
+    parts = ['<div class="gantt-chart-container">\n<table class="gantt-chart">\n<thead>\n<tr>\n<th>Task (WBS)</th>']
     for i in range(1, 10):
-        gantt_html += f'<th colspan="4">Weeks {(i-1)*4+1}-{i*4}</th>'
-    gantt_html += '\n</tr>\n</thead>\n<tbody>\n'
+        parts.append(f'<th colspan="4">Weeks {(i-1)*4+1}-{i*4}</th>')
+    parts.append('\n</tr>\n</thead>\n<tbody>\n')
     
     for item in timeline_data:
         task_name = item.get('task', 'Unnamed Task')
         start = item.get('start_week', 1)
         duration = item.get('duration_weeks', 1)
-        full_task_name = next((wbs_item['task'] for wbs_item in council_results.get('wbs', []) if wbs_item['short_name'] == task_name), task_name)
+        full_task_name = full_names.get(task_name, task_name)
         
-        gantt_html += f'<tr>\n<td>{full_task_name}</td>\n'
-        gantt_html += f'<td colspan="{total_weeks}" class="gantt-row">\n'
-        gantt_html += f'    <span data-start-week="{start}" data-duration="{duration}" data-label="{duration} Weeks"></span>\n'
-        gantt_html += '</td>\n</tr>\n'
+        parts.append(f'<tr>\n<td>{full_task_name}</td>\n')
+        parts.append(f'<td colspan="{GANTT_TOTAL_WEEKS}" class="gantt-row">\n')
+        parts.append(f'    <span data-start-week="{start}" data-duration="{duration}" data-label="{duration} Weeks"></span>\n')
+        parts.append('</td>\n</tr>\n')
         
-    gantt_html += '</tbody>\n</table>\n</div>'
+    parts.append('</tbody>\n</table>\n</div>')
+    return "".join(parts)
 
+def build_synthesizer_prompt(council_results):
+    blocks = build_chart_blocks(council_results)
 
     # --- 3. Construct the Final Prompt for the Synthesizer ---
     all_outputs_summary = json.dumps(council_results, indent=2)
-    prompt = f"""
+    return f"""
     You are the Report Synthesizer, a professional project manager and technical writer.
     Your final task is to take all the JSON data generated by the other AI agents and write a single, comprehensive, and human-readable project plan.
     
@@ -660,13 +1765,13 @@ def agent_report_synthesizer(council_results):
     - **IMPORTANT**: Embed the following HTML blocks EXACTLY as provided, in the correct sections:
     
     1.  **Under the SMART Goals:**
-        {user_growth_chart_html}
+        {blocks["user_growth_chart_html"]}
 
     2.  **For the "Visual Timeline & Milestones" section:**
-        {gantt_html}
+        {blocks["gantt_html"]}
     
     3.  **For the "Budget & Resource Plan" section:**
-        {budget_chart_html}
+        {blocks["budget_chart_html"]}
     
     - Include placeholder sources, like `[Source: Gartner, 2025]`.
     - **DO NOT** include a "QA Critic's Findings" section. The plan is final.
@@ -679,29 +1784,125 @@ def agent_report_synthesizer(council_results):
     (Begin Markdown Report)
     ---
     """
-    response = model.generate_content(prompt)
-    return response.text
 
 
+# --- Warm start: reuse sections from a near-duplicate completed brief ---
+# Completed jobs store their council_results plus a MinHash signature of the brief. A new brief
+# whose signature is close enough to one of them starts with that job's sections for every agent
+# whose inputs are unchanged; everything downstream of a changed input is re-run.
+# Opt out per brief with form_data["warm_start"] = false, or globally with WARM_START=off.
+WARM_START_DEFAULT = os.environ.get("WARM_START", "on") != "off"
+WARM_START_THRESHOLD = float(os.environ.get("WARM_START_THRESHOLD", "0.8"))  # whole-brief estimated Jaccard
+WARM_START_FIELD_THRESHOLD = float(os.environ.get("WARM_START_FIELD_THRESHOLD", "0.9"))  # per input field
+
+# section -> (brief fields its agent reads, sections its agent reads). Order is dependency order.
+SECTION_INPUTS = {
+    "smartGoals": (("name", "purpose", "audience"), ()),
+    "competitorAnalysis": (("competitors",), ()),
+    "wbs": (("name",), ("smartGoals",)),
+    "requirements": ((), ("wbs",)),
+    "scheduler_output": ((), ("wbs",)),
+    "user_growth": ((), ("smartGoals",)),
+    "budget": (("name",), ("wbs",)),
+    "risks": (("name",), ("competitorAnalysis",)),
+    "communicationsPlan": (("audience",), ()),
+    "qaPlan": ((), ("smartGoals", "requirements")),
+    "changeControlPlan": (("name",), ()),
+}
+
+def warm_start_enabled(form_data):
+    return bool(form_data.get("warm_start", WARM_START_DEFAULT))
+
+def index_brief_similarity(db, job_id, form_data):
+    """Stores the brief's MinHash signature and LSH buckets. The caller commits."""
+    sig = brief_similarity.signature(brief_similarity.brief_shingles(form_data))
+    db.execute("UPDATE jobs SET brief_minhash = ? WHERE job_id = ?", (brief_similarity.pack(sig), job_id))
+    db.execute("DELETE FROM brief_lsh WHERE job_id = ?", (job_id,))
+    db.executemany(
+        "INSERT INTO brief_lsh (band, bucket, job_id) VALUES (?, ?, ?)",
+        [(band, bucket, job_id) for band, bucket in brief_similarity.band_keys(sig)]
+    )
+
+def reusable_sections(old_brief, new_brief, old_results):
+    """Sections of old_results whose agent inputs are unchanged between the two briefs."""
+    fields = {field for brief_fields, _ in SECTION_INPUTS.values() for field in brief_fields}
+    same_field = {
+        field: brief_similarity.field_similarity(old_brief.get(field), new_brief.get(field)) >= WARM_START_FIELD_THRESHOLD
+        for field in fields
+    }
+    reusable = {}
+    for section, (brief_fields, upstream) in SECTION_INPUTS.items():
+        if (section in old_results
+                and all(same_field[f] for f in brief_fields)
+                and all(u in reusable for u in upstream)):
+            reusable[section] = old_results[section]
+    return reusable
+
+def find_warm_start(job_id, form_data):
+    """Best completed job to warm-start from, as {source_job_id, similarity, sections}, or None."""
+    sig = brief_similarity.signature(brief_similarity.brief_shingles(form_data))
+    keys = brief_similarity.band_keys(sig)
+    db = get_db()
+    candidates = db.execute(
+        "SELECT j.job_id, j.brief_minhash FROM jobs j WHERE j.job_id IN ("
+        "SELECT job_id FROM brief_lsh WHERE " + " OR ".join(["(band = ? AND bucket = ?)"] * len(keys)) +
+        ") AND j.job_id != ? AND j.status = 'complete' AND j.council_results IS NOT NULL AND j.brief_minhash IS NOT NULL",
+        [value for key in keys for value in key] + [job_id]
+    ).fetchall()
+    scored = [(brief_similarity.estimate_similarity(sig, brief_similarity.unpack(row["brief_minhash"])), row["job_id"])
+              for row in candidates]
+    scored = [(score, source) for score, source in scored if score >= WARM_START_THRESHOLD]
+    if not scored:
+        return None
+    similarity, source = max(scored)
+    row = db.execute("SELECT form_data, council_results FROM jobs WHERE job_id = ?", (source,)).fetchone()
+    sections = reusable_sections(json.loads(decode_blob(row["form_data"])),
+                                 form_data, json.loads(decode_blob(row["council_results"])))
+    if not sections:
+        return None
+    return {"source_job_id": source, "similarity": round(similarity, 3), "sections": sections}
+
+def apply_warm_start(job_id, form_data):
+    """Looks up a warm start for the job and records it. Returns the reusable sections ({} if none)."""
+    if not warm_start_enabled(form_data):
+        return {}
+    try:
+        match = find_warm_start(job_id, form_data)
+    except Exception as e:
+        print(f"[warm-start] Lookup failed for job {job_id}: {e}")
+        return {}
+    STATE.incr("warm_start.lookups")
+    if not match:
+        return {}
+    summary = {"source_job_id": match["source_job_id"], "similarity": match["similarity"],
+               "reused_sections": list(match["sections"])}
+    db = get_db()
+    db.execute("UPDATE jobs SET warm_start = ? WHERE job_id = ?", (json.dumps(summary), job_id))
+    db.commit()
+    STATE.incr("warm_start.hits")
+    STATE.incr("warm_start.sections_reused", len(match["sections"]))
+    print(f"--- Job {job_id} warm-starts from {match['source_job_id']} (similarity {match['similarity']}): "
+          f"reusing {', '.join(match['sections'])} ---")
+    return match["sections"]
+
 # --- AI Council (Main Background Job) ---
-def run_ai_council_job(job_id, form_data_json):
+def run_ai_council_job(job_id, form_data_json, batch_id=None, client_id=None):
     """
     Runs the full AI council, including revision loops.
     This runs in a background thread.
     """
-    
+    job_context.job_id = job_id
+    job_context.batch_id = batch_id
+    job_context.revision = 0
+    job_context.client_id = client_id
+
     if USE_DEBUG_DATA:
         print("--- RUNNING IN DEBUG MODE ---")
         print("--- SKIPPING ALL AI AGENTS ---")
         update_job_status(job_id, "processing", "Loading debug data...")
-        db = get_db()
-        cursor = db.cursor()
         # 2. NEW: Save the debug JSON object as a string
-        cursor.execute(
-            "UPDATE jobs SET status = ?, final_report = ? WHERE job_id = ?",
-            ('complete', json.dumps(DEBUG_REPORT_JSON), job_id)
-        )
-        db.commit()
+        from debug_report import DEBUG_REPORT_JSON
+        save_final_report(job_id, DEBUG_REPORT_JSON)
         print("--- Injected debug data and marked job as complete. ---")
         return
     
@@ -723,60 +1924,98 @@ def run_ai_council_job(job_id, form_data_json):
             MAX_REVISIONS = 3 # Safe cap
         
         revision_count = 0
+        fused = fused_mode_enabled(form_data)
+        warm_sections = apply_warm_start(job_id, form_data)
+        if warm_sections:
+            council_results.update(warm_sections)
+            update_job_status(job_id, "processing", f"Reusing {len(warm_sections)} sections from a similar past plan...")
 
         while revision_count <= MAX_REVISIONS:
+            raise_if_cancelled()
+            job_context.revision = revision_count
             
             # --- Run Agents 1-10 ---
-            update_job_status(job_id, "processing", f"[Rev {revision_count}] 1/13: Running Chief Strategist...")
-            council_results["smartGoals"] = agent_chief_strategist(form_data)
-            time.sleep(RATE_LIMIT_DELAY) 
-
-            update_job_status(job_id, "processing", f"[Rev {revision_count}] 2/13: Running Market Analyst...")
-            council_results["competitorAnalysis"] = agent_market_analyst(form_data)
-            time.sleep(RATE_LIMIT_DELAY)
-            
-            update_job_status(job_id, "processing", f"[Rev {revision_count}] 3/13: Running Solutions Architect...")
-            council_results["wbs"] = agent_solutions_architect(form_data, council_results["smartGoals"])
-            time.sleep(RATE_LIMIT_DELAY)
-            
-            update_job_status(job_id, "processing", f"[Rev {revision_count}] 4/13: Running Product Owner...")
-            # 3. UPDATED: Changed key to 'requirements'
-            council_results["requirements"] = agent_product_owner(council_results["wbs"])
-            time.sleep(RATE_LIMIT_DELAY)
-            
-            update_job_status(job_id, "processing", f"[Rev {revision_count}] 5/13: Running Project Scheduler...")
-            council_results["scheduler_output"] = agent_project_scheduler(council_results["wbs"])
-            time.sleep(RATE_LIMIT_DELAY) 
-
-            update_job_status(job_id, "processing", f"[Rev {revision_count}] 6/13: Running Growth Planner...")
-            council_results["user_growth"] = agent_growth_planner(council_results["smartGoals"])
-            time.sleep(RATE_LIMIT_DELAY)
-
-            update_job_status(job_id, "processing", f"[Rev {revision_count}] 7/13: Running Finance Manager...")
-            council_results["budget"] = agent_finance_manager(form_data, council_results["wbs"])
-            time.sleep(RATE_LIMIT_DELAY)
-            
-            update_job_status(job_id, "processing", f"[Rev {revision_count}] 8/13: Running Risk Analyst...")
-            council_results["risks"] = agent_risk_analyst(form_data, council_results["competitorAnalysis"])
-            time.sleep(RATE_LIMIT_DELAY)
-            
-            update_job_status(job_id, "processing", f"[Rev {revision_count}] 9/13: Running Communications Lead...")
-            council_results["communicationsPlan"] = agent_communications_lead(form_data)
-            time.sleep(RATE_LIMIT_DELAY)
-            
-            update_job_status(job_id, "processing", f"[Rev {revision_count}] 10/13: Running QA Lead...")
-            # 3. UPDATED: Pass 'requirements'
-            council_results["qaPlan"] = agent_quality_assurance_lead(council_results["smartGoals"], council_results["requirements"])
-            time.sleep(RATE_LIMIT_DELAY)
-            
-            update_job_status(job_id, "processing", f"[Rev {revision_count}] 11/13: Running Change Control...")
-            council_results["changeControlPlan"] = agent_change_control(form_data)
-            time.sleep(RATE_LIMIT_DELAY) 
+            # Sections already produced this round (warm start on the first round, fused passes) are skipped.
+            ready_sections = dict(warm_sections) if revision_count == 0 else {}
+            if fused and not set(FUSED_BRIEF_SCHEMA) <= set(ready_sections):
+                update_job_status(job_id, "processing", f"[Rev {revision_count}] Running fused brief pass (goals, market, comms, change control)...")
+                brief_sections = run_fused_agent(agent_fused_brief_sections, FUSED_BRIEF_SCHEMA, form_data)
+                brief_sections = {k: v for k, v in brief_sections.items() if k not in ready_sections}
+                ready_sections.update(brief_sections)
+                council_results.update(brief_sections)
+                rate_limit_pause(RATE_LIMIT_DELAY)
+
+            if "smartGoals" not in ready_sections:
+                update_job_status(job_id, "processing", f"[Rev {revision_count}] 1/13: Running Chief Strategist...")
+                council_results["smartGoals"] = agent_chief_strategist(form_data)
+                rate_limit_pause(RATE_LIMIT_DELAY)
+
+            if "competitorAnalysis" not in ready_sections:
+                update_job_status(job_id, "processing", f"[Rev {revision_count}] 2/13: Running Market Analyst...")
+                council_results["competitorAnalysis"] = agent_market_analyst(form_data)
+                rate_limit_pause(RATE_LIMIT_DELAY)
+
+            if "wbs" not in ready_sections:
+                update_job_status(job_id, "processing", f"[Rev {revision_count}] 3/13: Running Solutions Architect...")
+                council_results["wbs"] = agent_solutions_architect(form_data, council_results["smartGoals"])
+                rate_limit_pause(RATE_LIMIT_DELAY)
+
+            if fused and not set(FUSED_PLAN_SCHEMA) <= set(ready_sections):
+                update_job_status(job_id, "processing", f"[Rev {revision_count}] Running fused plan pass (requirements, schedule, growth, budget, risks, QA)...")
+                plan_sections = run_fused_agent(agent_fused_plan_sections, FUSED_PLAN_SCHEMA, form_data, council_results)
+                plan_sections = {k: v for k, v in plan_sections.items() if k not in ready_sections}
+                if "requirements" not in plan_sections and "requirements" not in ready_sections:
+                    plan_sections.pop("qaPlan", None)  # the QA plan was written against requirements we're discarding
+                ready_sections.update(plan_sections)
+                council_results.update(plan_sections)
+                rate_limit_pause(RATE_LIMIT_DELAY)
+
+            if "requirements" not in ready_sections:
+                update_job_status(job_id, "processing", f"[Rev {revision_count}] 4/13: Running Product Owner...")
+                # 3. UPDATED: Changed key to 'requirements'
+                council_results["requirements"] = agent_product_owner(council_results["wbs"])
+                rate_limit_pause(RATE_LIMIT_DELAY)
+
+            if "scheduler_output" not in ready_sections:
+                update_job_status(job_id, "processing", f"[Rev {revision_count}] 5/13: Running Project Scheduler...")
+                council_results["scheduler_output"] = agent_project_scheduler(council_results["wbs"])
+                rate_limit_pause(RATE_LIMIT_DELAY)
+
+            if "user_growth" not in ready_sections:
+                update_job_status(job_id, "processing", f"[Rev {revision_count}] 6/13: Running Growth Planner...")
+                council_results["user_growth"] = agent_growth_planner(council_results["smartGoals"])
+                rate_limit_pause(RATE_LIMIT_DELAY)
+
+            if "budget" not in ready_sections:
+                update_job_status(job_id, "processing", f"[Rev {revision_count}] 7/13: Running Finance Manager...")
+                council_results["budget"] = agent_finance_manager(form_data, council_results["wbs"])
+                rate_limit_pause(RATE_LIMIT_DELAY)
+
+            if "risks" not in ready_sections:
+                update_job_status(job_id, "processing", f"[Rev {revision_count}] 8/13: Running Risk Analyst...")
+                council_results["risks"] = agent_risk_analyst(form_data, council_results["competitorAnalysis"])
+                rate_limit_pause(RATE_LIMIT_DELAY)
+
+            if "communicationsPlan" not in ready_sections:
+                update_job_status(job_id, "processing", f"[Rev {revision_count}] 9/13: Running Communications Lead...")
+                council_results["communicationsPlan"] = agent_communications_lead(form_data)
+                rate_limit_pause(RATE_LIMIT_DELAY)
+
+            if "qaPlan" not in ready_sections:
+                update_job_status(job_id, "processing", f"[Rev {revision_count}] 10/13: Running QA Lead...")
+                # 3. UPDATED: Pass 'requirements'
+                council_results["qaPlan"] = agent_quality_assurance_lead(council_results["smartGoals"], council_results["requirements"])
+                rate_limit_pause(RATE_LIMIT_DELAY)
+
+            if "changeControlPlan" not in ready_sections:
+                update_job_status(job_id, "processing", f"[Rev {revision_count}] 11/13: Running Change Control...")
+                council_results["changeControlPlan"] = agent_change_control(form_data)
+                rate_limit_pause(RATE_LIMIT_DELAY)
 
             # --- Run Agent 11: The Critic ---
             update_job_status(job_id, "processing", f"[Rev {revision_count}] 12/13: Running QA Critic...")
             qa_findings = agent_qa_critic(council_results)
-            time.sleep(RATE_LIMIT_DELAY)
+            rate_limit_pause(RATE_LIMIT_DELAY)
             
             if not qa_findings:
                 print(f"--- QA Critic approved plan on revision {revision_count}. ---")
@@ -787,20 +2026,30 @@ def run_ai_council_job(job_id, form_data_json):
                 print(f"--- Max revisions reached. Accepting plan with findings. ---")
                 council_results["qaCriticFindings"] = qa_findings
                 break 
+
+            used = job_tokens_used(job_id)
+            if JOB_TOKEN_BUDGET and used >= JOB_TOKEN_BUDGET:
+                print(f"--- Job token budget reached ({used}/{JOB_TOKEN_BUDGET}). Accepting plan with findings. ---")
+                council_results["qaCriticFindings"] = qa_findings
+                break
+            if daily_budget_exhausted():
+                print(f"--- Daily token budget reached. Accepting plan with findings. ---")
+                council_results["qaCriticFindings"] = qa_findings
+                break
                 
             print(f"--- QA Critic found issues. Starting revision {revision_count}... ---")
             update_job_status(job_id, "processing", f"QA found issues. Revising... (Attempt {revision_count})")
             
             # --- Run Agent 13: The Reviser ---
             council_results = agent_reviser(council_results, qa_findings)
-            time.sleep(RATE_LIMIT_DELAY)
+            rate_limit_pause(RATE_LIMIT_DELAY)
             
         # --- End of while loop ---
 
         # --- Run Agent 12 (Summary) & 14 (Full Report) ---
         update_job_status(job_id, "processing", "13/14: Generating Executive Summary...")
         summary_markdown = agent_executive_summarizer(council_results)
-        time.sleep(RATE_LIMIT_DELAY)
+        rate_limit_pause(RATE_LIMIT_DELAY)
         
         update_job_status(job_id, "processing", "14/14: Generating Full Report...")
         full_report_markdown = agent_report_synthesizer(council_results)
@@ -811,53 +2060,538 @@ def run_ai_council_job(job_id, form_data_json):
             "fullReport": full_report_markdown
         }
         
-        db = get_db()
-        cursor = db.cursor()
-        cursor.execute(
-            "UPDATE jobs SET status = ?, final_report = ? WHERE job_id = ?",
-             # 2. NEW: Save the JSON object as a string
-            ('complete', json.dumps(final_report_object), job_id) 
-        )
-        db.commit()
+        # 2. NEW: Save the JSON object as a string (plus its pre-rendered HTML)
+        save_final_report(job_id, final_report_object, council_results)
         print(f"--- Job {job_id} complete. Final report saved. ---")
 
+    except JobCancelled:
+        STATE.incr("jobs.cancel_stopped")
+        print(f"--- Job {job_id} was cancelled; stopped before its next agent. ---")
     except Exception as e:
         print(f"Error in job {job_id}: {e}")
         error_message = f"Job failed: {str(e)}. Check server logs."
         update_job_status(job_id, "failed", error_message)
 
+@traced("db.save_final_report")
+def save_final_report(job_id, report_object, council_results=None):
+    """Stores the finished report and its pre-rendered HTML, and marks the job complete.
+
+    council_results, when given, is kept so later similar briefs can warm-start from it.
+    """
+    try:
+        rendered = report_render.render_report(report_object)
+    except Exception as e:
+        print(f"[render] Could not pre-render report for job {job_id}: {e}")
+        rendered = None
+    db = get_db()
+    saved = db.execute(
+        "UPDATE jobs SET status = ?, final_report = ?, report_html = ?, report_hash = ? "
+        "WHERE job_id = ? AND status != 'cancelled'",
+        ('complete', encode_blob(json.dumps(report_object)),
+         encode_blob(json.dumps(rendered)) if rendered else None,
+         rendered["hash"] if rendered else None, job_id)
+    ).rowcount
+    if not saved:
+        db.commit()
+        print(f"--- Job {job_id} was cancelled; discarding its report. ---")
+        return
+    try:
+        row = db.execute("SELECT form_data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        form_data = json.loads(decode_blob(row["form_data"]) or "{}")
+        index_job_for_search(db, job_id, form_data, report_object)
+        if council_results is not None:
+            db.execute("UPDATE jobs SET council_results = ? WHERE job_id = ?",
+                       (encode_blob(json.dumps(council_results)), job_id))
+            index_brief_similarity(db, job_id, form_data)
+    except (sqlite3.Error, ValueError, TypeError) as e:
+        print(f"[index] Could not index job {job_id}: {e}")
+    db.commit()
+    STATE.publish_event(job_id, {"status": "complete", "current_task": None})
+
+@traced("db.update_job_status")
 def update_job_status(job_id, status, current_task):
     """Helper function to update the job's status in the database."""
     db = get_db()
     cursor = db.cursor()
+    # A cancelled job stays cancelled even if its thread hasn't reached a check point yet.
     cursor.execute(
-        "UPDATE jobs SET status = ?, current_task = ? WHERE job_id = ?",
+        "UPDATE jobs SET status = ?, current_task = ? WHERE job_id = ? AND status != 'cancelled'",
         (status, current_task, job_id)
     )
     db.commit()
+    if cursor.rowcount:
+        STATE.publish_event(job_id, {"status": status, "current_task": current_task})
+
+# --- Job leases: exactly one worker process runs a given job ---
+JOB_RECOVERY_MAX_AGE_HOURS = float(os.environ.get("JOB_RECOVERY_MAX_AGE_HOURS", "24"))
+
+def run_leased_job(job_id, form_data_json, batch_id=None, client_id=None):
+    """Runs a job while holding its lease; does nothing if another worker owns it."""
+    if not STATE.acquire_lease(job_id, WORKER_ID, LEASE_TTL_SECONDS):
+        print(f"--- Job {job_id} is leased by {STATE.lease_holder(job_id)}; skipping. ---")
+        return
+    try:
+        # While the model circuit is open, new jobs wait here in the queue instead of starting.
+        try:
+            park_while_circuit_open(job_id)
+        except JobCancelled:
+            STATE.incr("jobs.cancelled_before_start")
+            print(f"--- Job {job_id} was cancelled while parked; not starting it. ---")
+            return
+        except circuit_breaker.CircuitOpen as e:
+            update_job_status(job_id, "failed", f"Job failed: {e}. Please resubmit later.")
+            mark_finished(job_id)
+            return
+        while not JOB_SLOTS.acquire(timeout=1.0):
+            if job_cancelled(job_id):
+                break
+        else:
+            try:
+                if job_cancelled(job_id):
+                    STATE.incr("jobs.cancelled_before_start")
+                    print(f"--- Job {job_id} was cancelled while queued; not starting it. ---")
+                    return
+                db = get_db()
+                db.execute("UPDATE jobs SET started_at = ?, finished_at = NULL WHERE job_id = ?", (time.time(), job_id))
+                db.commit()
+                with TRACER.span("job", trace_key=job_id, job_id=job_id, batch_id=batch_id, worker=WORKER_ID):
+                    run_ai_council_job(job_id, form_data_json, batch_id, client_id)
+            finally:
+                JOB_SLOTS.release()
+                mark_finished(job_id)
+            return
+        STATE.incr("jobs.cancelled_before_start")
+        print(f"--- Job {job_id} was cancelled while waiting for a job slot. ---")
+    finally:
+        STATE.release_lease(job_id, WORKER_ID)
+        CANCELLED_JOBS.discard(job_id)
+        with _parked_lock:
+            PARKED_JOBS.pop(job_id, None)
+
+def mark_finished(job_id):
+    """Stamps finished_at once a job has reached a terminal status (feeds duration estimates)."""
+    db = get_db()
+    db.execute(
+        "UPDATE jobs SET finished_at = ? WHERE job_id = ? AND finished_at IS NULL "
+        "AND status IN ('complete', 'failed', 'cancelled')",
+        (time.time(), job_id)
+    )
+    db.commit()
 
+def recover_orphaned_jobs():
+    """Restarts unfinished jobs whose worker died (lease expired); fails ones too old to retry."""
+    db = get_db()
+    rows = db.execute(
+        "SELECT job_id, form_data, client_id, created_at >= datetime('now', ?) AS recent FROM jobs "
+        "WHERE status IN ('pending', 'processing') AND created_at < datetime('now', ?)",
+        (f"-{JOB_RECOVERY_MAX_AGE_HOURS} hours", f"-{int(LEASE_TTL_SECONDS)} seconds")
+    ).fetchall()
+    for row in rows:
+        job_id = row["job_id"]
+        if STATE.lease_holder(job_id) is not None:
+            continue
+        if not STATE.acquire_lease(job_id, WORKER_ID, LEASE_TTL_SECONDS):
+            continue  # another worker got there first
+        if not row["recent"]:
+            update_job_status(job_id, "failed", "Job failed: worker was lost and the job is too old to restart.")
+            STATE.release_lease(job_id, WORKER_ID)
+            continue
+        print(f"--- Recovering orphaned job {job_id} on {WORKER_ID}. ---")
+        update_job_status(job_id, "pending", "Recovered after a worker restart; re-queued...")
+        threading.Thread(
+            target=run_leased_job, args=(job_id, decode_blob(row["form_data"]), None, row["client_id"]), daemon=True
+        ).start()
+
+def lease_heartbeat_loop():
+    """Background thread: keeps this worker's leases alive and picks up orphaned jobs."""
+    while True:
+        try:
+            STATE.renew_leases(WORKER_ID, LEASE_TTL_SECONDS)
+            recover_orphaned_jobs()
+        except Exception as e:
+            print(f"[leases] Heartbeat failed: {e}")
+        time.sleep(LEASE_RENEW_SECONDS)
+
+
+# --- Admission control & queue estimates ---
+# Each worker runs at most JOB_CONCURRENCY council jobs at once; the rest wait as 'pending'.
+# New work is refused with 503 + Retry-After when the queue is full, the estimated wait is too
+# long or the model is in a long cooldown. Estimates assume JOB_CONCURRENCY slots in total.
+JOB_CONCURRENCY = int(os.environ.get("JOB_CONCURRENCY", "4"))
+JOB_SLOTS = threading.Semaphore(JOB_CONCURRENCY)
+MAX_QUEUED_JOBS = int(os.environ.get("MAX_QUEUED_JOBS", "20"))
+MAX_ESTIMATED_WAIT_SECONDS = float(os.environ.get("MAX_ESTIMATED_WAIT_SECONDS", "1800"))
+MAX_ADMISSION_COOLDOWN_SECONDS = float(os.environ.get("MAX_ADMISSION_COOLDOWN_SECONDS", "300"))
+DEFAULT_JOB_DURATION_SECONDS = 360.0  # until there are completed jobs to learn from
+DURATION_SAMPLE_SIZE = 20
+DURATION_CACHE_SECONDS = 30
+_duration_cache = {"value": None, "at": 0.0}
+
+def recent_job_duration():
+    """Median run time (seconds) of the most recently completed jobs."""
+    now = time.time()
+    if _duration_cache["value"] is not None and now - _duration_cache["at"] < DURATION_CACHE_SECONDS:
+        return _duration_cache["value"]
+    durations = sorted(row[0] for row in get_db().execute(
+        "SELECT finished_at - started_at FROM jobs WHERE status = 'complete' AND finished_at IS NOT NULL "
+        "AND started_at IS NOT NULL ORDER BY finished_at DESC LIMIT ?", (DURATION_SAMPLE_SIZE,)
+    ))
+    value = durations[len(durations) // 2] if durations else DEFAULT_JOB_DURATION_SECONDS
+    _duration_cache.update(value=value, at=now)
+    return value
+
+def queue_counts(db):
+    row = db.execute(
+        "SELECT COALESCE(SUM(status = 'pending'), 0), COALESCE(SUM(status = 'processing'), 0) "
+        "FROM jobs WHERE status IN ('pending', 'processing')"
+    ).fetchone()
+    return row[0], row[1]
+
+def iso_utc(epoch):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch))
+
+def queue_estimate(ahead, running):
+    """Estimated wait/duration for a job with `ahead` pending jobs in front of it."""
+    duration = recent_job_duration()
+    free = max(0, JOB_CONCURRENCY - running)
+    must_finish = max(0, ahead + 1 - free)  # jobs that have to finish before a slot opens for this one
+    wait = max(must_finish / max(1, JOB_CONCURRENCY) * duration, cooldown_remaining(), MODEL_BREAKER.retry_after())
+    now = time.time()
+    return {
+        "queue_position": ahead + 1,
+        "estimated_wait_seconds": round(wait),
+        "estimated_duration_seconds": round(duration),
+        "estimated_start": iso_utc(now + wait),
+        "estimated_completion": iso_utc(now + wait + duration),
+    }
+
+def admission_check(jobs=1):
+    """(estimate, None) if `jobs` new jobs can be admitted, else (estimate, (reason, retry_after_seconds)).
+
+    The estimate (and the wait cap) is for the last of the new jobs.
+    """
+    pending, running = queue_counts(get_db())
+    estimate = queue_estimate(pending + jobs - 1, running)
+    cooldown = cooldown_remaining()
+    duration = estimate["estimated_duration_seconds"]
+    if pending + jobs > MAX_QUEUED_JOBS:
+        excess = pending + jobs - MAX_QUEUED_JOBS
+        return estimate, (f"{pending} jobs are already queued.", excess * duration / max(1, JOB_CONCURRENCY))
+    if estimate["estimated_wait_seconds"] > MAX_ESTIMATED_WAIT_SECONDS:
+        return estimate, ("The estimated queue wait is too long.",
+                          estimate["estimated_wait_seconds"] - MAX_ESTIMATED_WAIT_SECONDS)
+    if cooldown > MAX_ADMISSION_COOLDOWN_SECONDS:
+        return estimate, ("The model is rate-limited.", cooldown - MAX_ADMISSION_COOLDOWN_SECONDS)
+    return estimate, None
+
+def overloaded_response(reason, retry_after):
+    retry_after = max(1, math.ceil(retry_after))
+    STATE.incr("admission.rejected")
+    response = jsonify({"error": f"Server is saturated: {reason} Retry later.", "retry_after_seconds": retry_after})
+    response.headers["Retry-After"] = str(retry_after)
+    return response, 503
+
+# --- Duplicate submissions (single-flight) ---
+# Double-clicks, retries after a slow 202 and repeated voice confirmations re-post the same brief.
+# A submission attaches to the client's existing job when it carries an Idempotency-Key seen in
+# the last IDEMPOTENCY_KEY_TTL_SECONDS, or (without a key) when the normalized brief matches a job
+# created in the last DEDUP_WINDOW_SECONDS that hasn't failed or been cancelled.
+DEDUP_WINDOW_SECONDS = int(os.environ.get("DEDUP_WINDOW_SECONDS", "900"))  # 0 disables brief matching
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_KEY_TTL_SECONDS", "86400"))
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+def normalize_brief(value):
+    """Collapses whitespace and drops empty values, so cosmetic differences hash the same."""
+    if isinstance(value, dict):
+        return {k: normalize_brief(v) for k, v in value.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [normalize_brief(v) for v in value]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+def brief_hash(form_data):
+    normalized = json.dumps(normalize_brief(form_data), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def find_duplicate_job(db, client_id, digest, idempotency_key=None):
+    """(job row, "idempotency_key" | "brief") for the job a submission should attach to, else (None, None).
+
+    A supplied Idempotency-Key is authoritative: a new key always means new work.
+    """
+    if idempotency_key:
+        row = db.execute(
+            "SELECT job_id, status, brief_hash FROM jobs WHERE idempotency_key = ? AND client_id = ? "
+            "AND created_at >= datetime('now', ?) ORDER BY created_at DESC LIMIT 1",
+            (idempotency_key, client_id, f"-{IDEMPOTENCY_KEY_TTL_SECONDS} seconds")
+        ).fetchone()
+        return (row, "idempotency_key") if row else (None, None)
+    if DEDUP_WINDOW_SECONDS <= 0:
+        return None, None
+    row = db.execute(
+        "SELECT job_id, status, brief_hash FROM jobs WHERE brief_hash = ? AND client_id = ? "
+        "AND status NOT IN ('failed', 'cancelled') AND created_at >= datetime('now', ?) "
+        "ORDER BY created_at DESC LIMIT 1",
+        (digest, client_id, f"-{DEDUP_WINDOW_SECONDS} seconds")
+    ).fetchone()
+    return (row, "brief") if row else (None, None)
+
+def duplicate_response(row, matched_by, digest):
+    if matched_by == "idempotency_key" and row["brief_hash"] != digest:
+        STATE.incr("dedup.idempotency_key_conflicts")
+        return jsonify({"error": "Idempotency-Key was already used for a different brief.",
+                        "job_id": row["job_id"]}), 422
+    STATE.incr(f"dedup.{matched_by}_hits")
+    print(f"--- Duplicate submission attached to job {row['job_id']} (matched by {matched_by}) ---")
+    return jsonify({"job_id": row["job_id"], "status": row["status"], "deduplicated": True,
+                    "matched_by": matched_by}), 200
 
 # --- API Endpoint 1: Create Project (Starts the Job) ---
 @app.route("/api/v1/create-project", methods=["POST"])
 def create_project():
     form_data = request.json
-    job_id = str(uuid.uuid4())
-    
+    client_id = request_client_id()
+    idempotency_key = (request.headers.get("Idempotency-Key") or "").strip() or None
+    if idempotency_key and len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        return jsonify({"error": f"Idempotency-Key is limited to {MAX_IDEMPOTENCY_KEY_LENGTH} characters."}), 400
+    digest = brief_hash(form_data)
     db = get_db()
-    cursor = db.cursor()
-    cursor.execute(
-        "INSERT INTO jobs (job_id, status, current_task, form_data) VALUES (?, ?, ?, ?)",
-        (job_id, "pending", "Project is in the queue...", json.dumps(form_data))
+    # Replays attach before the budget/admission checks: they don't start any new work.
+    duplicate, matched_by = find_duplicate_job(db, client_id, digest, idempotency_key)
+    if duplicate:
+        return duplicate_response(duplicate, matched_by, digest)
+    if daily_budget_exhausted():
+        return jsonify({"error": "Daily token budget exhausted. Try again tomorrow."}), 429
+    estimate, refusal = admission_check()
+    if refusal:
+        return overloaded_response(*refusal)
+    job_id = str(uuid.uuid4())
+
+    # Check again under the database write lock, so concurrent identical submissions (from any
+    # worker) create exactly one job.
+    db.execute("BEGIN IMMEDIATE")
+    duplicate, matched_by = find_duplicate_job(db, client_id, digest, idempotency_key)
+    if duplicate:
+        db.rollback()
+        return duplicate_response(duplicate, matched_by, digest)
+    db.execute(
+        "INSERT INTO jobs (job_id, status, current_task, form_data, client_id, brief_hash, idempotency_key) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (job_id, "pending", "Project is in the queue...", encode_blob(json.dumps(form_data)), client_id,
+         digest, idempotency_key)
     )
     db.commit()
+    STATE.acquire_lease(job_id, WORKER_ID, LEASE_TTL_SECONDS)
     
     thread = threading.Thread(
-        target=run_ai_council_job, 
-        args=(job_id, json.dumps(form_data))
+        target=run_leased_job, 
+        args=(job_id, json.dumps(form_data), None, client_id)
     )
     thread.start()
+    STATE.incr("admission.accepted")
     
-    return jsonify({"job_id": job_id}), 202
+    return jsonify({"job_id": job_id, **estimate}), 202
+
+# --- Batch Project Creation ---
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "2"))
+MAX_BATCH_SIZE = 100
+
+def jira_project_to_brief(project, issues, defaults):
+    """Turns a Jira project and its latest issues into a create-project brief."""
+    name = project.get('name') or project.get('key')
+    summaries = [
+        (issue.get('fields') or {}).get('summary')
+        for issue in issues
+        if (issue.get('fields') or {}).get('summary')
+    ]
+    purpose = project.get('description') or f"Plan the next phase of the existing Jira project {name} ({project.get('key')})."
+    if summaries:
+        purpose += " Current open work includes: " + "; ".join(summaries[:10]) + "."
+    return {
+        "name": name,
+        "purpose": purpose,
+        "audience": defaults.get("audience") or f"Existing stakeholders and users of {name}",
+        "competitors": defaults.get("competitors", ""),
+        "revision_rounds": defaults.get("revision_rounds", "until-good"),
+        "source": {"jira_project": project.get('key')},
+    }
+
+def briefs_from_jira(jira_params, defaults):
+    """Fetches the requested Jira projects and converts each into a brief."""
+    from jira_fetcher import JiraClient  # optional: only batch imports need requests
+
+    domain, email, api_token = jira_params.get("domain"), jira_params.get("email"), jira_params.get("apiToken")
+    if not domain or not email or not api_token:
+        raise ValueError("jira import requires domain, email and apiToken")
+    client = JiraClient(domain, email, api_token)
+    projects = client.get_projects()
+    wanted = jira_params.get("projects")
+    if wanted:
+        projects = [p for p in projects if p.get('key') in set(wanted)]
+    limit = int(jira_params.get("maxIssuesPerProject") or 10)
+    return [
+        jira_project_to_brief(p, client.get_issues_for_project(p.get('key'), limit), defaults)
+        for p in projects
+    ]
+
+def run_batch(batch_id, jobs, client_id=None):
+    """Runs a batch's jobs with bounded concurrency, sharing identical prompts between them."""
+    with BATCH_CACHE_LOCK:
+        BATCH_PROMPT_CACHES[batch_id] = {}
+        BATCH_PROMPT_STATS[batch_id] = {"calls": 0, "shared": 0}
+    try:
+        with ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix=f"batch-{batch_id[:8]}") as pool:
+            for job_id, form_data_json in jobs:
+                pool.submit(run_leased_job, job_id, form_data_json, batch_id, client_id)
+    finally:
+        with BATCH_CACHE_LOCK:
+            BATCH_PROMPT_CACHES.pop(batch_id, None)
+            stats = BATCH_PROMPT_STATS.pop(batch_id, {})
+        db = get_db()
+        db.execute("UPDATE batches SET prompt_calls = ?, prompt_shared = ? WHERE batch_id = ?",
+                   (stats.get("calls", 0), stats.get("shared", 0), batch_id))
+        db.commit()
+        print(f"--- Batch {batch_id} finished. Model calls: {stats.get('calls', 0)}, shared responses: {stats.get('shared', 0)} ---")
+
+@app.route("/api/v1/create-batch", methods=["POST"])
+def create_batch():
+    """Queues many briefs (or a Jira project import) as one tracked batch.
+
+    Expects JSON: { briefs: [ {...form data...}, ... ] }
+              or { jira: {domain, email, apiToken, projects?, maxIssuesPerProject?}, defaults?: {...} }
+    Returns 202 with { batch_id, job_ids, duplicates, last_job: <queue estimate for the last new job> }.
+    """
+    if daily_budget_exhausted():
+        return jsonify({"error": "Daily token budget exhausted. Try again tomorrow."}), 429
+    _, refusal = admission_check()  # cheap early refusal before a Jira import; re-checked below
+    if refusal:
+        return overloaded_response(*refusal)
+    body = request.json or {}
+    defaults = body.get("defaults") or {}
+    if not isinstance(defaults, dict):
+        return jsonify({"error": "'defaults' must be an object."}), 400
+    try:
+        if body.get("jira"):
+            briefs = briefs_from_jira(body["jira"], defaults)
+            source = "jira"
+        else:
+            briefs = body.get("briefs")
+            source = "briefs"
+    except ImportError:
+        return jsonify({"error": "Jira import needs the 'requests' package installed on the server."}), 500
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except (Exception, SystemExit) as e:  # get_projects() exits on 401
+        return jsonify({"error": f"Jira import failed: {e}"}), 502
+
+    if not isinstance(briefs, list) or not briefs:
+        return jsonify({"error": "Provide a non-empty 'briefs' list or a 'jira' import."}), 400
+    if len(briefs) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batches are limited to {MAX_BATCH_SIZE} briefs."}), 400
+    if not all(isinstance(brief, dict) for brief in briefs):
+        return jsonify({"error": "Every brief must be an object."}), 400
+    # Byte-identical briefs inside one batch collapse onto a single job.
+    forms = [json.dumps({**defaults, **brief}, sort_keys=True) for brief in briefs]
+    new_jobs = len(set(forms))
+    if new_jobs > MAX_QUEUED_JOBS:
+        return jsonify({"error": f"This server queues at most {MAX_QUEUED_JOBS} jobs; split the batch."}), 400
+    estimate, refusal = admission_check(new_jobs)
+    if refusal:
+        return overloaded_response(*refusal)
+
+    batch_id = str(uuid.uuid4())
+    client_id = request_client_id()
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute(
+        "INSERT INTO batches (batch_id, source, total_jobs) VALUES (?, ?, ?)",
+        (batch_id, source, len(briefs))
+    )
+
+    job_ids, jobs, seen = [], [], {}
+    duplicates = 0
+    for form_data_json in forms:
+        if form_data_json in seen:
+            job_ids.append(seen[form_data_json])
+            duplicates += 1
+            continue
+        job_id = str(uuid.uuid4())
+        cursor.execute(
+            "INSERT INTO jobs (job_id, status, current_task, form_data, batch_id, client_id) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, "pending", "Project is in the batch queue...", encode_blob(form_data_json), batch_id, client_id)
+        )
+        seen[form_data_json] = job_id
+        job_ids.append(job_id)
+        jobs.append((job_id, form_data_json))
+    db.execute("UPDATE batches SET total_jobs = ? WHERE batch_id = ?", (len(jobs), batch_id))
+    db.commit()
+    for job_id, _ in jobs:
+        STATE.acquire_lease(job_id, WORKER_ID, LEASE_TTL_SECONDS)
+
+    threading.Thread(target=run_batch, args=(batch_id, jobs, client_id), daemon=True).start()
+    return jsonify({"batch_id": batch_id, "job_ids": job_ids, "duplicates": duplicates, "last_job": estimate}), 202
+
+@app.route("/api/v1/batch-status/<batch_id>", methods=["GET"])
+def get_batch_status(batch_id):
+    """Aggregate progress for a batch plus each job's current task."""
+    db = get_db()
+    batch = db.execute("SELECT * FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+    if not batch:
+        return jsonify({"error": "Batch not found"}), 404
+    rows = db.execute(
+        "SELECT job_id, status, current_task, form_data FROM jobs WHERE batch_id = ? ORDER BY rowid",
+        (batch_id,)
+    ).fetchall()
+
+    counts = {}
+    jobs = []
+    for row in rows:
+        counts[row["status"]] = counts.get(row["status"], 0) + 1
+        jobs.append({
+            "job_id": row["job_id"],
+            "name": json.loads(decode_blob(row["form_data"]) or "{}").get("name"),
+            "status": row["status"],
+            "current_task": row["current_task"],
+        })
+    finished = counts.get("complete", 0) + counts.get("failed", 0) + counts.get("cancelled", 0)
+    with BATCH_CACHE_LOCK:
+        sharing = dict(BATCH_PROMPT_STATS.get(batch_id, {}))
+    if not sharing and batch["prompt_calls"] is not None:
+        sharing = {"calls": batch["prompt_calls"], "shared": batch["prompt_shared"]}
+    return jsonify({
+        "batch_id": batch_id,
+        "source": batch["source"],
+        "total_jobs": batch["total_jobs"],
+        "counts": counts,
+        "progress": round(finished / batch["total_jobs"], 3) if batch["total_jobs"] else 1.0,
+        "done": finished >= batch["total_jobs"],
+        "prompt_sharing": sharing,
+        "jobs": jobs,
+    })
+
+def job_status_payload(job):
+    """The status response for a jobs row, without queue estimates (pure; benchmarked)."""
+    if job["status"] == "complete":
+        # 2. NEW: Parse the string and return the JSON object
+        payload = {
+            "status": "complete",
+            "final_report": json.loads(decode_blob(job["final_report"]))
+        }
+        if job["report_hash"]:
+            payload["report_html_url"] = f"/api/v1/report-html/{job['job_id']}/{job['report_hash']}"
+    elif job["status"] == "failed":
+        return {
+            "status": "failed",
+            "error_message": job["current_task"]
+        }
+    else:
+        payload = {
+            "status": job["status"],
+            "current_task": job["current_task"]
+        }
+    if job["warm_start"]:
+        payload["warm_start"] = json.loads(job["warm_start"])
+    return payload
 
 # --- API Endpoint 2: Get Status (The Polling Endpoint) ---
 @app.route("/api/v1/project-status/<job_id>", methods=["GET"])
@@ -870,23 +2604,186 @@ def get_project_status(job_id):
     if not job:
         return jsonify({"error": "Job not found"}), 404
 
-    if job["status"] == "complete":
-        # 2. NEW: Parse the string and return the JSON object
-        return jsonify({
-            "status": "complete",
-            "final_report": json.loads(job["final_report"])
-        })
-    
-    if job["status"] == "failed":
-        return jsonify({
-            "status": "failed",
-            "error_message": job["current_task"]
-        })
+    payload = job_status_payload(job)
+    if job["status"] == "pending":
+        ahead = db.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'pending' AND rowid < (SELECT rowid FROM jobs WHERE job_id = ?)",
+            (job_id,)
+        ).fetchone()[0]
+        payload.update(queue_estimate(ahead, queue_counts(db)[1]))
+    elif job["status"] == "processing" and job["started_at"]:
+        duration = recent_job_duration()
+        payload["estimated_duration_seconds"] = round(duration)
+        payload["estimated_completion"] = iso_utc(max(time.time(), job["started_at"] + duration))
+    return jsonify(payload)
+
+@app.route("/api/v1/cancel-project/<job_id>", methods=["POST"])
+def cancel_project(job_id):
+    """Cancels a pending or running job. The worker stops before its next agent call."""
+    db = get_db()
+    cancelled = db.execute(
+        "UPDATE jobs SET status = 'cancelled', current_task = ? WHERE job_id = ? AND status IN ('pending', 'processing')",
+        ("Cancelled by request.", job_id)
+    ).rowcount
+    db.commit()
+    if not cancelled:
+        job = db.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        if job["status"] == "cancelled":
+            return jsonify({"job_id": job_id, "status": "cancelled"}), 200
+        return jsonify({"error": f"Job is already {job['status']}", "status": job["status"]}), 409
+    CANCELLED_JOBS.add(job_id)
+    MODEL_SCHEDULER.wake()  # queued model calls for this job drop out now
+    STATE.incr("jobs.cancelled")
+    STATE.publish_event(job_id, {"status": "cancelled", "current_task": "Cancelled by request."})
+    return jsonify({"job_id": job_id, "status": "cancelled"}), 200
+
+
+@app.route("/api/v1/report-html/<job_id>/<report_hash>", methods=["GET"])
+def get_report_html(job_id, report_hash):
+    """Pre-rendered, sanitized report HTML. The URL embeds the content hash, so it never changes.
+
+    A matching If-None-Match only gets a 304 while the job still has that report; reports are
+    private to whoever holds the job id, so shared caches must not keep them.
+    """
+    db = get_db()
+    if request.if_none_match.contains(report_hash):
+        if not db.execute(
+            "SELECT 1 FROM jobs WHERE job_id = ? AND report_hash = ?", (job_id, report_hash)
+        ).fetchone():
+            return jsonify({"error": "Rendered report not found"}), 404
+        response = flask.Response(status=304)
+    else:
+        job = db.execute(
+            "SELECT report_html FROM jobs WHERE job_id = ? AND report_hash = ?", (job_id, report_hash)
+        ).fetchone()
+        if not job or job["report_html"] is None:
+            return jsonify({"error": "Rendered report not found"}), 404
+        response = flask.Response(decode_blob(job["report_html"]), mimetype="application/json")
+    response.set_etag(report_hash)
+    response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
+
+
+@app.route("/api/v1/search", methods=["GET"])
+def search_jobs():
+    """Lists or searches past jobs, newest first or by relevance.
+
+    Query: q=<free text; ranked with bm25, returns snippets>, status=<status[,status...]>,
+           from=<YYYY-MM-DD>, to=<YYYY-MM-DD, inclusive>, limit=<1-100, default 20>, offset=<int>
+    Text search only covers completed jobs; without q every job matching the filters is listed.
+    """
+    q = (request.args.get("q") or "").strip()
+    limit = max(1, min(request.args.get("limit", default=SEARCH_PAGE_SIZE, type=int), MAX_SEARCH_PAGE_SIZE))
+    offset = max(0, request.args.get("offset", default=0, type=int))
+    filters, params = [], []
+    statuses = [s for s in (request.args.get("status") or "").split(",") if s]
+    if statuses:
+        filters.append(f"j.status IN ({', '.join('?' * len(statuses))})")
+        params.extend(statuses)
+    if request.args.get("from"):
+        filters.append("j.created_at >= ?")
+        params.append(request.args["from"])
+    if request.args.get("to"):
+        filters.append("j.created_at < date(?, '+1 day')")
+        params.append(request.args["to"])
 
+    db = get_db()
+    if q:
+        if not SEARCH_ENABLED:
+            return jsonify({"error": "Full-text search is not available on this server."}), 501
+        match = fts_query(q)
+        if not match:
+            return jsonify({"error": "q must contain at least one search term"}), 400
+        where = " AND ".join(["jobs_fts MATCH ?"] + filters)
+        params = [match] + params
+        try:
+            total = db.execute(
+                f"SELECT COUNT(*) FROM jobs_fts JOIN jobs j ON j.job_id = jobs_fts.job_id WHERE {where}", params
+            ).fetchone()[0]
+            # Column weights: job_id, name, purpose, audience, competitors, report.
+            rows = db.execute(
+                "SELECT j.job_id, j.status, j.created_at, jobs_fts.name AS name, "
+                "bm25(jobs_fts, 0.0, 10.0, 4.0, 2.0, 4.0, 1.0) AS rank, "
+                "snippet(jobs_fts, -1, '<mark>', '</mark>', '…', 24) AS snippet "
+                f"FROM jobs_fts JOIN jobs j ON j.job_id = jobs_fts.job_id WHERE {where} "
+                "ORDER BY rank LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            return jsonify({"error": f"Invalid search query: {e}"}), 400
+        results = [dict(row) for row in rows]
+    else:
+        where = " AND ".join(filters) or "1"
+        total = db.execute(f"SELECT COUNT(*) FROM jobs j WHERE {where}", params).fetchone()[0]
+        rows = db.execute(
+            f"SELECT j.job_id, j.status, j.created_at, j.form_data FROM jobs j WHERE {where} "
+            "ORDER BY j.created_at DESC, j.job_id LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+        results = []
+        for row in rows:
+            try:
+                name = json.loads(decode_blob(row["form_data"]) or "{}").get("name")
+            except (ValueError, AttributeError):
+                name = None
+            results.append({"job_id": row["job_id"], "status": row["status"],
+                            "created_at": row["created_at"], "name": name})
     return jsonify({
-        "status": job["status"],
-        "current_task": job["current_task"]
-    })
+        "query": q or None,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if offset + limit < total else None,
+        "results": results,
+    }), 200
+
+
+@app.route("/api/v1/jobs", methods=["GET"])
+def list_jobs():
+    """Lists jobs newest first, paginated by an opaque keyset cursor.
+
+    Query: fields=<field[,field...]; default job_id,status,created_at,current_task,name>,
+           status=<status[,status...]>, from=<YYYY-MM-DD>, to=<YYYY-MM-DD, inclusive>,
+           batch_id=<id>, limit=<1-200, default 50>, cursor=<next_cursor from the previous page>
+    """
+    try:
+        fields, filters, params = job_list_query(request.args)
+        after = decode_job_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    limit = max(1, min(request.args.get("limit", default=JOB_LIST_PAGE_SIZE, type=int), MAX_JOB_LIST_PAGE_SIZE))
+    items, last_key = fetch_job_page(get_db(), fields, filters, params, after, limit)
+    return jsonify({
+        "jobs": items,
+        "limit": limit,
+        "next_cursor": encode_job_cursor(*last_key) if last_key else None,
+    }), 200
+
+
+@app.route("/api/v1/jobs/export", methods=["GET"])
+def export_jobs():
+    """Streams every job matching the filters, newest first, in fixed-size chunks.
+
+    Query: format=<ndjson (default) | csv | parquet (needs pyarrow)>, plus the fields/status/
+           from/to/batch_id filters of /api/v1/jobs.
+    """
+    fmt = (request.args.get("format") or "ndjson").lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        fields, filters, params = job_list_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if fmt == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        return jsonify({"error": "Parquet export needs pyarrow installed on the server."}), 501
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    response = flask.Response(flask.stream_with_context(EXPORT_WRITERS[fmt](fields, filters, params)),
+                              mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="jobs-export.{extension}"'
+    response.headers["Cache-Control"] = "no-store"
+    return response
 
 
 @app.route('/api/v1/validate-provisional', methods=['POST', 'OPTIONS'])
@@ -905,11 +2802,9 @@ def validate_provisional():
     provisional = body.get('provisional', {})
     field = body.get('field')
 
-    # If we've recently hit a rate limit, short-circuit and tell clients to wait
-    global MODEL_COOLDOWN_UNTIL
-    now = time.time()
-    if MODEL_COOLDOWN_UNTIL and MODEL_COOLDOWN_UNTIL > now:
-        remaining = int(MODEL_COOLDOWN_UNTIL - now)
+    # If we've recently hit a rate limit (or the model circuit is open), short-circuit and tell clients to wait
+    remaining = math.ceil(max(cooldown_remaining(), MODEL_BREAKER.retry_after()))
+    if remaining > 0:
         print(f"[validate_provisional] Currently rate-limited. Retry after {remaining}s")
         return jsonify({"ok": False, "follow_up": f"Validation service rate-limited. Please try again in {remaining} seconds.", "value": None}), 429
 
@@ -917,6 +2812,7 @@ def validate_provisional():
 
     # If the server LLM isn't configured, allow a permissive fallback for short text fields
     # (e.g., project names) so the UX isn't blocked when GEMINI_API_KEY is missing.
+    model = get_model()
     if not model:
         raw_val = provisional.get(field) if field else None
         if field and isinstance(raw_val, str) and raw_val.strip() and len(raw_val.strip()) <= 80:
@@ -959,8 +2855,7 @@ Respond with only JSON.
 """
 
     try:
-        resp = model.generate_content(prompt)
-        text = getattr(resp, 'text', str(resp))
+        text = call_model(prompt, agent="validate_provisional")
 
         # 1) Try the strict cleaner first (existing helper)
         cleaned = None
@@ -1007,67 +2902,262 @@ Respond with only JSON.
         print(f"[validate_provisional] Parsed model response -> ok={ok} follow_up={follow_up} value={value}")
         return jsonify({"ok": ok, "follow_up": follow_up, "value": value})
 
+    except circuit_breaker.CircuitOpen as e:
+        print(f"[validate_provisional] {e}")
+        retry_seconds = math.ceil(e.retry_after)
+        return jsonify({"ok": False, "follow_up": f"Validation service is temporarily unavailable. Please try again in {retry_seconds} seconds.", "value": None}), 429
     except Exception as e:
-        # If the model raised an error that looks like a quota/rate-limit, set a short cooldown
-        err_text = str(e).lower()
         tb = traceback.format_exc()
         print(f"Validation error: {e}")
         print(tb)
-        if 'quota' in err_text or 'rate limit' in err_text or '429' in err_text:
-            # set a cooldown (use retry seconds if embedded in message, otherwise default 60s)
-            retry_seconds = 60
-            # try to extract retry seconds from message
-            m = re.search(r'retry in (\d+)\.?', err_text)
-            if m:
-                try:
-                    retry_seconds = int(m.group(1))
-                except Exception:
-                    pass
-            # Don't shorten an existing cooldown if one is already set; extend only as necessary
-            now = time.time()
-            new_until = now + retry_seconds
-            # MODEL_COOLDOWN_UNTIL is declared global at the top of this function
-            prev = MODEL_COOLDOWN_UNTIL
-            MODEL_COOLDOWN_UNTIL = max(prev, new_until)
-            effective = int(MODEL_COOLDOWN_UNTIL - now)
-            print(f"[validate_provisional] Entering/Extending cooldown: requested={retry_seconds}s prev_remaining={int(prev-now) if prev>now else 0}s effective={effective}s due to rate limit.")
+        # generate_and_record already classified the error; a rate limit has extended the shared cooldown.
+        if circuit_breaker.classify(e) == "rate_limit":
+            retry_seconds = max(1, math.ceil(cooldown_remaining()))
+            print(f"[validate_provisional] Rate-limited by the model; cooldown {retry_seconds}s.")
             return jsonify({"ok": False, "follow_up": f"Validation service rate-limited. Please try again in {retry_seconds} seconds.", "value": None}), 429
 
         # Other errors: return a generic server validation failure
         return jsonify({"ok": False, "follow_up": "Validation failed on server. Please try again later.", "value": None}), 500
 
 
+@app.route('/api/v1/usage/<job_id>', methods=['GET'])
+def job_usage(job_id):
+    """Token usage for one job, broken down per agent and per revision round."""
+    db = get_db()
+    rows = db.execute(
+        "SELECT agent, revision, model, COUNT(*) AS calls, SUM(prompt_tokens) AS prompt_tokens, "
+        "SUM(output_tokens) AS output_tokens, SUM(total_tokens) AS total_tokens "
+        "FROM token_usage WHERE job_id = ? GROUP BY agent, revision, model ORDER BY MIN(id)",
+        (job_id,)
+    ).fetchall()
+    if not rows and not db.execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)).fetchone():
+        return jsonify({"error": "Job not found"}), 404
+    breakdown = [dict(row) for row in rows]
+    total = sum(r["total_tokens"] for r in breakdown)
+    return jsonify({
+        "job_id": job_id,
+        "calls": sum(r["calls"] for r in breakdown),
+        "prompt_tokens": sum(r["prompt_tokens"] for r in breakdown),
+        "output_tokens": sum(r["output_tokens"] for r in breakdown),
+        "total_tokens": total,
+        "job_budget": JOB_TOKEN_BUDGET or None,
+        "breakdown": breakdown,
+    }), 200
+
+
+@app.route('/api/v1/usage', methods=['GET'])
+def daily_usage():
+    """Token usage for a UTC day (?date=YYYY-MM-DD, default today) per agent, with budget headroom."""
+    day = request.args.get('date')
+    rows = get_db().execute(
+        "SELECT agent, COUNT(*) AS calls, COUNT(DISTINCT job_id) AS jobs, SUM(total_tokens) AS total_tokens "
+        f"FROM token_usage WHERE {USAGE_DAY_FILTER} GROUP BY agent ORDER BY total_tokens DESC",
+        (day, day)
+    ).fetchall()
+    used = sum(row["total_tokens"] for row in rows)
+    return jsonify({
+        "date": day or time.strftime("%Y-%m-%d", time.gmtime()),
+        "total_tokens": used,
+        "daily_budget": DAILY_TOKEN_BUDGET or None,
+        "remaining": max(0, DAILY_TOKEN_BUDGET - used) if DAILY_TOKEN_BUDGET else None,
+        "per_agent": [dict(row) for row in rows],
+    }), 200
+
+
+@app.route('/api/v1/trace/<job_id>', methods=['GET'])
+def job_trace(job_id):
+    """The job's spans as a waterfall (offsets from the first span), plus time totals per span name.
+
+    Totals add up nested spans separately, so an agent's total includes its model call's.
+    """
+    store = next((e for e in TRACER.exporters if isinstance(e, tracing.SQLiteExporter)), None)
+    if store is None:
+        return jsonify({"error": "Span storage is not enabled (add sqlite:<path> to TRACE_EXPORT)."}), 501
+    TRACER.flush()
+    spans = store.spans_for_job(job_id)
+    if not spans:
+        return jsonify({"error": "No spans recorded for this job"}), 404
+    origin = spans[0]["start_time"]
+    depth = {}
+    waterfall, totals = [], {}
+    for span in spans:
+        depth[span["span_id"]] = depth.get(span["parent_id"], -1) + 1
+        duration_ms = round((span["end_time"] - span["start_time"]) * 1000, 1)
+        totals[span["name"]] = round(totals.get(span["name"], 0) + duration_ms, 1)
+        waterfall.append({
+            "span_id": span["span_id"],
+            "parent_id": span["parent_id"],
+            "name": span["name"],
+            "depth": depth[span["span_id"]],
+            "offset_ms": round((span["start_time"] - origin) * 1000, 1),
+            "duration_ms": duration_ms,
+            "status": span["status"],
+            "attributes": span["attributes"],
+        })
+    return jsonify({
+        "job_id": job_id,
+        "trace_id": spans[0]["trace_id"],
+        "span_count": len(spans),
+        "duration_ms": round((max(s["end_time"] for s in spans) - origin) * 1000, 1),
+        "totals": [{"name": name, "total_ms": total} for name, total in sorted(totals.items(), key=lambda item: -item[1])],
+        "spans": waterfall,
+    }), 200
+
+
+@app.route('/api/v1/project-events/<job_id>', methods=['GET'])
+def project_events(job_id):
+    """Progress notifications for a job, from whichever worker runs it.
+
+    Query: after=<last seq seen>, wait=<seconds to long-poll for new events, max 30>
+    """
+    after = request.args.get('after', default=0, type=int)
+    wait = min(request.args.get('wait', default=0, type=float), 30.0)
+    deadline = time.time() + wait
+    events = STATE.events_since(job_id, after)
+    while not events and time.time() < deadline:
+        time.sleep(0.5)
+        events = STATE.events_since(job_id, after)
+    last = events[-1]["seq"] if events else after
+    return jsonify({"job_id": job_id, "events": events, "last_seq": last}), 200
+
+
 @app.route('/api/v1/cooldown-status', methods=['GET'])
 def cooldown_status():
     """Return the current model cooldown status so clients can inspect remaining wait time."""
-    global MODEL_COOLDOWN_UNTIL
-    now = time.time()
-    remaining = int(MODEL_COOLDOWN_UNTIL - now) if MODEL_COOLDOWN_UNTIL and MODEL_COOLDOWN_UNTIL > now else 0
+    cooldown_until = STATE.get_cooldown_until()
+    remaining = int(max(0.0, cooldown_until - time.time()))
     return jsonify({
-        "cooldown_until": MODEL_COOLDOWN_UNTIL,
+        "cooldown_until": cooldown_until,
         "remaining_seconds": remaining
     }), 200
 
 
+@app.route('/api/v1/admin/compact', methods=['POST'])
+def admin_compact():
+    """Runs compression, retention and incremental vacuum now; returns the space report.
+
+    Optional JSON: { retention_days: float, retention_mode: "archive"|"delete"|"off" }
+    The overrides need ADMIN_TOKEN configured (and sent as X-Admin-Token): archiving removes jobs
+    from the live db just like deleting does, so only the default pass runs unauthenticated.
+    """
+    if ADMIN_TOKEN and not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        return jsonify({"error": "A valid X-Admin-Token header is required."}), 401
+    body = request.get_json(silent=True) or {}
+    mode = body.get("retention_mode")
+    if mode is not None and mode not in ("archive", "delete", "off"):
+        return jsonify({"error": "retention_mode must be archive, delete or off"}), 400
+    days = body.get("retention_days")
+    if (mode is not None or days is not None) and not ADMIN_TOKEN:
+        return jsonify({"error": "retention_days / retention_mode overrides need ADMIN_TOKEN "
+                                 "to be configured on the server."}), 403
+    if days is not None and (isinstance(days, bool) or not isinstance(days, (int, float))
+                             or not math.isfinite(days) or days <= 0):
+        return jsonify({"error": "retention_days must be a positive number"}), 400
+    try:
+        return jsonify(compact_db(days, mode)), 200
+    except sqlite3.Error as e:
+        return jsonify({"error": f"Compaction failed: {e}"}), 500
+
+
 @app.route('/api/v1/model-status', methods=['GET'])
 def model_status():
-    """Return whether the server has a configured Gemini model (do NOT return the API key)."""
+    """Return whether the server has a configured Gemini model (do NOT return the API key),
+    plus call stats and this worker's circuit breaker state."""
     try:
-        configured = bool(model)
+        # Don't build the client just to answer a status probe.
+        configured = bool(os.environ.get("GEMINI_API_KEY")) and not _model_init_failed
         info = {}
         if configured:
             # Provide non-sensitive info about the configured model
-            info['model_name'] = getattr(model, 'model_name', 'unknown')
+            info['model_name'] = getattr(model, 'model_name', MODEL_NAME)
+            info['initialized'] = model is not None
+            info['routes'] = {}
+            for agent in AGENT_ROUTES:
+                route = resolve_route(agent)
+                info['routes'][agent] = {
+                    'tier': route['tier'],
+                    'model_name': route['model_name'],
+                    'deadline_seconds': route['deadline_seconds'],
+                    'max_output_tokens': route['generation_config'].get('max_output_tokens'),
+                }
         return jsonify({
             'model_configured': configured,
-            'info': info
+            'info': info,
+            'call_stats': STATE.counters("model."),
+            'worker_id': WORKER_ID,
+            'circuit': MODEL_BREAKER.snapshot(),
         }), 200
     except Exception as e:
         return jsonify({'model_configured': False, 'error': str(e)}), 500
 
+@app.route('/api/v1/metrics', methods=['GET'])
+def metrics():
+    """Shared counters (all workers): job lifecycle, model calls, warm starts."""
+    return jsonify({"counters": STATE.counters()}), 200
+
+@app.route('/api/v1/scheduler-status', methods=['GET'])
+def scheduler_status():
+    """This worker's model-call scheduler: slots in use, queued calls and queue wait per class."""
+    return jsonify({"worker_id": WORKER_ID, **MODEL_SCHEDULER.snapshot()}), 200
+
+@app.route('/api/v1/readiness', methods=['GET'])
+def readiness():
+    """Readiness probe plus a startup-time breakdown (imports, init phases) for this worker."""
+    module_import = STARTUP_TIMINGS["phases"].get("module_import", 0.0)
+    return jsonify({
+        "ready": _ready,
+        "worker_id": WORKER_ID,
+        "startup": STARTUP_TIMINGS,
+        "import_budget_seconds": IMPORT_BUDGET_SECONDS,
+        "within_import_budget": module_import <= IMPORT_BUDGET_SECONDS,
+        "model_initialized": model is not None,
+    }), 200 if _ready else 503
+
+# --- Startup ---
+IMPORT_BUDGET_SECONDS = float(os.environ.get("IMPORT_BUDGET_SECONDS", "1.0"))
+_background_started = False  # startup has begun (or finished) in this process
+_ready = False  # the db is initialised and the background threads are running
+_background_lock = threading.Lock()
+
+def start_background_services():
+    """Initialises the db and starts this worker's lease heartbeat and maintenance threads.
+
+    Called once per server process, from `python app.py` or from wsgi.py under gunicorn.
+    If initialisation fails the error propagates and a later call tries again.
+    """
+    global _background_started, _ready
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    try:
+        _start_background_services()
+    except BaseException:
+        with _background_lock:
+            _background_started = False
+        raise
+    _ready = True
+
+def _start_background_services():
+    started = time.perf_counter()
+    init_db()
+    STARTUP_TIMINGS["phases"]["init_db"] = round(time.perf_counter() - started, 4)
+    started = time.perf_counter()
+    backend = STATE.backend
+    STARTUP_TIMINGS["phases"]["state_backend"] = round(time.perf_counter() - started, 4)
+    threading.Thread(target=lease_heartbeat_loop, name="lease-heartbeat", daemon=True).start()
+    threading.Thread(target=maintenance_loop, name="maintenance", daemon=True).start()
+    threading.Thread(target=backfill_search_index, name="search-backfill", daemon=True).start()
+    print(f"[startup] Worker {WORKER_ID} ready (state backend: {type(backend).__name__}).")
+
+STARTUP_TIMINGS["phases"]["module_import"] = round(time.perf_counter() - _MODULE_IMPORT_STARTED, 4)
+if STARTUP_TIMINGS["phases"]["module_import"] > IMPORT_BUDGET_SECONDS:
+    print(f"[startup] app.py import took {STARTUP_TIMINGS['phases']['module_import']}s "
+          f"(budget {IMPORT_BUDGET_SECONDS}s): {STARTUP_TIMINGS['imports']}")
+
 # --- Run the Server ---
 if __name__ == "__main__":
-    init_db()
+    start_background_services()
     print("Starting Flask server at http://127.0.0.1:5000")
     print("---")
     print("1. Open 'form.html' in your browser to create a new project.")
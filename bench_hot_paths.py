@@ -0,0 +1,228 @@
+"""Benchmarks for the pure CPU paths of the API server, with regression checks.
+
+Covers clean_json_response, the chart/Gantt block builder, the JSON-heavy prompt builders, plan
+analytics and the project-status serializer. The corpus comes from completed jobs in jobs.db
+(stored council_results and final reports), topped up with synthetic cases: large plans, fenced
+and prose-wrapped model output, and malformed output that must raise.
+
+    python bench_hot_paths.py                      # run and compare with bench_baseline.json
+    python bench_hot_paths.py --save-baseline      # record the current numbers as the baseline
+    python bench_hot_paths.py --threshold 0.25     # allowed slowdown / extra memory (default 0.2)
+    python bench_hot_paths.py --db path/to/jobs.db --json results.json
+
+Exits 1 if any case is slower (ops/sec) or allocates more (peak KiB per op) than the baseline
+by more than the threshold.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+# Keep the import side-effect free: no shared-state db, no span storage.
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("TRACE_EXPORT", "off")
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+
+DEFAULT_BASELINE = "bench_baseline.json"
+MIN_SECONDS = 0.3  # per repeat
+REPEATS = 3
+SYNTHETIC_PHASES = (4, 12, 40)
+
+
+# --- Corpus ---
+def synthetic_council_results(phases):
+    wbs = [{"id": f"{i}.0", "task": f"Phase {i}: Workstream {i} delivery and hardening",
+            "short_name": f"{i}.0 Stream {i}"} for i in range(1, phases + 1)]
+    return {
+        "initialBrief": {"name": f"Synthetic {phases}", "purpose": "Benchmark plan " * 20,
+                         "audience": "Benchmark users", "competitors": "Alpha, Beta, Gamma"},
+        "smartGoals": [f"Goal {i}: reach {i * 1000} active users within {i} months." for i in range(1, 6)],
+        "competitorAnalysis": {f"Competitor {i}": "Strong brand and distribution." for i in range(8)},
+        "wbs": wbs,
+        "requirements": [{"id": f"FR-{i:02d}", "requirement": "The user must be able to do thing " * 3,
+                          "criteria": "Criteria text " * 5} for i in range(1, phases + 1)],
+        "scheduler_output": {
+            "milestones": {f"Milestone {i}": f"Phase {i} complete" for i in range(1, 5)},
+            "timeline": [{"task": w["short_name"], "start_week": i * 3 + 1, "duration_weeks": 3}
+                         for i, w in enumerate(wbs)],
+        },
+        "user_growth": {"labels": [f"Month {i}" for i in range(1, 7)], "values": [i * 1500 for i in range(1, 7)]},
+        "budget": {"totalEstimate": "$100k - $150k",
+                   "breakdown": [{"item": w["short_name"], "cost": 5000 + i * 250} for i, w in enumerate(wbs)]
+                   + [{"item": "Contingency (15%)", "cost": 9000}]},
+        "risks": [{"risk": f"Risk {i}", "impact": "High", "mitigation": "Mitigate " * 6} for i in range(6)],
+        "communicationsPlan": [{"stakeholder": "Sponsor", "frequency": "Weekly", "method": "Email",
+                                "purpose": "Status"} for _ in range(4)],
+        "qaPlan": [{"metric": f"Metric {i}", "target": "> 95%"} for i in range(6)],
+        "changeControlPlan": {"step1": "Submit", "step2": "Review", "step3": "Approve"},
+    }
+
+
+def model_outputs(council_results):
+    """Model-style responses for clean_json_response, keyed by case name."""
+    section = council_results.get("wbs") or council_results.get("smartGoals") or []
+    body = json.dumps(section, indent=2)
+    everything = json.dumps(council_results, indent=2)
+    return {
+        "fenced": f"```json\n{body}\n```",
+        "prose_wrapped": f"Here is the requested plan section:\n\n{body}\n\nLet me know if you need changes.",
+        "large_plan": f"```json\n{everything}\n```",
+        "malformed": f"```json\n{everything[: len(everything) // 2]}\n```",
+    }
+
+
+def load_corpus(db_path, limit=50):
+    """(council_results list, jobs rows for the status serializer) from jobs.db plus synthetic cases."""
+    plans = [synthetic_council_results(n) for n in SYNTHETIC_PHASES]
+    rows = []
+    if db_path and os.path.exists(db_path):
+        db = sqlite3.connect(db_path)
+        db.row_factory = sqlite3.Row
+        columns = {r[1] for r in db.execute("PRAGMA table_info(jobs)")}
+        select = ["job_id", "status", "current_task", "final_report"] + [
+            c for c in ("report_hash", "warm_start", "council_results") if c in columns]
+        for row in db.execute(
+                f"SELECT {', '.join(select)} FROM jobs WHERE status = 'complete' ORDER BY rowid DESC LIMIT ?", (limit,)):
+            row = dict(row)
+            row.setdefault("report_hash", None)
+            row.setdefault("warm_start", None)
+            if row.get("council_results") is not None:
+                try:
+                    plans.append(json.loads(app.decode_blob(row["council_results"])))
+                except (ValueError, RuntimeError):
+                    pass
+            # Early jobs stored the raw Markdown (or the council JSON) as final_report; reuse the
+            # council JSON as a plan and wrap everything into today's {summary, fullReport} shape.
+            text = app.decode_blob(row["final_report"]) or ""
+            try:
+                stored = json.loads(text)
+            except ValueError:
+                stored = None
+            if isinstance(stored, dict) and "initialBrief" in stored:
+                plans.append(stored)
+            if not (isinstance(stored, dict) and "fullReport" in stored):
+                row["final_report"] = app.encode_blob(json.dumps({"summary": "", "fullReport": text}))
+            rows.append(row)
+        db.close()
+    report = {"summary": "### Key Statistics\n- **Total Budget:** $100k",
+              "fullReport": app.build_synthesizer_prompt(plans[-1]) * 3}
+    for status, final in (("complete", report), ("processing", None), ("failed", None)):
+        rows.append({"job_id": f"synthetic-{status}", "status": status, "current_task": "Step 3/14",
+                     "final_report": app.encode_blob(json.dumps(final)) if final else None,
+                     "report_hash": "0" * 32 if final else None, "warm_start": None})
+    return plans, rows
+
+
+# --- Cases ---
+def build_cases(plans, rows):
+    outputs = [model_outputs(plan) for plan in plans]
+    findings = ["Finding: the budget looks low for the WBS."] * 3
+
+    def parse(kind):
+        texts = [o[kind] for o in outputs]
+        if kind == "malformed":
+            def run():
+                for text in texts:
+                    try:
+                        app.clean_json_response(text)
+                    except ValueError:
+                        pass
+                    else:
+                        raise AssertionError("malformed model output parsed without error")
+            return run, len(texts)
+        return (lambda: [app.clean_json_response(t) for t in texts]), len(texts)
+
+    cases = {f"clean_json_response[{kind}]": parse(kind)
+             for kind in ("fenced", "prose_wrapped", "large_plan", "malformed")}
+    cases["build_chart_blocks"] = (lambda: [app.build_chart_blocks(p) for p in plans], len(plans))
+    cases["build_synthesizer_prompt"] = (lambda: [app.build_synthesizer_prompt(p) for p in plans], len(plans))
+    cases["build_critic_prompt"] = (
+        lambda: [app.build_critic_prompt(p, scope) for p in plans for scope in app.critic_scopes(p)], len(plans))
+    cases["build_reviser_prompt"] = (lambda: [app.build_reviser_prompt(p, findings) for p in plans], len(plans))
+    cases["plan_analytics.analyze"] = (lambda: [app.plan_analytics.analyze(p) for p in plans], len(plans))
+    cases["job_status_payload"] = (lambda: [app.job_status_payload(r) for r in rows], len(rows))
+    return cases
+
+
+def measure(run, ops_per_call):
+    """Best-of-REPEATS ops/sec, and peak traced KiB for one pass divided per op."""
+    run()  # warm-up
+    best = 0.0
+    for _ in range(REPEATS):
+        calls, started = 0, time.perf_counter()
+        while True:
+            run()
+            calls += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= MIN_SECONDS:
+                break
+        best = max(best, calls * ops_per_call / elapsed)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ops_per_sec": round(best, 1), "peak_kib_per_op": round(peak / 1024 / ops_per_call, 1)}
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if current["ops_per_sec"] < base["ops_per_sec"] * (1 - threshold):
+            regressions.append(f"{name}: {current['ops_per_sec']} ops/s vs baseline {base['ops_per_sec']}")
+        if base["peak_kib_per_op"] and current["peak_kib_per_op"] > base["peak_kib_per_op"] * (1 + threshold):
+            regressions.append(f"{name}: {current['peak_kib_per_op']} KiB/op vs baseline {base['peak_kib_per_op']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=app.DATABASE_NAME, help="jobs database to draw the corpus from")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    plans, rows = load_corpus(args.db)
+    print(f"Corpus: {len(plans)} plans, {len(rows)} status rows (db: {args.db})")
+    results = {}
+    # clean_json_response prints diagnostics for malformed input; keep the table readable.
+    for name, (run, ops) in build_cases(plans, rows).items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = measure(run, ops)
+        print(f"  {name:<40} {results[name]['ops_per_sec']:>12,.1f} ops/s {results[name]['peak_kib_per_op']:>10,.1f} KiB/op")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
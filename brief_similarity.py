@@ -0,0 +1,90 @@
+"""MinHash similarity over project briefs.
+
+Used to warm-start a job from a near-duplicate past brief. Briefs are shingled into word
+3-grams, hashed into a fixed-size MinHash signature and bucketed with LSH banding, so finding
+candidates is an indexed equality lookup rather than a scan of every stored brief.
+Pure stdlib; signatures are stable across processes and restarts.
+"""
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+import struct
+from typing import Dict, Iterable, List, Set, Tuple
+
+BRIEF_FIELDS = ("name", "purpose", "audience", "competitors")
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.7 Jaccard almost always share a bucket
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(20240601)  # fixed seed: stored signatures must stay comparable
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+_PACK = struct.Struct(f"<{NUM_PERM}I")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text) -> List[str]:
+    return _WORD_RE.findall(str(text or "").lower())
+
+
+def shingles(text, k: int = SHINGLE_SIZE) -> Set[str]:
+    words = normalize(text)
+    if len(words) < k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def brief_shingles(form_data: Dict, fields: Iterable[str] = BRIEF_FIELDS) -> Set[str]:
+    """Shingles of the brief's text fields, prefixed by field so 'name' words don't match 'purpose'."""
+    return {f"{field}:{s}" for field in fields for s in shingles(form_data.get(field))}
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def signature(shingle_set: Set[str]) -> List[int]:
+    if not shingle_set:
+        return [_MAX_HASH] * NUM_PERM
+    hashes = [_hash(s) for s in shingle_set]
+    return [min(((a * h + b) % _MERSENNE) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def band_keys(sig: List[int]) -> List[Tuple[int, str]]:
+    """(band, bucket) pairs for LSH; two signatures sharing any pair are candidates."""
+    packed = pack(sig)
+    width = ROWS * 4
+    return [
+        (band, hashlib.blake2b(packed[band * width:(band + 1) * width], digest_size=8).hexdigest())
+        for band in range(BANDS)
+    ]
+
+
+def estimate_similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def field_similarity(old, new) -> float:
+    """Exact Jaccard of one field's shingles (1.0 when the normalized text is identical)."""
+    if normalize(old) == normalize(new):
+        return 1.0
+    return jaccard(shingles(old), shingles(new))
+
+
+def pack(sig: List[int]) -> bytes:
+    return _PACK.pack(*sig)
+
+
+def unpack(blob: bytes) -> List[int]:
+    return list(_PACK.unpack(bytes(blob)))
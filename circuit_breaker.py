@@ -0,0 +1,261 @@
+"""Circuit breaker for model calls within one server process.
+
+Outcomes of recent calls are kept for `window_seconds`. Once at least `min_calls` have been seen,
+the circuit opens when the share of failed calls reaches `failure_threshold` or the share of
+slow calls reaches `slow_call_threshold`. A rate-limit error opens it at once, for at least as
+long as the provider asked us to wait. While open, calls fail fast with CircuitOpen. After
+`open_seconds` the circuit is half-open: up to `half_open_probes` calls go through. A good probe
+closes it; a bad one reopens it with the open time doubled (up to `max_open_seconds`).
+
+Errors are classified by type (and HTTP status, for google.api_core errors) rather than by
+message text; only kinds in TRIPPING_KINDS count as failures.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+ERROR_KINDS = ("rate_limit", "unavailable", "timeout", "auth", "invalid_request", "other")
+TRIPPING_KINDS = frozenset({"rate_limit", "unavailable", "timeout", "auth"})
+PROBE_WAIT_SECONDS = 1.0  # retry_after while half-open and every probe slot is taken
+
+# Matched against every class in the error's MRO, so no client library has to be importable here.
+_KIND_BY_CLASS = {
+    "ResourceExhausted": "rate_limit", "TooManyRequests": "rate_limit",
+    "ServiceUnavailable": "unavailable", "InternalServerError": "unavailable", "BadGateway": "unavailable",
+    "ServerError": "unavailable",
+    "DeadlineExceeded": "timeout", "GatewayTimeout": "timeout",
+    "Unauthenticated": "auth", "PermissionDenied": "auth", "Unauthorized": "auth", "Forbidden": "auth",
+    "InvalidArgument": "invalid_request", "BadRequest": "invalid_request", "FailedPrecondition": "invalid_request",
+    "NotFound": "invalid_request", "BlockedPromptException": "invalid_request",
+    "StopCandidateException": "invalid_request",
+}
+_KIND_BY_STATUS = {
+    429: "rate_limit", 500: "unavailable", 502: "unavailable", 503: "unavailable",
+    408: "timeout", 504: "timeout", 401: "auth", 403: "auth",
+    400: "invalid_request", 404: "invalid_request", 409: "invalid_request", 422: "invalid_request",
+}
+_RETRY_RE = re.compile(r"retry in (\d+(?:\.\d+)?)\s*s", re.IGNORECASE)
+
+
+class CircuitOpen(Exception):
+    """The circuit is open: the call was refused without reaching the model."""
+
+    def __init__(self, retry_after: float, reason: Optional[str] = None):
+        self.retry_after = retry_after
+        self.reason = reason
+        super().__init__(f"Model circuit is open ({reason or 'recent failures'}); retry in {retry_after:.0f}s")
+
+
+def classify(error: BaseException) -> str:
+    """One of ERROR_KINDS for an exception raised by a model call."""
+    for cls in type(error).__mro__:
+        kind = _KIND_BY_CLASS.get(cls.__name__)
+        if kind:
+            return kind
+    code = getattr(error, "code", None)  # google.api_core errors carry the HTTP status
+    if isinstance(code, int) and code in _KIND_BY_STATUS:
+        return _KIND_BY_STATUS[code]
+    if isinstance(error, TimeoutError):
+        return "timeout"
+    if isinstance(error, ConnectionError):
+        return "unavailable"
+    return "other"
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """The provider's requested back-off ("Please retry in 12.5s"), if the error carries one."""
+    match = _RETRY_RE.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+class CircuitBreaker:
+    def __init__(self, window_seconds: float = 60.0, min_calls: int = 5, failure_threshold: float = 0.5,
+                 slow_call_threshold: float = 0.5, open_seconds: float = 30.0, max_open_seconds: float = 300.0,
+                 half_open_probes: int = 1, on_transition: Optional[Callable[[str, str, Optional[str]], None]] = None):
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = half_open_probes
+        self.on_transition = on_transition
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._outcomes = deque()  # (monotonic time, failed, slow) while closed
+        self._open_seconds = open_seconds
+        self._open_until = 0.0
+        self._opened_at: Optional[float] = None  # epoch, for reporting
+        self._reason: Optional[str] = None
+        self._probes = 0
+        self._trips = 0
+        self._rejected = 0
+        self._errors = {kind: 0 for kind in ERROR_KINDS}
+        self._last_error: Optional[Dict] = None
+
+    # --- State (lock held) ---
+    def _refresh(self, now: float) -> Optional[tuple]:
+        if self._state == "open" and now >= self._open_until:
+            return self._move("half_open", self._reason)
+        return None
+
+    def _move(self, state: str, reason: Optional[str]) -> tuple:
+        previous, self._state, self._reason = self._state, state, reason
+        return previous, state, reason
+
+    def _trip(self, now: float, reason: str, wait: Optional[float] = None) -> tuple:
+        if self._state == "half_open":
+            self._open_seconds = min(self.max_open_seconds, self._open_seconds * 2)
+        else:
+            self._open_seconds = self.base_open_seconds
+        self._open_until = now + max(self._open_seconds, wait or 0.0)
+        self._opened_at = time.time()
+        self._trips += 1
+        self._outcomes.clear()
+        return self._move("open", reason)
+
+    def _retry_after(self, now: float) -> float:
+        if self._state == "open":
+            return max(0.0, self._open_until - now)
+        if self._state == "half_open" and self._probes >= self.half_open_probes:
+            return PROBE_WAIT_SECONDS
+        return 0.0
+
+    def _notify(self, transition: Optional[tuple]) -> None:
+        if transition and self.on_transition is not None:
+            self.on_transition(*transition)
+
+    # --- Calls ---
+    @property
+    def state(self) -> str:
+        with self._lock:
+            transition = self._refresh(time.monotonic())
+            state = self._state
+        self._notify(transition)
+        return state
+
+    def retry_after(self) -> float:
+        """Seconds until a call could be let through (0 when closed or a probe slot is free)."""
+        with self._lock:
+            now = time.monotonic()
+            transition = self._refresh(now)
+            wait = self._retry_after(now)
+        self._notify(transition)
+        return wait
+
+    def check(self) -> None:
+        """Raises CircuitOpen if a call would be refused right now (doesn't take a probe slot)."""
+        with self._lock:
+            now = time.monotonic()
+            transition = self._refresh(now)
+            wait, reason = self._retry_after(now), self._reason
+            if wait > 0:
+                self._rejected += 1
+        self._notify(transition)
+        if wait > 0:
+            raise CircuitOpen(wait, reason)
+
+    @contextmanager
+    def guard(self, slow_after: Optional[float] = None) -> Iterator[None]:
+        """Wraps one model call: refuses it while open, then records its outcome.
+
+        A call taking `slow_after` seconds or more counts as slow.
+        """
+        with self._lock:
+            now = time.monotonic()
+            transition = self._refresh(now)
+            wait = self._retry_after(now)
+            probe = wait <= 0 and self._state == "half_open"
+            reason = self._reason
+            if wait > 0:
+                self._rejected += 1
+            elif probe:
+                self._probes += 1
+        self._notify(transition)
+        if wait > 0:
+            raise CircuitOpen(wait, reason)
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self._record(probe, time.monotonic() - started, slow_after, e)
+            raise
+        self._record(probe, time.monotonic() - started, slow_after, None)
+
+    def _record(self, probe: bool, latency: float, slow_after: Optional[float], error: Optional[BaseException]) -> None:
+        kind = classify(error) if error is not None else None
+        failed = kind in TRIPPING_KINDS
+        slow = slow_after is not None and latency >= slow_after
+        transition = None
+        with self._lock:
+            now = time.monotonic()
+            if error is not None and not isinstance(error, Exception):
+                # Interrupted (e.g. the thread is shutting down): says nothing about the model.
+                self._probes -= probe
+                return
+            if kind:
+                self._errors[kind] += 1
+                self._last_error = {"kind": kind, "type": type(error).__name__, "message": str(error)[:300],
+                                    "at": time.time()}
+            if probe:
+                self._probes -= 1
+                if failed or slow:
+                    transition = self._trip(now, f"probe {kind or 'slow'}")
+                elif self._state == "half_open":
+                    self._open_seconds = self.base_open_seconds
+                    transition = self._move("closed", None)
+            elif self._state == "closed":
+                if kind == "rate_limit":
+                    transition = self._trip(now, "rate_limit", retry_after_seconds(error))
+                else:
+                    self._outcomes.append((now, failed, slow))
+                    while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+                        self._outcomes.popleft()
+                    calls = len(self._outcomes)
+                    if calls >= self.min_calls:
+                        failures = sum(1 for _, f, _ in self._outcomes if f)
+                        slows = sum(1 for _, _, s in self._outcomes if s)
+                        if failures / calls >= self.failure_threshold:
+                            transition = self._trip(now, f"{failures}/{calls} calls failed")
+                        elif slows / calls >= self.slow_call_threshold:
+                            transition = self._trip(now, f"{slows}/{calls} calls slow")
+        self._notify(transition)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            transition = self._refresh(now)
+            while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+                self._outcomes.popleft()
+            calls = len(self._outcomes)
+            snapshot = {
+                "state": self._state,
+                "reason": self._reason,
+                "retry_after_seconds": round(self._retry_after(now), 1),
+                "opened_at": self._opened_at,
+                "window": {
+                    "seconds": self.window_seconds,
+                    "calls": calls,
+                    "failure_rate": round(sum(1 for _, f, _ in self._outcomes if f) / calls, 3) if calls else None,
+                    "slow_rate": round(sum(1 for _, _, s in self._outcomes if s) / calls, 3) if calls else None,
+                },
+                "thresholds": {
+                    "min_calls": self.min_calls,
+                    "failure_rate": self.failure_threshold,
+                    "slow_rate": self.slow_call_threshold,
+                    "open_seconds": self.base_open_seconds,
+                    "max_open_seconds": self.max_open_seconds,
+                    "half_open_probes": self.half_open_probes,
+                },
+                "trips": self._trips,
+                "rejected_calls": self._rejected,
+                "errors": dict(self._errors),
+                "last_error": self._last_error,
+            }
+        self._notify(transition)
+        return snapshot
@@ -0,0 +1,214 @@
+"""Canned report used when app.USE_DEBUG_DATA is on. Imported lazily so normal startups skip it."""
+
+# --- Sample Data for Debugging (Updated) ---
+# 2. NEW: Debug data is now a JSON object with "summary" and "fullReport"
+DEBUG_REPORT_JSON = {
+    "summary": """
+# Project Dashboard: AI Meal Planner
+
+### Key Statistics
+- **Total Budget:** $500,000 - $615,000
+- **Total Timeline:** 35 Weeks
+- **Key Goal (Adoption):** 15,000 Users in 6 Months
+- **Key Goal (Utility):** $40/mo Average User Savings
+- **Critical Path:** 3.0 Core AI/ML Dev (8 Weeks)
+
+### Actionable Insights
+1.  **High-Impact Risk:** The project's success is critically dependent on securing reliable, real-time grocery sales data. This data pipeline (WBS 3.0) is the main risk and must be validated immediately.
+2.  **Budget Allocation:** The budget has been revised to allocate $200,000 (over 35% of the total) to WBS 3.0, reflecting its high priority and complexity.
+3.  **Go-to-Market:** The timeline for WBS 6.0 (Go-to-Market) has been extended to 6 weeks to properly support the aggressive user acquisition goal of 15,000 users.
+4.  **Metric Verification:** A new QA task, "Metric Verification Study," has been added to ensure the internal AI accuracy score directly correlates with the external goal of $40 in user savings.
+""",
+    "fullReport": """
+# AI Meal Planner App: Comprehensive Project Plan
+
+## 1. Executive Summary
+**Reasoning**
+This section provides a high-level overview of the project's purpose, scope, and key success metrics, establishing the context for executive stakeholders. The core value proposition—using AI to link dietary needs with real-time local grocery sales—is identified as the primary differentiator.
+
+The AI Meal Planner App project aims to deliver a novel solution to help busy professionals and families adhere to healthier eating habits while simultaneously reducing food costs. The core unique selling proposition (USP) is the integration of personalized nutritional planning with real-time, localized grocery store sales data.
+
+The project is estimated to take approximately **35 total weeks** from initiation to post-launch monitoring, with a total budget ranging from **$500,000 to $615,000**. Critical success hinges on the accurate development of the core AI/ML model (WBS 3.0) and aggressive user acquisition strategies post-launch.
+
+Key success metrics include achieving 15,000 registered users within six months and demonstrating an average documented user savings of $40 per month, directly validating the AI's cost-optimization feature.
+
+## 2. Project Goals & Objectives (SMART)
+**Reasoning**
+The objectives are defined using the SMART framework (Specific, Measurable, Achievable, Relevant, Time-bound) to ensure clarity and accountability. These goals focus on both business growth (user adoption, conversion) and core utility (savings, satisfaction).
+
+The following SMART goals govern the project’s success criteria:
+- **User Adoption & Scale:** Achieve a milestone of **15,000 registered users** and **6,000 monthly active users (MAUs)** within the first six months post-launch.
+- **Utility Verification:** Document and communicate an average user grocery savings of **$40 per month**, verified by user surveys and internal metrics, within the first quarter of full operation (Q1).
+- **User Satisfaction:** Maintain a user satisfaction score (CSAT) of **4.5/5.0 or higher** regarding the relevance and health adherence of generated meal plans throughout the first 120 days post-launch.
+- **Monetization:** Establish a subscription conversion rate of **8% or higher** among users completing the 14-day free trial period by the end of the second fiscal quarter.
+
+### User Adoption Goal (First 6 Months)
+<canvas id="userGrowthChart"
+ data-chart-type="line"
+ data-chart-title="User Adoption Goal (First 6 Months)"
+ data-chart-labels='["Month 1", "Month 2", "Month 3", "Month 4", "Month 5", "Month 6"]'
+ data-chart-values='[1000, 2500, 5000, 8000, 12000, 15000]'>
+</canvas>
+
+
+## 3. Market & Competitor Analysis
+**Reasoning**
+Analyzing the competitive landscape identifies existing market gaps and informs the necessary feature set for the AI Meal Planner App to achieve differentiation. The primary gap identified is the lack of real-time, localized sales integration among existing leaders.
+
+| Competitor | Primary Strength | Strategic Implication for AI Planner App |
+| :--- | :--- | :--- |
+| **eMeals** | Highly structured, subscription-based meal plans tailored to specific diets and lifestyles, simplifying the entire weekly planning process. | Must offer comparable structure and adherence features, but with superior personalization and dynamic cost optimization. |
+| **Paprika** | Robust cross-platform recipe management and organization tools for saving and syncing personal collections. | Must prioritize seamless import/export functionality and robust user-generated content tools to minimize user switching costs. |
+| **Yummly** | Leverages a massive, aggregated recipe database with advanced personalization algorithms for superior recipe discovery. | Requires securing early licensing agreements for a high-quality recipe database and focusing AI development on superior utility (cost/health) rather than sheer volume. |
+
+## 4. Project Scope & Work Breakdown Structure (WBS)
+**Reasoning**
+The scope outlines the boundaries of the project, focusing on the development of the core AI engine, data infrastructure, and user-facing application. The WBS breaks down the total effort into seven manageable phases, while user stories define the functional requirements from the end-user perspective.
+
+### Work Breakdown Structure (WBS)
+| ID | Task |
+| :--- | :--- |
+| 1.0 | Project Initiation, Scope Definition, and Monetization Strategy |
+| 2.0 | System Architecture and UX/UI Design |
+| 3.0 | Core AI/ML Model Development and Data Pipeline Establishment |
+| 4.0 | Application Development (Frontend, Backend, and Subscription Flow) |
+| 5.0 | Quality Assurance, Compliance, and Beta Testing |
+| 6.0 | Go-to-Market Strategy, Launch Execution, and User Acquisition |
+| 7.0 | Post-Launch Monitoring, Growth Hacking, and Metric Verification |
+
+### Key Functional Requirements
+| ID | Requirement | Acceptance Criteria |
+| :--- | :--- | :--- |
+| **FR-01** | The user must be able to generate personalized recommendations based on their profile. | Profile setup wizard completion, generation of initial output within 5 seconds, recommendations dynamically update based on profile changes. |
+| **FR-02** | The user must be able to seamlessly upgrade to a premium account. | Successful payment processing via multiple methods (credit card, PayPal), immediate account status update to 'Premium', clear differentiation between free and paid features. |
+| **FR-03** | The user must be able to interact with a clean and intuitive dashboard. | Key metrics visible on the main screen, navigation accessible on all pages, average time-to-task completion under 10 seconds. |
+| **FR-04** | The user must be able to manage their personal data and account settings. | Implementation of industry-standard security protocols (e.g., encryption), clear GDPR/CCPA compliant data deletion process accessible via the settings menu. |
+
+## 5. Visual Timeline & Milestones
+**Reasoning**
+The timeline confirms a **35-week development cycle**, highlighting that the Core AI/ML Model Development (WBS 3.0) is the longest and most critical path component. The Go-to-Market phase (WBS 6.0) has been extended to 6 weeks to properly support user acquisition goals.
+
+### Key Project Milestones
+- **Milestone 1:** Project Scope and Monetization Strategy Lock (Phase Gate Approval)
+- **Milestone 2:** System Architecture and Final UX/UI Design Approved (Technical Blueprint Complete)
+- **Milestone 3:** Feature Complete Alpha Version Deployed (Core AI Integrated and Functional)
+- **Milestone 4:** Successful Public Production Launch
+
+### Projected High-Level Timeline (Gantt Chart)
+<div class="gantt-chart-container">
+    <table class="gantt-chart">
+        <thead>
+            <tr>
+                <th>Task (WBS)</th>
+                <th colspan="4">Weeks 1-4</th>
+                <th colspan="4">Weeks 5-8</th>
+                <th colspan="4">Weeks 9-12</th>
+                <th colspan="4">Weeks 13-16</th>
+                <th colspan="4">Weeks 17-20</th>
+                <th colspan="4">Weeks 21-24</th>
+                <th colspan="4">Weeks 25-28</th>
+                <th colspan="4">Weeks 29-32</th>
+                <th colspan="4">Weeks 33-36</th>
+            </tr>
+        </thead>
+        <tbody>
+            <tr>
+                <td>1.0 Initiation</td>
+                <td colspan="36" class="gantt-row">
+                    <span data-start-week="1" data-duration="4" data-label="4 Weeks"></span>
+                </td>
+            </tr>
+            <tr>
+                <td>2.0 Architecture</td>
+                <td colspan="36" class="gantt-row">
+                    <span data-start-week="5" data-duration="4" data-label="4 Weeks"></span>
+                </td>
+            </tr>
+            <tr>
+                <td>3.0 Core AI/ML Dev</td>
+                <td colspan="36" class="gantt-row">
+                    <span data-start-week="9" data-duration="8" data-label="8 Weeks"></span>
+                </td>
+            </tr>
+            <tr>
+                <td>4.0 App Dev</td>
+                <td colspan="36" class="gantt-row">
+                    <span data-start-week="17" data-duration="6" data-label="6 Weeks"></span>
+                </td>
+            </tr>
+            <tr>
+                <td>5.0 QA & Beta</td>
+                <td colspan="36" class="gantt-row">
+                    <span data-start-week="23" data-duration="4" data-label="4 Weeks"></span>
+                </td>
+            </tr>
+            <tr>
+                <td>6.0 Go-to-Market</td>
+                <td colspan="36" class="gantt-row">
+                    <span data-start-week="27" data-duration="6" data-label="6 Weeks"></span>
+                </td>
+            </tr>
+            <tr>
+                <td>7.0 Post-Launch</td>
+                <td colspan="36" class="gantt-row">
+                    <span data-start-week="33" data-duration="3" data-label="3 Weeks"></span>
+                </td>
+            </tr>
+        </tbody>
+    </table>
+</div>
+
+
+## 6. Budget & Resource Plan
+**Reasoning**
+The budget allocation reflects the technical complexity of the project. The budget for WBS 3.0 (Core AI/ML) has been increased to account for complex data pipeline development. The total budget is now **$500,000 - $615,000**. A 15% contingency buffer is allocated to manage identified risks.
+
+### Budget Allocation
+<canvas id="budgetChart"
+ data-chart-type="horizontalBar"
+ data-chart-title="Budget Allocation (Est: $550k)"
+ data-chart-labels='["1.0 Initiation", "2.0 Architecture", "3.0 Core AI/ML (Rev)", "4.0 App Dev", "5.0 QA", "6.0 Go-to-Market", "7.0 Post-Launch", "Contingency"]'
+ data-chart-values='[40000, 50000, 200000, 100000, 35000, 50000, 10000, 65000]'>
+</canvas>
+
+## 7. Risk Analysis & Mitigation
+**Reasoning**
+A proactive risk strategy is essential, focusing heavily on the reliability of the core AI functionality and the complex task of securing high-quality data (recipes and real-time sales). Mitigation strategies prioritize architectural flexibility and early content acquisition.
+
+| Risk | Impact | Mitigation |
+| :--- | :--- | :--- |
+| **Localized Data Dependency** | **High** | The plan must include a formal discovery phase (WBS 1.1) to confirm the legal and technical feasibility of acquiring real-time, multi-vendor grocery data. |
+| **AI Planning Algorithm Failure** | High | Establish strict KPIs for planning accuracy (e.g., adherence to caloric/macro goals) and run extensive beta testing focusing on real-world feasibility (ingredient cost, prep time, variety) before launch. |
+| **Recipe Database Acquisition** | High | Prioritize securing early licensing agreements with key content providers and focus development resources on robust user-generated content tools to rapidly expand the database organically. |
+| **Low User Adoption** | Medium-High | Prioritize seamless import/export functionality (e.g., common recipe file formats, web scraping tools) and ensure compatibility with popular third-party grocery list and calendar applications. |
+| **AI Model Obsolescence** | Medium | Design the AI architecture to be modular and decoupled from the main application logic, allowing for rapid iteration and replacement of underlying models. |
+
+## 8. Quality Assurance & Control
+**Reasoning**
+This section confirms the commitment to system performance, security, and process integrity. The QA targets are directly linked to the SMART goals and user stories, while the communication plan ensures stakeholder alignment.
+
+### Quality Assurance (QA) Targets
+| Metric | Target | Link to Goal/Story |
+| :--- | :--- | :--- |
+| System Availability (Uptime) | 99.9% or higher during peak hours. | Technical Resilience |
+| Core Function Latency | Median load time < 3.0s (P95 < 5.0s). | FR-01 |
+| Subscription Flow Success | 99.5% success rate for payment processing. | Goal 4, FR-02 |
+| AI Recommendation Accuracy | Internal QA score of 90% or higher. | Goal 2 |
+| **Metric Verification Study** | **Pilot program to correlate internal QA score with external $40 user savings.** | **Goal 2** |
+| User Satisfaction (CSAT) | 4.5/5.0 or higher re: meal plan relevance. | Goal 3 |
+| Security Vulnerability | Zero critical/high-severity vulnerabilities in prod. | FR-04 |
+
+### Communications Plan
+| Stakeholder | Frequency | Method | Purpose |
+| :--- | :--- | :--- | :--- |
+| Executive Leadership | Bi-weekly | Exec. Summary & 15-min Check-in | Review milestones, budget, and critical risks. |
+| General User Base | Monthly | Newsletter / In-App Notification | Provide utility updates, demonstrate value, and share tips. |
+| Power Users (Fitness) | Weekly | Social Channel & Targeted Email | Share deep-dive features, training content, and gather feedback. |
+| Media & PR | As Needed | Press Release / Media Advisory | Control narrative for major launches or partnerships. |
+
+### Change Control Process
+1.  **Submit Change Request (CR):** A formal request detailing the proposed modification, its priority, and its business justification.
+2.  **CCB Analysis:** The Change Control Board (CCB) analyzes the CR's impact on the project baseline and core AI functionality.
+3.  **Decision & Documentation:** Approve, Reject, or Defer the CR. All approved changes are documented, the project plan is updated, and the change is scheduled for implementation.
+"""
+}
@@ -9,26 +9,168 @@ It will list all accessible projects then fetch up to N issues per project.
 Environment variable fallbacks:
     JIRA_DOMAIN, JIRA_EMAIL, JIRA_API_TOKEN
 
+Service mode keeps one warm process with pooled sessions and serves fetches over local HTTP:
+    python jira_fetcher.py --serve --port 8765
+    POST /run  {"domain": ..., "email": ..., "apiToken": ..., "project": ..., "maxIssuesPerProject": ..., "verbose": ...}
+
 """
 from __future__ import annotations
 import os
 import sys
 import argparse
+import io
+import json
+import random
+import threading
 import time
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, TextIO, Tuple
 import requests
 
 DEFAULT_TIMEOUT = 15  # seconds
 ISSUES_PAGE_SIZE = 50
+DEFAULT_SERVE_HOST = '127.0.0.1'
+DEFAULT_SERVE_PORT = 8765
+POOL_MAX_CLIENTS = 32
+POOL_IDLE_SECONDS = 900  # drop a credential set's client (and its token) after 15 idle minutes
+
+# Retry / rate-limit tuning
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5   # seconds, doubled per attempt before jitter
+BACKOFF_CAP = 30.0   # seconds
+MAX_RETRY_AFTER = 60.0  # longest server-requested wait we honour; beyond it the request fails
+RETRY_STATUSES = {429, 502, 503, 504}
+NEAR_LIMIT_FRACTION = 0.1  # slow down once fewer than 10% of the window's requests remain
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """X-RateLimit-Reset is an ISO 8601 timestamp on Jira Cloud; accept epoch seconds too."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value) - time.time())
+    except ValueError:
+        pass
+    try:
+        reset = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if reset.tzinfo is None:
+            reset = reset.replace(tzinfo=timezone.utc)
+        return max(0.0, (reset - datetime.now(timezone.utc)).total_seconds())
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """Adaptive pacing shared by every client talking to the same Jira site.
+
+    Spacing between requests starts at zero, widens when Jira reports the window is nearly
+    spent or answers 429, and decays back once responses come back healthy. A Retry-After
+    pauses every caller sharing the limiter, not just the one that was throttled.
+    """
+
+    def __init__(self, min_interval: float = 0.0, max_interval: float = 5.0):
+        self.base_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self._next_slot = 0.0
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "waited_seconds": 0.0}
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._blocked_until)
+            self._next_slot = slot + self.interval
+            self.stats["requests"] += 1
+            wait = slot - now
+            if wait > 0:
+                self.stats["waited_seconds"] += wait
+        if wait > 0:
+            time.sleep(wait)
+
+    def block_for(self, seconds: float) -> None:
+        seconds = min(seconds, MAX_RETRY_AFTER)  # never hold the site's callers for longer
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def record_retry(self, throttled: bool) -> None:
+        with self._lock:
+            self.stats["retries"] += 1
+            if throttled:
+                self.stats["throttled"] += 1
+                self.interval = min(self.max_interval, max(self.interval * 2, 0.1))
+
+    def observe(self, resp: requests.Response) -> None:
+        """Adapts pacing from Jira's X-RateLimit-* headers."""
+        headers = resp.headers
+        try:
+            limit = int(headers.get('X-RateLimit-Limit', ''))
+            remaining = int(headers.get('X-RateLimit-Remaining', ''))
+        except ValueError:
+            limit = remaining = None
+        near_limit = headers.get('X-RateLimit-NearLimit', '').lower() == 'true'
+        if remaining is not None and limit:
+            near_limit = near_limit or remaining <= limit * NEAR_LIMIT_FRACTION
+        if remaining == 0:
+            reset_in = _parse_reset(headers.get('X-RateLimit-Reset'))
+            if reset_in:
+                self.block_for(reset_in)
+        with self._lock:
+            if near_limit:
+                self.interval = min(self.max_interval, max(self.interval * 2, 0.1))
+            elif resp.status_code < 400:
+                self.interval = max(self.base_interval, self.interval / 2)
+                if self.interval < 0.01:
+                    self.interval = self.base_interval
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, waited_seconds=round(self.stats["waited_seconds"], 3), interval=round(self.interval, 3),
+                        blocked_for=round(max(0.0, self._blocked_until - time.monotonic()), 3))
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(base: str) -> RateLimiter:
+    """Returns the process-wide limiter for a Jira site, creating it on first use."""
+    with _limiters_lock:
+        limiter = _limiters.get(base)
+        if limiter is None:
+            limiter = _limiters[base] = RateLimiter()
+        return limiter
+
 
 class JiraClient:
-    def __init__(self, domain: str, email: str, api_token: str, timeout: int = DEFAULT_TIMEOUT):
+    def __init__(self, domain: str, email: str, api_token: str, timeout: int = DEFAULT_TIMEOUT,
+                 limiter: Optional[RateLimiter] = None, max_retries: int = MAX_RETRIES):
         if not domain.startswith('http'):
             domain = f"https://{domain}"  # allow passing bare domain
         self.base = domain.rstrip('/')
         self.email = email
         self.api_token = api_token
         self.timeout = timeout
+        self.max_retries = max_retries
+        self.limiter = limiter or get_rate_limiter(self.base)
         self.session = requests.Session()
         self.session.auth = (self.email, self.api_token)
         self.session.headers.update({"Accept": "application/json"})
@@ -36,14 +178,50 @@ class JiraClient:
     def _url(self, path: str) -> str:
         return f"{self.base}{path}" if path.startswith('/') else f"{self.base}/{path}"
 
-    def get_projects(self) -> List[Dict[str, Any]]:
+    def _get(self, url: str, params: Dict[str, Any], stats: Optional[Dict[str, int]] = None) -> requests.Response:
+        """GET with shared pacing and jittered exponential backoff on 429/5xx and network errors.
+
+        Retries are counted into `stats["retries"]` (the client is shared, so it keeps no count).
+        A Retry-After longer than MAX_RETRY_AFTER isn't waited out: the response is returned as is.
+        """
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                resp = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                throttled = False
+            else:
+                self.limiter.observe(resp)
+                if resp.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return resp
+                throttled = resp.status_code == 429
+                retry_after = _parse_retry_after(resp.headers.get('Retry-After'))
+                if retry_after is not None and retry_after > MAX_RETRY_AFTER:
+                    return resp
+                if retry_after is not None:
+                    # Jira told us exactly how long to wait; hold every caller on this site.
+                    delay = retry_after + random.uniform(0, BACKOFF_BASE)
+                    self.limiter.block_for(delay)
+                else:
+                    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+            attempt += 1
+            if stats is not None:
+                stats["retries"] = stats.get("retries", 0) + 1
+            self.limiter.record_retry(throttled)
+            time.sleep(delay)
+
+    def get_projects(self, stats: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
         # Using v2 API: /rest/api/2/project/search for pagination
         url = self._url('/rest/api/3/project/search')
         start_at = 0
         projects: List[Dict[str, Any]] = []
         while True:
             params = {"startAt": start_at, "maxResults": 50}
-            resp = self.session.get(url, params=params, timeout=self.timeout)
+            resp = self._get(url, params, stats)
             if resp.status_code == 401:
                 raise SystemExit("Authentication failed: check email/api token.")
             resp.raise_for_status()
@@ -55,7 +233,8 @@ class JiraClient:
             start_at += data.get('maxResults', 0)
         return projects
 
-    def get_issues_for_project(self, project_key: str, limit: int) -> List[Dict[str, Any]]:
+    def get_issues_for_project(self, project_key: str, limit: int,
+                               stats: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
         issues: List[Dict[str, Any]] = []
         start_at = 0
         jql = f'project={project_key} ORDER BY created DESC'
@@ -69,7 +248,7 @@ class JiraClient:
                 "maxResults": max_results,
                 "fields": "summary,status,assignee,created"  # reduce payload
             }
-            resp = self.session.get(url, params=params, timeout=self.timeout)
+            resp = self._get(url, params, stats)
             resp.raise_for_status()
             data = resp.json()
             issues.extend(data.get('issues', []))
@@ -81,51 +260,60 @@ class JiraClient:
 
 def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Fetch Jira projects and issues.")
-    parser.add_argument('--domain', default=os.getenv('JIRA_DOMAIN'), required=os.getenv('JIRA_DOMAIN') is None, help='Jira domain e.g. yourcompany.atlassian.net')
-    parser.add_argument('--email', default=os.getenv('JIRA_EMAIL'), required=os.getenv('JIRA_EMAIL') is None, help='Account email')
-    parser.add_argument('--api-token', default=os.getenv('JIRA_API_TOKEN'), required=os.getenv('JIRA_API_TOKEN') is None, help='Jira API token')
+    parser.add_argument('--domain', default=os.getenv('JIRA_DOMAIN'), help='Jira domain e.g. yourcompany.atlassian.net')
+    parser.add_argument('--email', default=os.getenv('JIRA_EMAIL'), help='Account email')
+    parser.add_argument('--api-token', default=os.getenv('JIRA_API_TOKEN'), help='Jira API token')
     parser.add_argument('--project', help='Optional single project key to limit fetching')
     parser.add_argument('--max-issues-per-project', type=int, default=10, help='Limit of issues per project (default 10)')
     parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT, help='HTTP timeout seconds (default 15)')
     parser.add_argument('--verbose', action='store_true', help='Verbose logging')
-    return parser.parse_args(argv)
+    parser.add_argument('--serve', action='store_true', help='Run as a long-lived local fetch service instead of a one-shot fetch')
+    parser.add_argument('--host', default=os.getenv('JIRA_FETCHER_HOST', DEFAULT_SERVE_HOST), help=f'Service bind host (default {DEFAULT_SERVE_HOST})')
+    parser.add_argument('--port', type=int, default=int(os.getenv('JIRA_FETCHER_PORT', DEFAULT_SERVE_PORT)), help=f'Service port (default {DEFAULT_SERVE_PORT})')
+    args = parser.parse_args(argv)
+    if not args.serve:
+        # Credentials are only mandatory for one-shot runs; the service receives them per request.
+        missing = [flag for flag, value in (('--domain', args.domain), ('--email', args.email), ('--api-token', args.api_token)) if not value]
+        if missing:
+            parser.error(f"the following arguments are required: {', '.join(missing)}")
+    return args
 
 
-def main(argv: Optional[List[str]] = None) -> int:
-    args = parse_args(argv)
-    client = JiraClient(args.domain, args.email, args.api_token, timeout=args.timeout)
-
-    if args.verbose:
-        print(f"Connecting to {client.base} as {client.email}")
+def run_fetch(client: JiraClient, project: Optional[str] = None, max_issues_per_project: int = 10,
+              verbose: bool = False, out: TextIO = sys.stdout, err: TextIO = sys.stderr) -> int:
+    """Lists projects and their latest issues, writing the report to `out`. Returns an exit code."""
+    if verbose:
+        print(f"Connecting to {client.base} as {client.email}", file=out)
+    stats = {"retries": 0}  # this run's own count; pooled clients are shared between runs
 
     try:
-        projects = client.get_projects()
+        projects = client.get_projects(stats)
     except requests.HTTPError as e:
-        print(f"Failed to fetch projects: {e}", file=sys.stderr)
+        print(f"Failed to fetch projects: {e}", file=err)
         return 1
 
     if not projects:
-        print("No projects found or insufficient permissions.")
+        print("No projects found or insufficient permissions.", file=out)
         return 0
 
-    if args.project:
-        projects = [p for p in projects if p.get('key') == args.project]
+    if project:
+        projects = [p for p in projects if p.get('key') == project]
         if not projects:
-            print(f"Project key {args.project} not found.")
+            print(f"Project key {project} not found.", file=out)
             return 1
 
-    print(f"Found {len(projects)} project(s).")
+    print(f"Found {len(projects)} project(s).", file=out)
     for p in projects:
         key = p.get('key')
         name = p.get('name')
-        print(f"\n=== Project {key} - {name} ===")
+        print(f"\n=== Project {key} - {name} ===", file=out)
         try:
-            issues = client.get_issues_for_project(key, args.max_issues_per_project)
+            issues = client.get_issues_for_project(key, max_issues_per_project, stats)
         except requests.HTTPError as e:
-            print(f"Error fetching issues for {key}: {e}")
+            print(f"Error fetching issues for {key}: {e}", file=out)
             continue
         if not issues:
-            print("(No issues returned)")
+            print("(No issues returned)", file=out)
             continue
         for issue in issues:
             iid = issue.get('key')
@@ -134,11 +322,142 @@ def main(argv: Optional[List[str]] = None) -> int:
             status = fields.get('status', {}).get('name')
             assignee = (fields.get('assignee') or {}).get('displayName', 'Unassigned')
             created = fields.get('created')
-            print(f"- {iid} | {status} | {assignee} | {created} | {summary}")
-        time.sleep(0.2)  # small delay to be polite
+            print(f"- {iid} | {status} | {assignee} | {created} | {summary}", file=out)
 
+    retries = stats["retries"]
+    if verbose or retries:
+        print(f"\nRetries: {retries} (site totals: {client.limiter.snapshot()})", file=out)
     return 0
 
 
+# --- Service mode: one warm process, pooled sessions per credential set ---
+
+class ClientPool:
+    """Keeps one JiraClient (and so one pooled requests.Session) per credential set.
+
+    Least recently used clients are dropped beyond `max_clients`, and any client idle for
+    `idle_seconds` is dropped, so API tokens don't stay in memory for the life of the process.
+    """
+
+    def __init__(self, timeout: int = DEFAULT_TIMEOUT, max_clients: int = POOL_MAX_CLIENTS,
+                 idle_seconds: float = POOL_IDLE_SECONDS):
+        self.timeout = timeout
+        self.max_clients = max_clients
+        self.idle_seconds = idle_seconds
+        self._clients: OrderedDict[Tuple[str, str, str], Tuple[JiraClient, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, domain: str, email: str, api_token: str) -> JiraClient:
+        key = (domain.strip().rstrip('/').lower(), email.strip().lower(), api_token)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._clients.pop(key, None)
+            client = entry[0] if entry else JiraClient(domain.strip(), email.strip(), api_token, timeout=self.timeout)
+            self._clients[key] = (client, now)
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+            return client
+
+    def _expire(self, now: float) -> None:
+        """Drops idle clients, oldest first (lock held).
+
+        Their sessions aren't closed here: a request may still be using one, and it is released
+        with the client once that request finishes.
+        """
+        while self._clients:
+            key, (_, last_used) = next(iter(self._clients.items()))
+            if now - last_used < self.idle_seconds:
+                break
+            del self._clients[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._clients)
+
+
+class FetchRequestHandler(BaseHTTPRequestHandler):
+    """Accepts the same JSON body as proxy-server.js and answers with {code, stdout, stderr}."""
+
+    pool: ClientPool  # set by serve()
+    protocol_version = 'HTTP/1.1'
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip('/') == '/health':
+            with _limiters_lock:
+                limiters = {base: limiter.snapshot() for base, limiter in _limiters.items()}
+            self._send_json(200, {"status": "ok", "pid": os.getpid(), "clients": len(self.pool), "rate_limits": limiters})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self) -> None:
+        if self.path.rstrip('/') != '/run':
+            self._send_json(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except (ValueError, json.JSONDecodeError):
+            self._send_json(400, {"error": "Request body must be JSON"})
+            return
+
+        domain, email, api_token = body.get('domain'), body.get('email'), body.get('apiToken')
+        if not domain or not email or not api_token:
+            self._send_json(400, {"error": "Missing domain, email, or apiToken"})
+            return
+
+        out, err = io.StringIO(), io.StringIO()
+        try:
+            max_issues = int(body.get('maxIssuesPerProject') or 10)
+            client = self.pool.get(str(domain), str(email), str(api_token))
+            code = run_fetch(client, project=body.get('project') or None, max_issues_per_project=max_issues,
+                             verbose=bool(body.get('verbose')), out=out, err=err)
+        except SystemExit as e:
+            # get_projects() exits on 401; in service mode that must only end this request.
+            print(e, file=err)
+            code = 1
+        except Exception as e:
+            print(f"Unexpected error: {e}", file=err)
+            code = 1
+        self._send_json(200, {"code": code, "stdout": out.getvalue(), "stderr": err.getvalue()})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Request lines carry no credentials, but keep the default noise off stderr.
+        pass
+
+
+def serve(host: str = DEFAULT_SERVE_HOST, port: int = DEFAULT_SERVE_PORT, timeout: int = DEFAULT_TIMEOUT) -> int:
+    """Runs the fetcher as a threaded local HTTP service until interrupted."""
+    handler = type('BoundFetchRequestHandler', (FetchRequestHandler,), {'pool': ClientPool(timeout=timeout)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"Jira fetcher service listening on http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.serve:
+        return serve(args.host, args.port, timeout=args.timeout)
+    client = JiraClient(args.domain, args.email, args.api_token, timeout=args.timeout)
+    return run_fetch(client, project=args.project, max_issues_per_project=args.max_issues_per_project,
+                     verbose=args.verbose)
+
+
 if __name__ == '__main__':
     raise SystemExit(main())
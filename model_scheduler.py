@@ -0,0 +1,155 @@
+"""Admission scheduler for model calls within one server process.
+
+At most `capacity` model calls run at once. Waiting calls are granted by priority class
+(interactive > critical > revision), then by weighted fair queuing across clients within a
+class, so one client's burst of batch jobs can't monopolise the quota. A call that has waited
+`starvation_seconds` is promoted one class per interval, so low classes always make progress.
+One slot can be held back for interactive calls.
+"""
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+PRIORITY_CLASSES = ("interactive", "critical", "revision")
+_RANK = {name: rank for rank, name in enumerate(PRIORITY_CLASSES)}
+WAIT_WINDOW = 500
+
+
+class SchedulerAborted(Exception):
+    """The caller gave up while waiting for a slot (see `should_abort`)."""
+
+
+class _Ticket:
+    __slots__ = ("priority", "client", "finish", "seq", "enqueued")
+
+    def __init__(self, priority: str, client: str, finish: float, seq: int):
+        self.priority = priority
+        self.client = client
+        self.finish = finish
+        self.seq = seq
+        self.enqueued = time.monotonic()
+
+
+class ModelCallScheduler:
+    def __init__(self, capacity: int, reserved_interactive: int = 1, starvation_seconds: float = 30.0,
+                 weights: Optional[Dict[str, float]] = None):
+        self.capacity = capacity
+        self.reserved_interactive = reserved_interactive if capacity > 1 else 0
+        self.starvation_seconds = starvation_seconds
+        self.weights = dict(weights or {})
+        self._cond = threading.Condition()
+        self._waiting: List[_Ticket] = []
+        self._in_flight = 0
+        self._virtual_time = 0.0
+        self._client_finish: Dict[str, float] = {}
+        self._seq = itertools.count()
+        self._promoted = 0
+        self._waits = {name: deque(maxlen=WAIT_WINDOW) for name in PRIORITY_CLASSES}
+        self._granted = {name: 0 for name in PRIORITY_CLASSES}
+        self._wake_epoch = 0
+
+    def _rank(self, ticket: _Ticket, now: float) -> int:
+        aged = int((now - ticket.enqueued) / self.starvation_seconds) if self.starvation_seconds > 0 else 0
+        return max(0, _RANK[ticket.priority] - aged)
+
+    def _eligible(self, ticket: _Ticket) -> bool:
+        limit = self.capacity if ticket.priority == "interactive" else self.capacity - self.reserved_interactive
+        return self._in_flight < limit
+
+    def _next(self) -> Optional[_Ticket]:
+        now = time.monotonic()
+        eligible = [t for t in self._waiting if self._eligible(t)]
+        if not eligible:
+            return None
+        return min(eligible, key=lambda t: (self._rank(t, now), t.finish, t.seq))
+
+    @contextmanager
+    def slot(self, priority: str, client: str = "anonymous",
+             should_abort: Optional[Callable[[], bool]] = None) -> Iterator[float]:
+        """Blocks until the call may run; yields the seconds spent queued."""
+        if self.capacity <= 0:
+            yield 0.0
+            return
+        if priority not in _RANK:
+            raise ValueError(f"Unknown priority class '{priority}'")
+        with self._cond:
+            start = max(self._virtual_time, self._client_finish.get(client, 0.0))
+            ticket = _Ticket(priority, client, start + 1.0 / self.weights.get(client, 1.0), next(self._seq))
+            self._client_finish[client] = ticket.finish
+            self._waiting.append(ticket)
+        next_abort_check, seen_wake = 0.0, self._wake_epoch
+        try:
+            while True:
+                with self._cond:
+                    if self._next() is ticket:
+                        waited = self._grant(ticket, start)
+                        break
+                    self._cond.wait(timeout=min(1.0, self.starvation_seconds or 1.0))
+                # should_abort may hit a database, so it runs outside the lock: at most once a
+                # second, and right after wake().
+                if should_abort is not None and (time.monotonic() >= next_abort_check or seen_wake != self._wake_epoch):
+                    seen_wake = self._wake_epoch
+                    if should_abort():
+                        raise SchedulerAborted()
+                    next_abort_check = time.monotonic() + 1.0
+        except BaseException:
+            with self._cond:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                self._cond.notify_all()
+            raise
+        try:
+            yield waited
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def _grant(self, ticket: _Ticket, start: float) -> float:
+        """Moves a ticket from the queue to in-flight (lock held). Returns its queue wait."""
+        self._waiting.remove(ticket)
+        self._in_flight += 1
+        self._virtual_time = max(self._virtual_time, start)
+        now = time.monotonic()
+        waited = now - ticket.enqueued
+        if self._rank(ticket, now) < _RANK[ticket.priority]:
+            self._promoted += 1
+        self._waits[ticket.priority].append(waited)
+        self._granted[ticket.priority] += 1
+        self._cond.notify_all()  # another slot may still be free for the next ticket
+        return waited
+
+    def wake(self) -> None:
+        """Makes every waiting call re-check `should_abort` now (e.g. after a job is cancelled)."""
+        with self._cond:
+            self._wake_epoch += 1
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            queued = {name: 0 for name in PRIORITY_CLASSES}
+            for ticket in self._waiting:
+                queued[ticket.priority] += 1
+            waits = {}
+            for name, samples in self._waits.items():
+                ordered = sorted(samples)
+                waits[name] = {
+                    "granted": self._granted[name],
+                    "avg_seconds": round(sum(ordered) / len(ordered), 3) if ordered else None,
+                    "p50_seconds": round(ordered[len(ordered) // 2], 3) if ordered else None,
+                    "p95_seconds": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3) if ordered else None,
+                    "max_seconds": round(ordered[-1], 3) if ordered else None,
+                }
+            return {
+                "capacity": self.capacity,
+                "reserved_interactive": self.reserved_interactive,
+                "in_flight": self._in_flight,
+                "queued": queued,
+                "starvation_promotions": self._promoted,
+                "queue_wait": waits,
+            }
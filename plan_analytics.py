@@ -0,0 +1,281 @@
+"""Deterministic figures and consistency checks for a council plan.
+
+Budget totals, timeline length, the critical path and whether the budget and timeline cover every
+WBS item are all computable from council_results, so they are worked out here instead of asking
+the model. `analyze` feeds the executive summary and lets the QA critic skip the scopes its hard
+checks already cover. Pure stdlib; runs in microseconds on a typical plan.
+
+Check severities:
+    hard   the plan is internally inconsistent (WBS items without a budget line or schedule,
+           unparseable numbers, a breakdown that disagrees with the stated estimate)
+    soft   worth a look, but not necessarily wrong (budget lines outside the WBS, contingency
+           share, growth curve shape)
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+CONTINGENCY_SHARE = 0.15  # the Finance Manager is asked for a 15% contingency line
+CONTINGENCY_TOLERANCE = 0.05
+ESTIMATE_TOLERANCE = 0.10  # breakdown total may sit this far outside the stated range
+# A whole number, an optional k/M suffix that ends a word ("5k", not the "m" of "5000 marketing"),
+# and not a percentage or a duration ("15%", "12 months").
+_AMOUNT_RE = re.compile(
+    r"([$€£])?\s*(?<![\d.,])(\d[\d,]*(?:\.\d+)?)(?![\d,]|\.\d)\s*(?:([kKmM])\b)?"
+    r"(?!\s*(?:%|percent\b|(?:hours?|days?|weeks?|wks?|months?|mos?|quarters?|years?|yrs?)\b))"
+)
+_RANGE_JOIN_RE = re.compile(r"\s*(?:-|–|—|to|and)\s*", re.IGNORECASE)
+_MULTIPLIERS = {"k": 1e3, "m": 1e6}
+
+
+# --- Parsing ---
+def _amounts(text: str) -> List[Tuple[float, bool, int, int]]:
+    """(value, has_currency_symbol, start, end) for every amount in the text."""
+    return [(float(m.group(2).replace(",", "")) * _MULTIPLIERS.get((m.group(3) or "").lower(), 1),
+             bool(m.group(1)), m.start(), m.end())
+            for m in _AMOUNT_RE.finditer(text)]
+
+
+def _first_amount_index(amounts) -> Optional[int]:
+    """The first amount with a currency symbol, else the first amount."""
+    if not amounts:
+        return None
+    return next((i for i, amount in enumerate(amounts) if amount[1]), 0)
+
+
+def parse_amount(value) -> Optional[float]:
+    """5000, "5000", "$5,000", "$5k" or "$1.2M" -> float; None if there's no number."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    amounts = _amounts(str(value or ""))
+    i = _first_amount_index(amounts)
+    return None if i is None else amounts[i][0]
+
+
+def parse_range(text) -> Optional[Tuple[float, float]]:
+    """"$100k - $150k" -> (100000.0, 150000.0); a single amount gives (x, x).
+
+    Only the first amount and, if joined to it by "-", "to" or "and", the one after it count;
+    so "$80k over 12 months" is (80000.0, 80000.0).
+    """
+    text = str(text or "")
+    amounts = _amounts(text)
+    i = _first_amount_index(amounts)
+    if i is None:
+        return None
+    low = high = amounts[i][0]
+    if i + 1 < len(amounts) and _RANGE_JOIN_RE.fullmatch(text[amounts[i][3]:amounts[i + 1][2]]):
+        high = amounts[i + 1][0]
+    return min(low, high), max(low, high)
+
+
+def format_money(amount: float) -> str:
+    return f"${amount:,.0f}"
+
+
+def _key(name) -> str:
+    return " ".join(str(name or "").lower().split())
+
+
+def _is_contingency(item) -> bool:
+    return "contingency" in _key(item)
+
+
+def _wbs_names(council_results) -> List[str]:
+    wbs = council_results.get("wbs")
+    if not isinstance(wbs, list):
+        return []
+    return [w.get("short_name") or w.get("task") for w in wbs if isinstance(w, dict)]
+
+
+# --- Figures ---
+def budget_figures(council_results) -> Dict[str, Any]:
+    budget = council_results.get("budget") if isinstance(council_results.get("budget"), dict) else {}
+    breakdown = budget.get("breakdown") if isinstance(budget.get("breakdown"), list) else []
+    work, contingency, unparsed = 0.0, 0.0, []
+    for entry in breakdown:
+        entry = entry if isinstance(entry, dict) else {}
+        cost = parse_amount(entry.get("cost"))
+        if cost is None:
+            unparsed.append(entry.get("item"))
+        elif _is_contingency(entry.get("item")):
+            contingency += cost
+        else:
+            work += cost
+    return {
+        "items": len(breakdown),
+        "work_total": work,
+        "contingency": contingency,
+        "total": work + contingency,
+        "contingency_share": round(contingency / work, 3) if work else None,
+        "stated_estimate": budget.get("totalEstimate"),
+        "stated_range": parse_range(budget.get("totalEstimate")),
+        "unparsed_items": unparsed,
+    }
+
+
+def _timeline(council_results) -> List[Dict[str, Any]]:
+    scheduler = council_results.get("scheduler_output")
+    timeline = scheduler.get("timeline") if isinstance(scheduler, dict) else None
+    return [t for t in timeline if isinstance(t, dict)] if isinstance(timeline, list) else []
+
+
+def _task_weeks(task) -> Optional[Tuple[int, int]]:
+    """(start_week, duration_weeks) if both are positive whole numbers."""
+    start, duration = task.get("start_week"), task.get("duration_weeks")
+    if isinstance(start, bool) or isinstance(duration, bool):
+        return None
+    try:
+        start, duration = float(start), float(duration)
+    except (TypeError, ValueError):
+        return None
+    if start < 1 or duration <= 0 or not start.is_integer() or not duration.is_integer():
+        return None
+    return int(start), int(duration)
+
+
+def timeline_figures(council_results) -> Dict[str, Any]:
+    tasks = [(t.get("task"), weeks) for t in _timeline(council_results) if (weeks := _task_weeks(t))]
+    if not tasks:
+        return {"tasks": 0, "total_weeks": 0, "first_week": None, "last_week": None}
+    first = min(start for _, (start, _) in tasks)
+    last = max(start + duration - 1 for _, (start, duration) in tasks)
+    return {"tasks": len(tasks), "total_weeks": last - first + 1, "first_week": first, "last_week": last}
+
+
+def critical_path(council_results) -> Dict[str, Any]:
+    """Longest chain of tasks where each starts after the previous one ends.
+
+    The timeline has no explicit dependencies, so a task is taken to depend on any task that
+    finishes before it starts. Returns {tasks, weeks}.
+    """
+    tasks = sorted(
+        ((t.get("task"), weeks) for t in _timeline(council_results) if (weeks := _task_weeks(t))),
+        key=lambda task: task[1][0],
+    )
+    best: List[int] = []  # longest chain (weeks of work) ending with task i
+    previous: List[Optional[int]] = []
+    for i, (_, (start, duration)) in enumerate(tasks):
+        best.append(duration)
+        previous.append(None)
+        for j in range(i):
+            prior_start, prior_duration = tasks[j][1]
+            if prior_start + prior_duration <= start and best[j] + duration > best[i]:
+                best[i], previous[i] = best[j] + duration, j
+    if not tasks:
+        return {"tasks": [], "weeks": 0}
+    end = max(range(len(tasks)), key=lambda k: (best[k], tasks[k][1][0]))
+    chain, i = [], end
+    while i is not None:
+        chain.append(tasks[i][0])
+        i = previous[i]
+    return {"tasks": chain[::-1], "weeks": best[end]}
+
+
+# --- Consistency checks ---
+def _check(check_id: str, severity: str, problems: List[str], ok_message: str) -> Dict[str, Any]:
+    return {"id": check_id, "severity": severity, "ok": not problems,
+            "message": "; ".join(problems) if problems else ok_message}
+
+
+def run_checks(council_results, budget) -> List[Dict[str, Any]]:
+    wbs = [name for name in _wbs_names(council_results) if name]
+    wbs_keys = {_key(name) for name in wbs}
+    breakdown = council_results["budget"].get("breakdown") if isinstance(council_results.get("budget"), dict) else None
+    budget_items = [e.get("item") for e in breakdown if isinstance(e, dict) and not _is_contingency(e.get("item"))] \
+        if isinstance(breakdown, list) else []
+    budget_keys = {_key(item) for item in budget_items}
+    raw_tasks = _timeline(council_results)
+    timeline_keys = {_key(t.get("task")) for t in raw_tasks}
+    checks = []
+
+    missing = [n for n in wbs if _key(n) not in budget_keys]
+    checks.append(_check("budget.covers_wbs", "hard",
+                         [f"The budget breakdown has no line for WBS item(s) {', '.join(map(str, missing))}."] if missing else [],
+                         "Every WBS item has a budget line."))
+    unknown = [i for i in budget_items if _key(i) not in wbs_keys]
+    checks.append(_check("budget.items_in_wbs", "soft",
+                         [f"Budget line(s) {', '.join(map(str, unknown))} match no WBS short_name."] if wbs and unknown else [],
+                         "Every budget line maps to a WBS item."))
+    checks.append(_check("budget.costs_numeric", "hard",
+                         [f"Budget line(s) {', '.join(map(str, budget['unparsed_items']))} have no numeric cost."]
+                         if budget["unparsed_items"] else [],
+                         "Every budget cost is a number."))
+    problems = []
+    if budget["stated_range"] and budget["total"]:
+        low, high = budget["stated_range"]
+        if not low * (1 - ESTIMATE_TOLERANCE) <= budget["total"] <= high * (1 + ESTIMATE_TOLERANCE):
+            problems.append(f"The breakdown adds up to {format_money(budget['total'])}, outside the stated "
+                            f"total estimate of {budget['stated_estimate']}.")
+    checks.append(_check("budget.matches_estimate", "hard", problems,
+                         "The breakdown total agrees with the stated estimate."))
+
+    missing = [n for n in wbs if _key(n) not in timeline_keys]
+    checks.append(_check("timeline.covers_wbs", "hard",
+                         [f"The timeline does not schedule WBS item(s) {', '.join(map(str, missing))}."] if missing else [],
+                         "Every WBS item is scheduled."))
+    invalid = [t.get("task") for t in raw_tasks if _task_weeks(t) is None]
+    checks.append(_check("timeline.valid_weeks", "hard",
+                         [f"Timeline task(s) {', '.join(map(str, invalid))} need a whole start_week >= 1 and "
+                          "duration_weeks > 0."] if invalid else [],
+                         "Every timeline task has valid weeks."))
+
+    share = budget["contingency_share"]
+    problems = []
+    if budget["work_total"] and not budget["contingency"]:
+        problems.append("The budget has no contingency line.")
+    elif share is not None and abs(share - CONTINGENCY_SHARE) > CONTINGENCY_TOLERANCE:
+        problems.append(f"Contingency is {share:.0%} of the work budget (expected about {CONTINGENCY_SHARE:.0%}).")
+    checks.append(_check("budget.contingency", "soft", problems, "Contingency is in the expected range."))
+
+    growth = council_results.get("user_growth") if isinstance(council_results.get("user_growth"), dict) else {}
+    labels, values = growth.get("labels") or [], growth.get("values") or []
+    numbers = [parse_amount(v) for v in values]
+    problems = []
+    if len(labels) != len(values):
+        problems.append(f"User growth has {len(labels)} labels but {len(values)} values.")
+    if any(n is None for n in numbers):
+        problems.append("User growth has non-numeric values.")
+    elif any(b < a for a, b in zip(numbers, numbers[1:])):
+        problems.append("User growth targets decrease over time.")
+    checks.append(_check("growth.consistent", "soft", problems, "User growth targets are consistent."))
+    return checks
+
+
+def analyze(council_results) -> Dict[str, Any]:
+    """All figures and checks for a plan. hard_checks_passed is False if any hard check failed."""
+    council_results = council_results if isinstance(council_results, dict) else {}
+    budget = budget_figures(council_results)
+    checks = run_checks(council_results, budget)
+    return {
+        "budget": budget,
+        "timeline": timeline_figures(council_results),
+        "critical_path": critical_path(council_results),
+        "checks": checks,
+        "hard_checks_passed": all(c["ok"] for c in checks if c["severity"] == "hard"),
+    }
+
+
+def summary_lines(analytics) -> List[str]:
+    """Markdown bullets of the computed figures, for the executive summary prompt."""
+    budget, timeline, path = analytics["budget"], analytics["timeline"], analytics["critical_path"]
+    lines = []
+    if budget["total"]:
+        line = f"- **Budget Breakdown Total:** {format_money(budget['total'])}"
+        if budget["contingency"]:
+            line += f" (incl. {format_money(budget['contingency'])} contingency)"
+        if budget["stated_estimate"]:
+            line += f"; stated estimate {budget['stated_estimate']}"
+        lines.append(line)
+    if timeline["tasks"]:
+        lines.append(f"- **Total Timeline:** {timeline['total_weeks']} Weeks "
+                     f"(weeks {timeline['first_week']}-{timeline['last_week']}, {timeline['tasks']} tasks)")
+    if path["tasks"]:
+        lines.append(f"- **Critical Path:** {' -> '.join(map(str, path['tasks']))} ({path['weeks']} Weeks)")
+    for check in analytics["checks"]:
+        if not check["ok"]:
+            lines.append(f"- **Consistency ({check['severity']}):** {check['message']}")
+    return lines
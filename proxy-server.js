@@ -3,6 +3,10 @@
 //   1) npm install
 //   2) node proxy-server.js
 //   3) Frontend will POST to /api/jira_fetcher/run with Jira credentials.
+//
+// Requests are forwarded to one long-lived `jira_fetcher.py --serve` worker (started here, or
+// pointed at with FETCHER_WORKER_URL) so interpreter startup and TLS sessions are reused.
+// If the worker is unreachable we fall back to spawning a one-shot Python process.
 
 const path = require('path');
 const express = require('express');
@@ -21,12 +25,60 @@ function choosePythonCmd() {
   return process.env.PYTHON_CMD || 'python';
 }
 
-app.post('/api/jira_fetcher/run', (req, res) => {
-  const { domain, email, apiToken, project, maxIssuesPerProject, verbose } = req.body || {};
-  if (!domain || !email || !apiToken) {
-    return res.status(400).json({ error: 'Missing domain, email, or apiToken' });
+// --- Persistent fetcher worker ---
+const workerPort = process.env.FETCHER_WORKER_PORT || '8765';
+const workerUrl = process.env.FETCHER_WORKER_URL || `http://127.0.0.1:${workerPort}`;
+let worker = null;
+
+// Restarts back off exponentially (1s, 2s, 4s ... capped) and stop after WORKER_MAX_RESTARTS
+// consecutive failures; a worker that stayed up for WORKER_STABLE_MS resets the count. With no
+// worker, requests still fall back to one-shot processes.
+const WORKER_RESTART_BASE_MS = 1000;
+const WORKER_RESTART_MAX_MS = 60000;
+const WORKER_MAX_RESTARTS = Number(process.env.FETCHER_WORKER_MAX_RESTARTS || 8);
+const WORKER_STABLE_MS = 60000;
+let workerRestarts = 0;
+
+function scheduleWorkerRestart(reason, startedAt) {
+  if (Date.now() - startedAt >= WORKER_STABLE_MS) { workerRestarts = 0; }
+  if (workerRestarts >= WORKER_MAX_RESTARTS) {
+    console.error(`Fetcher worker ${reason}; giving up after ${workerRestarts} restarts (using one-shot processes).`);
+    return;
   }
+  const delay = Math.min(WORKER_RESTART_MAX_MS, WORKER_RESTART_BASE_MS * 2 ** workerRestarts);
+  workerRestarts += 1;
+  console.error(`Fetcher worker ${reason}; restart ${workerRestarts}/${WORKER_MAX_RESTARTS} in ${delay / 1000}s`);
+  setTimeout(startWorker, delay);
+}
+
+function startWorker() {
+  if (process.env.FETCHER_WORKER_URL) { return; } // externally managed
+  const startedAt = Date.now();
+  const child = spawn(choosePythonCmd(), [fetcherPath, '--serve', '--port', workerPort], { cwd: __dirname, env: process.env });
+  worker = child;
+  let restartScheduled = false;
+  const onDown = (reason) => {
+    if (worker === child) { worker = null; }
+    if (restartScheduled) { return; }  // 'error' and 'exit' can both fire for one failure
+    restartScheduled = true;
+    scheduleWorkerRestart(reason, startedAt);
+  };
+  child.stdout.on('data', (d) => { process.stdout.write(`[fetcher] ${d}`); });
+  child.stderr.on('data', (d) => { process.stderr.write(`[fetcher] ${d}`); });
+  child.on('error', (err) => { onDown(`failed to start (${err.message})`); });
+  child.on('exit', (code) => { onDown(`exited with code ${code}`); });
+}
+
+async function runViaWorker(body) {
+  const resp = await fetch(`${workerUrl}/run`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body)
+  });
+  return { status: resp.status, payload: await resp.json() };
+}
 
+function runViaSpawn(res, { domain, email, apiToken, project, maxIssuesPerProject, verbose }) {
   const args = [
     fetcherPath,
     '--domain', String(domain),
@@ -51,12 +103,30 @@ app.post('/api/jira_fetcher/run', (req, res) => {
     res.setHeader('Content-Type', 'application/json');
     res.send(JSON.stringify({ code, stdout, stderr }));
   });
+}
+
+app.post('/api/jira_fetcher/run', async (req, res) => {
+  const body = req.body || {};
+  const { domain, email, apiToken } = body;
+  if (!domain || !email || !apiToken) {
+    return res.status(400).json({ error: 'Missing domain, email, or apiToken' });
+  }
+
+  try {
+    const { status, payload } = await runViaWorker(body);
+    return res.status(status).json(payload);
+  } catch (err) {
+    console.error('Fetcher worker unavailable, falling back to one-shot process:', err.message);
+    return runViaSpawn(res, body);
+  }
 });
 
 app.get('/api/health', (_req, res) => {
-  res.json({ status: 'ok', time: new Date().toISOString(), script: fetcherPath });
+  res.json({ status: 'ok', time: new Date().toISOString(), script: fetcherPath, worker: workerUrl });
 });
 
+startWorker();
+
 const PORT = process.env.PORT || 3000;
 app.listen(PORT, () => {
   console.log(`Fetcher server listening on http://localhost:${PORT}`);
@@ -0,0 +1,134 @@
+"""Server-side rendering of finished reports to sanitized HTML.
+
+Reports are Markdown with embedded chart/Gantt markup (`<canvas data-chart-*>`, the
+`gantt-chart` table). They're rendered once when a job completes so report pages can fetch
+ready HTML instead of running marked.js over the Markdown on every view.
+
+Rendering needs the optional `markdown` package; without it render_report() returns None and
+clients keep rendering client-side.
+"""
+from __future__ import annotations
+
+import hashlib
+import html
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import markdown as _markdown
+except ImportError:
+    _markdown = None
+
+RENDERER_VERSION = "1"  # bump to invalidate cached HTML when rendering rules change
+
+ALLOWED_TAGS = {
+    "a", "b", "blockquote", "br", "canvas", "code", "del", "div", "em", "h1", "h2", "h3", "h4",
+    "h5", "h6", "hr", "i", "li", "ol", "p", "pre", "span", "strong", "sub", "sup", "table",
+    "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+}
+VOID_TAGS = {"br", "hr"}
+# Tags whose content is dropped along with the tag itself.
+DROP_CONTENT_TAGS = {"script", "style", "iframe", "object", "embed", "noscript", "template"}
+GLOBAL_ATTRS = {"class", "id", "title"}
+TAG_ATTRS = {
+    "a": {"href"},
+    "td": {"colspan", "rowspan", "align"},
+    "th": {"colspan", "rowspan", "align"},
+}
+SAFE_URL = re.compile(r"^(https?:|mailto:|#|/)", re.IGNORECASE)
+SAFE_STYLE = re.compile(r"^\s*text-align:\s*(left|right|center)\s*;?\s*$", re.IGNORECASE)
+
+
+class _Sanitizer(HTMLParser):
+    """Allowlist sanitizer: keeps known-safe tags/attributes, escapes everything else."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out: List[str] = []
+        self.open_tags: List[str] = []
+        self.dropping = 0
+
+    def _attrs(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> str:
+        kept = []
+        allowed = GLOBAL_ATTRS | TAG_ATTRS.get(tag, set())
+        for name, value in attrs:
+            name = name.lower()
+            value = value or ""
+            if name.startswith("data-") and re.fullmatch(r"data-[a-z0-9-]+", name):
+                pass
+            elif name == "style" and SAFE_STYLE.match(value):
+                pass
+            elif name == "href" and "href" in allowed:
+                if not SAFE_URL.match(value.strip()):
+                    continue
+            elif name not in allowed:
+                continue
+            kept.append(f' {name}="{html.escape(value, quote=True)}"')
+        return "".join(kept)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        self.out.append(f"<{tag}{self._attrs(tag, attrs)}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        self.out.append(f"<{tag}{self._attrs(tag, attrs)}>")
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # Close anything left open inside this element so the output stays well-formed.
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.out.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.out.append(html.escape(data, quote=False))
+
+    def close(self) -> str:
+        super().close()
+        while self.open_tags:
+            self.out.append(f"</{self.open_tags.pop()}>")
+        return "".join(self.out)
+
+
+def sanitize_html(raw_html: str) -> str:
+    sanitizer = _Sanitizer()
+    sanitizer.feed(raw_html)
+    return sanitizer.close()
+
+
+def render_markdown(text: str) -> str:
+    """Markdown -> sanitized HTML. Requires the `markdown` package."""
+    rendered = _markdown.markdown(text or "", extensions=["tables", "fenced_code", "sane_lists"])
+    return sanitize_html(rendered)
+
+
+def render_report(report: Dict[str, str]) -> Optional[Dict[str, str]]:
+    """Renders a {"summary", "fullReport"} report. Returns None if `markdown` isn't installed."""
+    if _markdown is None:
+        return None
+    rendered = {
+        "summary": render_markdown(report.get("summary", "")),
+        "fullReport": render_markdown(report.get("fullReport", "")),
+    }
+    digest = hashlib.sha256(RENDERER_VERSION.encode("utf-8"))
+    digest.update(rendered["summary"].encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(rendered["fullReport"].encode("utf-8"))
+    rendered["hash"] = digest.hexdigest()[:32]
+    return rendered
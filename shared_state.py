@@ -0,0 +1,292 @@
+"""Process-shared runtime state for the API server.
+
+Everything that must agree across several server workers (or hosts sharing a volume) lives
+behind a StateBackend: the model cooldown, job leases, job progress events and counters.
+
+Backends are chosen with the STATE_BACKEND environment variable:
+    sqlite:<path>          default; safe across processes on one machine / shared volume
+    memory                 single-process only (tests, scripts)
+    <module>:<ClassName>   any importable StateBackend subclass, constructed with no args
+"""
+from __future__ import annotations
+
+import importlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class StateBackend:
+    """Interface for shared runtime state. All times are epoch seconds."""
+
+    # --- Model cooldown ---
+    def get_cooldown_until(self) -> float:
+        raise NotImplementedError
+
+    def extend_cooldown(self, until: float) -> float:
+        """Moves the cooldown to `until` unless it's already later. Returns the effective value."""
+        raise NotImplementedError
+
+    # --- Job leases ---
+    def acquire_lease(self, job_id: str, owner: str, ttl: float) -> bool:
+        """Takes the lease if it is free, expired or already ours."""
+        raise NotImplementedError
+
+    def renew_leases(self, owner: str, ttl: float) -> int:
+        """Extends every lease held by `owner`. Returns how many were renewed."""
+        raise NotImplementedError
+
+    def release_lease(self, job_id: str, owner: str) -> None:
+        raise NotImplementedError
+
+    def lease_holder(self, job_id: str) -> Optional[str]:
+        """Current live holder of a lease, or None if free/expired."""
+        raise NotImplementedError
+
+    # --- Progress notifications ---
+    def publish_event(self, job_id: str, event: Dict[str, Any]) -> int:
+        """Appends an event to the job's stream. Returns its sequence number."""
+        raise NotImplementedError
+
+    def events_since(self, job_id: str, after: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def prune_events(self, before: float) -> int:
+        """Drops events created before `before`. Returns how many were removed."""
+        raise NotImplementedError
+
+    # --- Counters ---
+    def incr(self, name: str, amount: float = 1) -> None:
+        raise NotImplementedError
+
+    def counters(self, prefix: str = "") -> Dict[str, float]:
+        raise NotImplementedError
+
+
+class MemoryStateBackend(StateBackend):
+    """In-process backend. Only correct with a single server process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cooldown_until = 0.0
+        self._leases: Dict[str, tuple] = {}
+        self._events: List[Dict[str, Any]] = []
+        self._last_seq = 0  # never reused, like the SQLite backend's AUTOINCREMENT
+        self._counters: Dict[str, float] = {}
+
+    def get_cooldown_until(self) -> float:
+        with self._lock:
+            return self._cooldown_until
+
+    def extend_cooldown(self, until: float) -> float:
+        with self._lock:
+            self._cooldown_until = max(self._cooldown_until, until)
+            return self._cooldown_until
+
+    def acquire_lease(self, job_id: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            holder = self._leases.get(job_id)
+            if holder and holder[0] != owner and holder[1] > now:
+                return False
+            self._leases[job_id] = (owner, now + ttl)
+            return True
+
+    def renew_leases(self, owner: str, ttl: float) -> int:
+        expires = time.time() + ttl
+        with self._lock:
+            mine = [job_id for job_id, (holder, _) in self._leases.items() if holder == owner]
+            for job_id in mine:
+                self._leases[job_id] = (owner, expires)
+            return len(mine)
+
+    def release_lease(self, job_id: str, owner: str) -> None:
+        with self._lock:
+            if self._leases.get(job_id, (None,))[0] == owner:
+                del self._leases[job_id]
+
+    def lease_holder(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            holder = self._leases.get(job_id)
+            return holder[0] if holder and holder[1] > time.time() else None
+
+    def publish_event(self, job_id: str, event: Dict[str, Any]) -> int:
+        with self._lock:
+            self._last_seq += 1
+            seq = self._last_seq
+            self._events.append({"seq": seq, "job_id": job_id, "created_at": time.time(), **event})
+            return seq
+
+    def events_since(self, job_id: str, after: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [e for e in self._events if e["job_id"] == job_id and e["seq"] > after][:limit]
+
+    def prune_events(self, before: float) -> int:
+        with self._lock:
+            kept = [e for e in self._events if e["created_at"] >= before]
+            removed = len(self._events) - len(kept)
+            self._events = kept
+            return removed
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def counters(self, prefix: str = "") -> Dict[str, float]:
+        with self._lock:
+            return {k: v for k, v in self._counters.items() if k.startswith(prefix)}
+
+
+class SQLiteStateBackend(StateBackend):
+    """Shared state in a SQLite file (WAL mode), safe for several worker processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode = WAL")
+            db.executescript('''
+            CREATE TABLE IF NOT EXISTS state_kv (
+                key TEXT PRIMARY KEY,
+                value REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_leases (
+                job_id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_leases_owner ON job_leases(owner);
+            CREATE TABLE IF NOT EXISTS job_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events(job_id, seq);
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value REAL NOT NULL
+            );
+            ''')
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Autocommit: every statement here is a single atomic upsert/update.
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def get_cooldown_until(self) -> float:
+        with self._connect() as db:
+            row = db.execute("SELECT value FROM state_kv WHERE key = 'cooldown_until'").fetchone()
+            return row[0] if row else 0.0
+
+    def extend_cooldown(self, until: float) -> float:
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO state_kv (key, value) VALUES ('cooldown_until', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)",
+                (until,)
+            )
+            return db.execute("SELECT value FROM state_kv WHERE key = 'cooldown_until'").fetchone()[0]
+
+    def acquire_lease(self, job_id: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self._connect() as db:
+            cur = db.execute(
+                "INSERT INTO job_leases (job_id, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(job_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE job_leases.owner = excluded.owner OR job_leases.expires_at <= ?",
+                (job_id, owner, now + ttl, now)
+            )
+            return cur.rowcount == 1
+
+    def renew_leases(self, owner: str, ttl: float) -> int:
+        with self._connect() as db:
+            return db.execute(
+                "UPDATE job_leases SET expires_at = ? WHERE owner = ?", (time.time() + ttl, owner)
+            ).rowcount
+
+    def release_lease(self, job_id: str, owner: str) -> None:
+        with self._connect() as db:
+            db.execute("DELETE FROM job_leases WHERE job_id = ? AND owner = ?", (job_id, owner))
+
+    def lease_holder(self, job_id: str) -> Optional[str]:
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT owner FROM job_leases WHERE job_id = ? AND expires_at > ?", (job_id, time.time())
+            ).fetchone()
+            return row[0] if row else None
+
+    def publish_event(self, job_id: str, event: Dict[str, Any]) -> int:
+        with self._connect() as db:
+            return db.execute(
+                "INSERT INTO job_events (job_id, payload, created_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(event), time.time())
+            ).lastrowid
+
+    def events_since(self, job_id: str, after: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT seq, payload, created_at FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (job_id, after, limit)
+            ).fetchall()
+        return [{"seq": seq, "job_id": job_id, "created_at": created_at, **json.loads(payload)}
+                for seq, payload, created_at in rows]
+
+    def prune_events(self, before: float) -> int:
+        with self._connect() as db:
+            return db.execute("DELETE FROM job_events WHERE created_at < ?", (before,)).rowcount
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, amount)
+            )
+
+    def counters(self, prefix: str = "") -> Dict[str, float]:
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT name, value FROM counters WHERE name LIKE ? ESCAPE '\\' ORDER BY name",
+                (prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%',)
+            ).fetchall()
+        return dict(rows)
+
+
+class LazyBackend:
+    """Builds the backend for `spec` on first use, so importing the app touches no storage."""
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        self._backend: Optional[StateBackend] = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self) -> StateBackend:
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = load_backend(self.spec)
+        return self._backend
+
+    def __getattr__(self, name: str):
+        return getattr(self.backend, name)
+
+
+def load_backend(spec: str) -> StateBackend:
+    """Builds a backend from a STATE_BACKEND spec (see module docstring)."""
+    if spec == "memory":
+        return MemoryStateBackend()
+    if spec.startswith("sqlite:"):
+        return SQLiteStateBackend(spec[len("sqlite:"):])
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"Unrecognised STATE_BACKEND '{spec}'")
+    backend_cls = getattr(importlib.import_module(module_name), class_name)
+    return backend_cls()
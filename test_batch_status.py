@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import app
+    app.init_db()
+    return app, app.app.test_client()
+
+
+def add_batch(app, batch_id, statuses):
+    db = app.get_db()
+    db.execute("INSERT INTO batches (batch_id, source, total_jobs) VALUES (?, ?, ?)",
+               (batch_id, "test", len(statuses)))
+    for i, status in enumerate(statuses):
+        db.execute("INSERT INTO jobs (job_id, status, current_task, form_data, batch_id) VALUES (?, ?, ?, ?, ?)",
+                   (f"{batch_id}-{i}", status, "", app.encode_blob('{"name": "n"}'), batch_id))
+    db.commit()
+
+
+def test_cancelling_a_job_finishes_the_batch(client):
+    app, c = client
+    add_batch(app, "b1", ["complete", "failed", "pending"])
+    assert not c.get("/api/v1/batch-status/b1").get_json()["done"]
+    assert c.post("/api/v1/cancel-project/b1-2").status_code == 200
+    status = c.get("/api/v1/batch-status/b1").get_json()
+    assert status["counts"] == {"complete": 1, "failed": 1, "cancelled": 1}
+    assert status["progress"] == 1.0
+    assert status["done"]
+
+
+def test_batch_with_running_jobs_is_not_done(client):
+    app, c = client
+    add_batch(app, "b2", ["cancelled", "running"])
+    status = c.get("/api/v1/batch-status/b2").get_json()
+    assert status["progress"] == 0.5
+    assert not status["done"]
@@ -0,0 +1,130 @@
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CircuitBreaker, CircuitOpen
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+class InvalidArgument(Exception):
+    pass
+
+
+class HTTPError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+def fail(breaker, error):
+    with pytest.raises(type(error)):
+        with breaker.guard():
+            raise error
+
+
+def succeed(breaker, slow_after=None, seconds=0.0, clock=None):
+    with breaker.guard(slow_after):
+        if clock is not None:
+            clock.now += seconds
+
+
+def test_classify():
+    assert circuit_breaker.classify(ServiceUnavailable()) == "unavailable"
+    assert circuit_breaker.classify(ResourceExhausted()) == "rate_limit"
+    assert circuit_breaker.classify(InvalidArgument()) == "invalid_request"
+    assert circuit_breaker.classify(HTTPError(429)) == "rate_limit"
+    assert circuit_breaker.classify(HTTPError(401)) == "auth"
+    assert circuit_breaker.classify(TimeoutError()) == "timeout"
+    assert circuit_breaker.classify(ConnectionResetError()) == "unavailable"
+    assert circuit_breaker.classify(ValueError()) == "other"
+
+
+def test_retry_after_seconds():
+    assert circuit_breaker.retry_after_seconds(ResourceExhausted("Quota exceeded. Please retry in 12.5s.")) == 12.5
+    assert circuit_breaker.retry_after_seconds(ResourceExhausted("Quota exceeded.")) is None
+
+
+def test_opens_on_failure_rate_once_min_calls_seen(clock):
+    breaker = CircuitBreaker(min_calls=4, failure_threshold=0.5)
+    succeed(breaker)
+    succeed(breaker)
+    fail(breaker, ServiceUnavailable())
+    assert breaker.state == "closed"
+    fail(breaker, ServiceUnavailable())
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen) as refused:
+        breaker.check()
+    assert refused.value.retry_after == 30.0
+
+
+def test_non_tripping_errors_are_not_failures(clock):
+    breaker = CircuitBreaker(min_calls=2)
+    for _ in range(4):
+        fail(breaker, InvalidArgument())
+    assert breaker.state == "closed"
+    assert breaker.snapshot()["errors"]["invalid_request"] == 4
+
+
+def test_slow_calls_open_the_circuit(clock):
+    breaker = CircuitBreaker(min_calls=2, slow_call_threshold=0.5)
+    succeed(breaker, slow_after=5, seconds=6, clock=clock)
+    succeed(breaker, slow_after=5, seconds=1, clock=clock)
+    assert breaker.state == "open"
+
+
+def test_rate_limit_opens_at_once_for_the_requested_wait(clock):
+    breaker = CircuitBreaker(open_seconds=30)
+    fail(breaker, ResourceExhausted("Please retry in 45s"))
+    assert breaker.state == "open"
+    assert breaker.retry_after() == 45.0
+
+
+def test_half_open_probe_closes_or_reopens_with_doubled_wait(clock):
+    breaker = CircuitBreaker(min_calls=1, open_seconds=10, max_open_seconds=25)
+    fail(breaker, ServiceUnavailable())
+    clock.now += 10
+    assert breaker.state == "half_open"
+
+    with breaker.guard():
+        with pytest.raises(CircuitOpen):  # the only probe slot is taken
+            breaker.check()
+    assert breaker.state == "closed"
+
+    fail(breaker, ServiceUnavailable())
+    clock.now += 10
+    fail(breaker, ServiceUnavailable())  # failed probe
+    assert breaker.retry_after() == 20.0
+    clock.now += 20
+    fail(breaker, ServiceUnavailable())
+    assert breaker.retry_after() == 25.0  # capped at max_open_seconds
+
+
+def test_transitions_are_reported(clock):
+    transitions = []
+    breaker = CircuitBreaker(min_calls=1, open_seconds=5,
+                             on_transition=lambda previous, state, reason: transitions.append((previous, state)))
+    fail(breaker, ServiceUnavailable())
+    clock.now += 5
+    succeed(breaker)
+    assert transitions == [("closed", "open"), ("open", "half_open"), ("half_open", "closed")]
@@ -0,0 +1,71 @@
+import plan_analytics
+
+
+def plan(total_estimate="$10k", wbs_names=("1.0 Planning", "2.0 Build")):
+    return {
+        "wbs": [{"id": str(i), "task": f"Phase {i}", "short_name": name} for i, name in enumerate(wbs_names, 1)],
+        "scheduler_output": {"timeline": [
+            {"task": "1.0 Planning", "start_week": 1, "duration_weeks": 3},
+            {"task": "2.0 Build", "start_week": 4, "duration_weeks": 5},
+        ]},
+        "budget": {"totalEstimate": total_estimate, "breakdown": [
+            {"item": "1.0 Planning", "cost": 4000},
+            {"item": "2.0 Build", "cost": "$5k"},
+            {"item": "Contingency (15%)", "cost": 1350},
+        ]},
+        "user_growth": {"labels": ["M1", "M2", "M3"], "values": [10, 20, 30]},
+    }
+
+
+def check(analytics, check_id):
+    return next(c for c in analytics["checks"] if c["id"] == check_id)
+
+
+def test_parse_amount():
+    assert plan_analytics.parse_amount(5000) == 5000.0
+    assert plan_analytics.parse_amount("$5,000") == 5000.0
+    assert plan_analytics.parse_amount("$5k") == 5000.0
+    assert plan_analytics.parse_amount("$1.2M") == 1200000.0
+    assert plan_analytics.parse_amount("$5000 marketing") == 5000.0
+    assert plan_analytics.parse_amount("Phase 2 (8 weeks): $40k") == 40000.0
+    assert plan_analytics.parse_amount("12 months") is None
+    assert plan_analytics.parse_amount(True) is None
+    assert plan_analytics.parse_amount("tbd") is None
+
+
+def test_parse_range():
+    assert plan_analytics.parse_range("$100k - $150k") == (100000.0, 150000.0)
+    assert plan_analytics.parse_range("$100k to 150k") == (100000.0, 150000.0)
+    assert plan_analytics.parse_range("$80k over 12 months") == (80000.0, 80000.0)
+    assert plan_analytics.parse_range("$100k - $150k (incl. 15% contingency)") == (100000.0, 150000.0)
+    assert plan_analytics.parse_range("Between $1.2M and $1.5M over 2 years") == (1200000.0, 1500000.0)
+    assert plan_analytics.parse_range("") is None
+
+
+def test_consistent_plan_passes_hard_checks():
+    analytics = plan_analytics.analyze(plan())
+    assert analytics["hard_checks_passed"]
+    assert analytics["budget"]["total"] == 10350.0
+    assert analytics["timeline"]["total_weeks"] == 8
+    assert analytics["critical_path"] == {"tasks": ["1.0 Planning", "2.0 Build"], "weeks": 8}
+
+
+def test_breakdown_outside_a_single_estimate_fails():
+    council_results = plan(total_estimate="$80k over 12 months")
+    council_results["budget"]["breakdown"][1]["cost"] = "$5.75M"
+    analytics = plan_analytics.analyze(council_results)
+    assert not check(analytics, "budget.matches_estimate")["ok"]
+    assert not analytics["hard_checks_passed"]
+
+
+def test_non_string_short_names_are_reported():
+    analytics = plan_analytics.analyze(plan(wbs_names=("1.0 Planning", "2.0 Build", 3)))
+    assert "3" in check(analytics, "budget.covers_wbs")["message"]
+    assert "3" in check(analytics, "timeline.covers_wbs")["message"]
+    assert not analytics["hard_checks_passed"]
+
+
+def test_summary_lines():
+    lines = plan_analytics.summary_lines(plan_analytics.analyze(plan()))
+    assert lines[0].startswith("- **Budget Breakdown Total:** $10,350")
+    assert any("Critical Path" in line for line in lines)
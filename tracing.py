@@ -0,0 +1,269 @@
+"""Lightweight span tracing for council jobs.
+
+Spans are timed `with` blocks carrying attributes (job_id, revision, agent, ...). Finished spans
+are queued and flushed in batches by a background thread to the configured exporters, so
+tracing never blocks the code being traced on I/O.
+
+Exporters are chosen with the TRACE_EXPORT environment variable (comma-separated):
+    sqlite:<path>          trace_spans table, queried by the per-job waterfall endpoint (default)
+    file:<path>            one JSON object per span per line
+    otlp:<url>             OTLP/HTTP JSON, e.g. otlp:http://localhost:4318/v1/traces
+    off                    disable tracing
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+MAX_QUEUE = 10000
+FLUSH_INTERVAL_SECONDS = 1.0
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "name": self.name, "start": self.start, "end": self.end,
+            "status": "error" if self.error else "ok", "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+def trace_id_for(key: str) -> str:
+    """Stable 32-hex trace id for a job, so all of its spans (from any worker) share one trace."""
+    return uuid.uuid5(uuid.NAMESPACE_URL, f"job:{key}").hex
+
+
+class Tracer:
+    def __init__(self, exporters: List["Exporter"]):
+        self.exporters = exporters
+        self.enabled = bool(exporters)
+        self._local = threading.local()
+        self._queue: List[Span] = []
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    def current(self) -> Optional[Span]:
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, trace_key: Optional[str] = None,
+             **attributes: Any) -> Iterator[Optional[Span]]:
+        """Times the block as a span. The parent defaults to the thread's current span."""
+        if not self.enabled:
+            yield None
+            return
+        parent = parent or self.current()
+        if parent is not None:
+            trace_id = parent.trace_id
+        else:
+            trace_id = trace_id_for(trace_key) if trace_key else uuid.uuid4().hex
+        span = Span(name, trace_id, parent.span_id if parent else None, attributes)
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            stack.pop()
+            span.end = time.time()
+            self._enqueue(span)
+
+    def record(self, name: str, start: float, end: float, parent: Optional[Span] = None, **attributes: Any) -> None:
+        """Adds an already-measured interval (epoch seconds) as a finished span."""
+        if not self.enabled:
+            return
+        parent = parent or self.current()
+        span = Span(name, parent.trace_id if parent else uuid.uuid4().hex,
+                    parent.span_id if parent else None, attributes)
+        span.start, span.end = start, end
+        self._enqueue(span)
+
+    def _enqueue(self, span: Span) -> None:
+        with self._lock:
+            if len(self._queue) >= MAX_QUEUE:
+                self.dropped += 1
+                return
+            self._queue.append(span)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="trace-flush", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(FLUSH_INTERVAL_SECONDS)
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._queue = self._queue, []
+        if not batch:
+            return
+        for exporter in self.exporters:
+            try:
+                exporter.export(batch)
+            except Exception as e:
+                print(f"[tracing] {type(exporter).__name__} failed to export {len(batch)} spans: {e}")
+
+
+class Exporter:
+    def export(self, spans: List[Span]) -> None:
+        raise NotImplementedError
+
+
+class JsonlExporter(Exporter):
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class SQLiteExporter(Exporter):
+    """Stores spans in a trace_spans table so a job's waterfall can be queried back."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30)
+        if not self._ready:  # created on first use so importing the app doesn't touch the db
+            db.execute('''
+            CREATE TABLE IF NOT EXISTS trace_spans (
+                span_id TEXT PRIMARY KEY,
+                trace_id TEXT NOT NULL,
+                parent_id TEXT,
+                job_id TEXT,
+                name TEXT NOT NULL,
+                start_time REAL NOT NULL,
+                end_time REAL NOT NULL,
+                status TEXT NOT NULL,
+                attributes TEXT
+            )
+            ''')
+            db.execute("CREATE INDEX IF NOT EXISTS idx_trace_spans_job ON trace_spans(job_id, start_time)")
+            db.execute("CREATE INDEX IF NOT EXISTS idx_trace_spans_start ON trace_spans(start_time)")
+            db.commit()
+            self._ready = True
+        return db
+
+    def export(self, spans: List[Span]) -> None:
+        db = self._connect()
+        try:
+            db.executemany(
+                "INSERT OR REPLACE INTO trace_spans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(s.span_id, s.trace_id, s.parent_id, s.attributes.get("job_id"), s.name, s.start, s.end,
+                  "error" if s.error else "ok",
+                  json.dumps({**s.attributes, **({"error": s.error} if s.error else {})}, default=str))
+                 for s in spans]
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def spans_for_job(self, job_id: str) -> List[Dict[str, Any]]:
+        db = self._connect()
+        db.row_factory = sqlite3.Row
+        try:
+            rows = db.execute(
+                "SELECT * FROM trace_spans WHERE job_id = ? ORDER BY start_time", (job_id,)
+            ).fetchall()
+        finally:
+            db.close()
+        return [{**dict(row), "attributes": json.loads(row["attributes"] or "{}")} for row in rows]
+
+    def prune(self, before: float) -> int:
+        db = self._connect()
+        try:
+            removed = db.execute("DELETE FROM trace_spans WHERE start_time < ?", (before,)).rowcount
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
+
+class OtlpHttpExporter(Exporter):
+    """Posts spans as OTLP/HTTP JSON to a collector."""
+
+    def __init__(self, endpoint: str, service_name: str = "ai-council-api", timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    @staticmethod
+    def _value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def export(self, spans: List[Span]) -> None:
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "tracing"}, "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(int(s.start * 1e9)),
+                "endTimeUnixNano": str(int(s.end * 1e9)),
+                "attributes": [{"key": k, "value": self._value(v)} for k, v in s.attributes.items() if v is not None],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            } for s in spans]}],
+        }]}
+        req = urllib.request.Request(self.endpoint, data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(req, timeout=self.timeout):
+            pass
+
+
+def load_exporters(spec: str) -> List[Exporter]:
+    """Builds exporters from a TRACE_EXPORT spec (see module docstring)."""
+    exporters: List[Exporter] = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        if part == "off":
+            return []
+        kind, _, target = part.partition(":")
+        if kind == "sqlite":
+            exporters.append(SQLiteExporter(target))
+        elif kind == "file":
+            exporters.append(JsonlExporter(target))
+        elif kind == "otlp":
+            exporters.append(OtlpHttpExporter(target, os.environ.get("OTEL_SERVICE_NAME", "ai-council-api")))
+        else:
+            raise ValueError(f"Unrecognised TRACE_EXPORT entry '{part}'")
+    return exporters
@@ -0,0 +1,11 @@
+"""Production entry point.
+
+Run several workers against one shared state backend, e.g.:
+    gunicorn -w 4 -b 0.0.0.0:5000 --timeout 60 wsgi:app
+
+Don't use --preload: each worker must start its own lease heartbeat threads after forking.
+Set STATE_BACKEND (see shared_state.py) to a path every worker can reach.
+"""
+from app import app, start_background_services
+
+start_background_services()